@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # فهارس trigram للبحث بالاسم
     'django_filters',
     'rest_framework',  # Django REST Framework for API development
     'rest_framework_simplejwt',  # JWT authentication
@@ -73,6 +74,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.AuditRequestMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -122,19 +124,78 @@ DATABASES = {
 
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv("LOGIN_RATE_PER_IP", "20/min"),
+        'login_email': os.getenv("LOGIN_RATE_PER_EMAIL", "5/min"),
+    },
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
         
     ),
 }
 
+# Cache: كل الإبطال (نسخ core/versioning، الصلاحيات، إبطال التوكنات...) يمر عبر الكاش، فيجب أن يكون
+# مشتركًا بين عمال gunicorn. REDIS_URL (مضبوط في docker-compose) يجعله Redis؛ بدونه LocMem لكل عملية
+# ويصلح فقط لعملية واحدة (التطوير/الاختبارات). فحص النشر core.W001 ينبّه لذلك (manage.py check --deploy).
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    _default_cache = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "dentpro",
+    }
+else:
+    _default_cache = {
+        "BACKEND": os.getenv("DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", "dentpro"),
+    }
+CACHES = {"default": _default_cache}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.tokens.ClinicTokenObtainPairSerializer',
+}
+
+# CachedJWTAuthentication: مدة بقاء المستخدم (وقائمة توكناته المبطلة) في ذاكرة العملية، ومدة نسخة
+# الإبطال في الكاش. الإبطال نفسه في قاعدة البيانات؛ مع LocMemCache لكل عملية كاش مستقل، فهاتان
+# المدتان أقصى تأخير لوصول الإبطال (تسجيل الخروج، تغيير كلمة المرور) إلى العمليات الأخرى.
+# قناع صلاحيات الأدوار (accounts/permissions.py) يُخزن بمدة الإبطال نفسها
+JWT_USER_CACHE_TTL = int(os.getenv("JWT_USER_CACHE_TTL", "60"))
+JWT_REVOCATION_CACHE_TTL = int(os.getenv("JWT_REVOCATION_CACHE_TTL", "60"))
+
+
+# تجزئة كلمات المرور: PASSWORD_HASHER=argon2|scrypt (الافتراضي argon2 إن كانت argon2-cffi مثبتة، وإلا scrypt)
+# الخوارزميات الأخرى تبقى في القائمة للتحقق من التجزئات القديمة، وتُعاد التجزئة تلقائيًا عند الدخول
+try:
+    import argon2  # noqa: F401
+    _default_hasher = "argon2"
+except ImportError:
+    _default_hasher = "scrypt"
+
+_HASHERS = {
+    "argon2": "accounts.hashers.ClinicArgon2PasswordHasher",
+    "scrypt": "accounts.hashers.ClinicScryptPasswordHasher",
 }
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", _default_hasher)
+PASSWORD_HASHERS = [_HASHERS[PASSWORD_HASHER]] + [h for name, h in _HASHERS.items() if name != PASSWORD_HASHER] + [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", str(19 * 1024)))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+SCRYPT_WORK_FACTOR = int(os.getenv("SCRYPT_WORK_FACTOR", str(2 ** 14)))
+
+# مسار الدخول (حدود المحاولات في DEFAULT_THROTTLE_RATES: login_ip/login_email): عدد عمليات التجزئة المتزامنة لكل عملية؛
+# ما يزيد عنها ينتظر LOGIN_QUEUE_TIMEOUT ثانية ثم يُرفض بـ 503 بدل أن يحجز عمال الـ API
+LOGIN_MAX_CONCURRENT = int(os.getenv("LOGIN_MAX_CONCURRENT", "1"))
+LOGIN_QUEUE_TIMEOUT = float(os.getenv("LOGIN_QUEUE_TIMEOUT", "2"))
+# حد عبر كل العمليات (يتطلب كاشًا مشتركًا مثل Redis)؛ 0 = معطل
+LOGIN_GLOBAL_MAX_CONCURRENT = int(os.getenv("LOGIN_GLOBAL_MAX_CONCURRENT", "0"))
 
 
 # Password validation
@@ -163,6 +224,39 @@ LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
 
+# المنطقة الزمنية للعيادة: حدود "اليوم" (مواعيد اليوم، إغلاق اليوم، التجميع اليومي) تُحسب بها
+CLINIC_TIME_ZONE = os.getenv("CLINIC_TIME_ZONE", "Asia/Aden")
+
+# أقصى مدة انتظار (ثوانٍ) لـ long-poll في change feed؛ مع gunicorn sync كل طلب منتظر يحجز عاملًا
+CHANGE_FEED_MAX_WAIT = int(os.getenv("CHANGE_FEED_MAX_WAIT", "20"))
+# بث SSE (changes/stream) تحت WSGI: أقصى انتظار (ثوانٍ) قبل الإغلاق وإعادة الاتصال؛ الانتظار الطويل لـ ASGI فقط
+CHANGE_FEED_WSGI_STREAM_WAIT = int(os.getenv("CHANGE_FEED_WSGI_STREAM_WAIT", "1"))
+# مهلة إعادة اتصال EventSource (ملّي ثانية) بعد إغلاق بث WSGI
+CHANGE_FEED_WSGI_RETRY_MS = int(os.getenv("CHANGE_FEED_WSGI_RETRY_MS", "2000"))
+# مدة الاحتفاظ بسجل التغييرات (أيام) لأمر prune_changelog
+CHANGE_FEED_RETENTION_DAYS = int(os.getenv("CHANGE_FEED_RETENTION_DAYS", "7"))
+# مزامنة الأجهزة: هامش (ثوانٍ) قبل "الآن" لا تُقرأ بعده التغييرات حتى تثبت المعاملات الجارية،
+# ومدة الاحتفاظ بشواهد الحذف (الرموز الأقدم منها تتلقى 410 وتعيد المزامنة الكاملة)
+SYNC_SAFETY_SECONDS = int(os.getenv("SYNC_SAFETY_SECONDS", "2"))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+# قوائم الأدمن غير المفلترة على جداول أكبر من هذا العدد تعرض عددًا تقديريًا (pg_class.reltuples)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv("ADMIN_ESTIMATED_COUNT_THRESHOLD", "10000"))
+# سجل التدقيق: يُكتب دفعات من خيط خلفي كل AUDIT_FLUSH_INTERVAL ثانية؛ أحداث آخر دفعة تضيع إن
+# قُتلت العملية فجأة (SIGKILL)، فـ AUDIT_SYNC_WRITES=1 يكتب كل حدث فور نجاح المعاملة
+AUDIT_SYNC_WRITES = os.getenv("AUDIT_SYNC_WRITES", "0") == "1"
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+# نافذة الاستعلام الافتراضية (أيام) حين لا يُحدد since
+AUDIT_QUERY_DEFAULT_DAYS = int(os.getenv("AUDIT_QUERY_DEFAULT_DAYS", "90"))
+# الجداول المقسّمة شهريًا (core/partitions.py): مدة الاحتفاظ بالأشهر قبل أن يفصلها أمر
+# archive_partitions إلى المخطط PARTITION_ARCHIVE_SCHEMA (وإلى PARTITION_ARCHIVE_TABLESPACE إن حُدد).
+# جدول غير مذكور لا يُؤرشف أبدًا؛ السجل السريري لا يُضاف هنا إلا وفق سياسة الاحتفاظ القانونية للعيادة
+PARTITION_RETENTION_MONTHS = {
+    "core_auditevent": int(os.getenv("AUDIT_RETENTION_MONTHS", "24")),
+}
+PARTITION_ARCHIVE_SCHEMA = os.getenv("PARTITION_ARCHIVE_SCHEMA", "archive")
+PARTITION_ARCHIVE_TABLESPACE = os.getenv("PARTITION_ARCHIVE_TABLESPACE") or None
+
 USE_I18N = True
 
 USE_TZ = True
@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse 
-from rest_framework_simplejwt.views import TokenObtainPairView
+from accounts.views import ClinicTokenObtainPairView
 def health(_): return HttpResponse("ok")
 urlpatterns = [
     path('health', health),
@@ -30,5 +30,5 @@ urlpatterns = [
     path('api/billing/', include('billing.urls')),  # Include URLs from the billing app
     path('api/core/',include('core.urls')),  # Include URLs from the core app
     path('api-auth/', include('rest_framework.urls')),  # Include DRF authentication URLs
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),  # JWT token endpoint
+    path('api/token/', ClinicTokenObtainPairView.as_view(), name='token_obtain_pair'),  # JWT token endpoint
 ]
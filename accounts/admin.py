@@ -3,12 +3,14 @@ from django.contrib import admin
 from .models import CustomUser, UserProfile, Doctor, Role, UserRole
 from django.contrib.auth.admin import UserAdmin
 
+from core.admin_mixins import ClinicAdminMixin
+
 # Register your models here.
 @admin.register(CustomUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ClinicAdminMixin, UserAdmin):
     model = CustomUser
     list_display = ('first_name', 'username', 'user_type', 'is_staff', 'is_superuser', 'is_archived')
-    search_fields = ('email', 'username')
+    search_fields = ('email', 'username', 'first_name', 'last_name')
     list_filter = ('user_type', 'is_staff', 'is_superuser', 'is_archived')
     ordering = ('email',)
     fieldsets = UserAdmin.fieldsets + (
@@ -17,16 +19,17 @@ class CustomUserAdmin(UserAdmin):
 
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'phone', 'gender', 'birth_date')
+    list_select_related = ('user',)
     search_fields = ('user__email', 'phone')
 
 
 @admin.register(Doctor)
-class DoctorAdmin(admin.ModelAdmin):
+class DoctorAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_select_related = ('user',)  # ربط بيانات user لتقليل عدد الاستعلامات
     list_display = ('get_full_name', 'id', 'specialization', 'license_number')
-    search_fields = ('user__email', 'specialization', 'license_number')
+    search_fields = ('user__email', 'user__first_name', 'user__last_name', 'specialization', 'license_number')
 
     def get_full_name(self, obj):
         return obj.user.get_full_name()
@@ -36,11 +39,12 @@ class DoctorAdmin(admin.ModelAdmin):
 
 
 @admin.register(Role)
-class RoleAdmin(admin.ModelAdmin):
+class RoleAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ('name',)
 
 
 @admin.register(UserRole)
-class UserRoleAdmin(admin.ModelAdmin):
+class UserRoleAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'role')
+    list_select_related = ('user', 'role')
     list_filter = ('role__name',)
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import VERSION_KEY, cache_token_version, revoked_jtis
+
+
+# =====================================================================
+# JWTAuthentication بدون استعلام لكل طلب:
+#   - التوكن موقّع، فمطالباته (user_type, is_staff, doctor_id) موثوقة كما هي
+#   - قيم أعمدة المستخدم وقائمة jti المبطلة تُحفظ في ذاكرة العملية لمدة قصيرة (JWT_USER_CACHE_TTL)؛
+#     كل طلب يبني منها كائن مستخدم جديدًا (لا شيء مشترك بين الطلبات المتزامنة)
+#   - نسخة المستخدم (ver) من الكاش؛ غيابها أو اختلافها يعيد التحميل من قاعدة البيانات
+# في الحالة المستقرة: صفر استعلامات؛ استعلامان عند انتهاء مدة الكاش.
+# =====================================================================
+_users = {}
+_lock = threading.Lock()
+MAX_CACHED_USERS = 2048
+
+
+def user_cache_ttl():
+    return getattr(settings, "JWT_USER_CACHE_TTL", 60)
+
+
+def forget_user(user_id):
+    with _lock:
+        _users.pop(str(user_id), None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if "ver" not in validated_token:
+            # توكنات صادرة قبل إضافة المطالبات: المسار الأصلي (استعلام)
+            return super().get_user(validated_token)
+
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version = cache.get(VERSION_KEY.format(user_id))
+        now = time.monotonic()
+        entry = _users.get(user_id)
+        if entry is None or entry[0] < now or version is None or entry[1] != version:
+            entry = self._load(user_id, now)
+            version = entry[1]
+
+        if validated_token["ver"] != version or validated_token.get(api_settings.JTI_CLAIM) in entry[3]:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        # كائن جديد لكل طلب من القيم المحفوظة (نسخة سطحية كانت تشارك _state.fields_cache)
+        user = self.user_model.from_db(*entry[2])
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        user.token_claims = validated_token.payload
+        user.doctor_id = validated_token.get("doctor_id")
+        return user
+
+    def _load(self, user_id, now):
+        try:
+            user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        cache_token_version(user_id, user.token_version)
+        fields = self.user_model._meta.concrete_fields
+        row = (user._state.db, [f.attname for f in fields], [getattr(user, f.attname) for f in fields])
+        entry = (now + user_cache_ttl(), user.token_version, row, revoked_jtis(user.pk))
+        with _lock:
+            if len(_users) >= MAX_CACHED_USERS:
+                _users.clear()
+            _users[user_id] = entry
+        return entry
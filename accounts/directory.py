@@ -0,0 +1,35 @@
+from django.core.cache import cache
+
+from core.versioning import bump_version, get_version
+
+from .models import Doctor
+
+
+# =====================================================================
+# دليل الأطباء (نماذج الحجز تحمّله في كل مرة): استعلام values() واحد مع الاسم والبريد،
+# والنتيجة في الكاش بمفتاح نسخة تُرفع عند تغيّر طبيب أو مستخدمه (accounts/signals.py)
+# =====================================================================
+DIRECTORY_VERSION_KEY = "accounts:doctors:version"
+DIRECTORY_TTL = 10 * 60
+
+
+def doctor_directory():
+    key = f"accounts:doctors:{get_version(DIRECTORY_VERSION_KEY)}"
+    data = cache.get(key)
+    if data is None:
+        data = [
+            {
+                "id": str(row["id"]),
+                "name": f"{row['user__first_name']} {row['user__last_name']}".strip(),
+                "email": row["user__email"],
+            }
+            for row in Doctor.objects.order_by("user__first_name", "user__last_name").values(
+                "id", "user__first_name", "user__last_name", "user__email",
+            )
+        ]
+        cache.set(key, data, DIRECTORY_TTL)
+    return data
+
+
+def invalidate_directory():
+    bump_version(DIRECTORY_VERSION_KEY)
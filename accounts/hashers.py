@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+# =====================================================================
+# خوارزميات تجزئة كلمات المرور بمعاملات قابلة للضبط من الإعدادات
+# (PBKDF2 الافتراضي يستهلك 100–300ms من المعالج لكل دخول على العمال الصغيرة)
+# تغيير المعاملات أو الخوارزمية يُعيد تجزئة كلمة المرور تلقائيًا عند الدخول التالي
+# (check_password → must_update/setter) دون أي ترحيل.
+# =====================================================================
+class ClinicArgon2PasswordHasher(Argon2PasswordHasher):
+    algorithm = "argon2"  # نفس اسم Django حتى تبقى التجزئات القائمة قابلة للتحقق
+
+    time_cost = getattr(settings, "ARGON2_TIME_COST", 2)
+    memory_cost = getattr(settings, "ARGON2_MEMORY_COST", 19 * 1024)  # KiB
+    parallelism = getattr(settings, "ARGON2_PARALLELISM", 1)
+
+
+class ClinicScryptPasswordHasher(ScryptPasswordHasher):
+    algorithm = "scrypt"
+
+    work_factor = getattr(settings, "SCRYPT_WORK_FACTOR", 2 ** 14)
+    block_size = getattr(settings, "SCRYPT_BLOCK_SIZE", 8)
+    parallelism = getattr(settings, "SCRYPT_PARALLELISM", 1)
+    maxmem = 64 * 1024 * 1024
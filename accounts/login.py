@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import SimpleRateThrottle
+
+
+# =====================================================================
+# مسار الدخول: حدود محاولات + ميزانية تجزئة معزولة
+# تجزئة كلمة المرور مكلفة عمدًا؛ موجة محاولات (credential stuffing) بلا حدود تستهلك
+# المعالج وتحجز العمال عن الطلبات السريرية.
+# =====================================================================
+class LoginIPThrottle(SimpleRateThrottle):
+    scope = "login_ip"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class LoginEmailThrottle(SimpleRateThrottle):
+    """يحد محاولات البريد نفسه من عناوين مختلفة."""
+    scope = "login_email"
+
+    def get_cache_key(self, request, view):
+        email = (request.data.get("email") or "").strip().lower()
+        if not email:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": hashlib.sha1(email.encode()).hexdigest()}
+
+
+LOGIN_THROTTLES = [LoginIPThrottle, LoginEmailThrottle]
+
+
+class LoginBusy(APIException):
+    status_code = 503
+    default_detail = "الخادم مشغول بطلبات دخول أخرى، حاول بعد قليل."
+    default_code = "login_busy"
+    wait = 1  # Retry-After
+
+
+# ---------------------------------------------------------------------
+# ميزانية التجزئة
+#   - لكل عملية: BoundedSemaphore (عمال gthread/ASGI)
+#   - عبر العمليات (اختياري): عدّاد في الكاش المشترك LOGIN_GLOBAL_MAX_CONCURRENT (مع Redis)
+# ما يتجاوزها ينتظر حتى LOGIN_QUEUE_TIMEOUT ثم يُرفض بـ 503 مع Retry-After.
+# ---------------------------------------------------------------------
+INFLIGHT_KEY = "accounts:login:inflight"
+INFLIGHT_TTL = 60  # يُصفَّر العدّاد إن ماتت عملية أثناء التجزئة
+
+_semaphore = threading.BoundedSemaphore(getattr(settings, "LOGIN_MAX_CONCURRENT", 1))
+
+
+def _enter_inflight():
+    """يزيد العدّاد المشترك ويُرجع قيمته الجديدة."""
+    for _ in range(3):
+        try:
+            return cache.incr(INFLIGHT_KEY)
+        except ValueError:
+            # المفتاح غير موجود أو انتهت صلاحيته بين add و incr: نبذره من جديد
+            if cache.add(INFLIGHT_KEY, 1, INFLIGHT_TTL):
+                return 1
+    raise LoginBusy()
+
+
+@contextmanager
+def hashing_budget():
+    if not _semaphore.acquire(timeout=getattr(settings, "LOGIN_QUEUE_TIMEOUT", 2)):
+        raise LoginBusy()
+    global_max = getattr(settings, "LOGIN_GLOBAL_MAX_CONCURRENT", 0)
+    counted = False
+    try:
+        if global_max:
+            inflight = _enter_inflight()
+            counted = True
+            if inflight > global_max:
+                raise LoginBusy()
+        yield
+    finally:
+        if counted:
+            try:
+                cache.decr(INFLIGHT_KEY)
+            except ValueError:
+                pass  # انتهت صلاحية العدّاد
+        _semaphore.release()
+
+
+def authenticate_limited(request, email, password):
+    """authenticate() داخل ميزانية التجزئة؛ يرفع LoginBusy عند الازدحام."""
+    with hashing_budget():
+        return authenticate(request, email=email, password=password)
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:03
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from core.text import full_name_key
+
+
+def fill_normalized_name(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    batch = []
+    for obj in CustomUser.objects.only('id', 'first_name', 'last_name').iterator(chunk_size=1000):
+        obj.normalized_name = full_name_key(obj.first_name, obj.last_name)
+        batch.append(obj)
+        if len(batch) >= 1000:
+            CustomUser.objects.bulk_update(batch, ['normalized_name'])
+            batch = []
+    CustomUser.objects.bulk_update(batch, ['normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_customuser_token_version'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='customuser',
+            name='normalized_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=301),
+        ),
+        migrations.RunPython(fill_normalized_name, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['normalized_name'], name='user_normalized_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['normalized_name'], name='user_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 import uuid
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from core.indexes import search_trgm_index
+from core.text import full_name_key
 from django.utils.translation import gettext_lazy as _
 from django.db import models
 
@@ -26,11 +29,29 @@ class CustomUser(AbstractUser):
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES,null=True,)
     # is_verified = models.BooleanField(default=False) # This field is for email verification and will be added later.
     is_archived = models.BooleanField(default=False)
+    # تُكتب في مطالبة ver داخل التوكن؛ رفعها يُبطل كل توكنات المستخدم (accounts/tokens.py)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+    # الاسم الكامل بعد التوحيد (core/text.py) للبحث بالاسم عند الحجز؛ يُحدَّث في save()
+    normalized_name = models.CharField(max_length=301, blank=True, default="", editable=False)
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['normalized_name'], name='user_normalized_name_idx'),
+            GinIndex(fields=['normalized_name'], opclasses=['gin_trgm_ops'], name='user_name_trgm_idx'),
+            search_trgm_index('first_name', 'last_name', 'email', name='user_search_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.get_full_name() or self.username
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = full_name_key(self.first_name, self.last_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        super().save(*args, **kwargs)
     
 
 # --------------------------------------------------------------------
@@ -0,0 +1,144 @@
+from enum import IntFlag
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import BasePermission
+
+from .models import Role, UserRole
+
+
+# =====================================================================
+# صلاحيات الأدوار كقناع بتات (bitset) واحد لكل مستخدم
+# الأدوار الفعلية = user_type + أدوار UserRole (+ admin للـ superuser)، تُجمع مع صلاحياتها
+# في عدد صحيح واحد يُخزن في الكاش؛ فحص الصلاحية في كل طلب = قراءة كاش + عملية AND.
+# يُحذف القناع من الكاش عند تغيّر UserRole أو user_type/is_superuser (accounts/signals.py).
+# =====================================================================
+class Perm(IntFlag):
+    # الأدوار (البتات الدنيا)
+    ADMIN = 1 << 0
+    DENTIST = 1 << 1
+    RECEPTIONIST = 1 << 2
+    ASSISTANT = 1 << 3
+    MANAGER = 1 << 4
+    # الصلاحيات
+    VIEW_PATIENTS = 1 << 8
+    EDIT_PATIENTS = 1 << 9
+    MANAGE_APPOINTMENTS = 1 << 10
+    CLINICAL = 1 << 11        # الفحوصات والإجراءات والوصفات
+    BILLING = 1 << 12
+    REPORTS = 1 << 13
+    MANAGE_USERS = 1 << 14
+
+
+ROLE_MASK = Perm.ADMIN | Perm.DENTIST | Perm.RECEPTIONIST | Perm.ASSISTANT | Perm.MANAGER
+# كل الصلاحيات دون بتات الأدوار: المدير العام لا يُعد طبيبًا في IsDoctor
+ALL_PERMS = Perm(sum(Perm.__members__.values())) & ~ROLE_MASK
+
+ROLE_BITS = {
+    Role.RoleChoices.ADMIN: Perm.ADMIN,
+    Role.RoleChoices.DENTIST: Perm.DENTIST,
+    Role.RoleChoices.RECEPTIONIST: Perm.RECEPTIONIST,
+    Role.RoleChoices.ASSISTANT: Perm.ASSISTANT,
+    Role.RoleChoices.MANAGER: Perm.MANAGER,
+}
+
+# user_type (CustomUser) → اسم الدور المقابل في Role
+USER_TYPE_ROLES = {
+    "admin": Role.RoleChoices.ADMIN,
+    "doctor": Role.RoleChoices.DENTIST,
+    "receptionist": Role.RoleChoices.RECEPTIONIST,
+    "assistant": Role.RoleChoices.ASSISTANT,
+    "manager": Role.RoleChoices.MANAGER,
+}
+
+ROLE_PERMISSIONS = {
+    Perm.ADMIN: ALL_PERMS,
+    Perm.DENTIST: Perm.VIEW_PATIENTS | Perm.EDIT_PATIENTS | Perm.MANAGE_APPOINTMENTS | Perm.CLINICAL,
+    Perm.RECEPTIONIST: Perm.VIEW_PATIENTS | Perm.EDIT_PATIENTS | Perm.MANAGE_APPOINTMENTS | Perm.BILLING,
+    Perm.ASSISTANT: Perm.VIEW_PATIENTS | Perm.MANAGE_APPOINTMENTS | Perm.CLINICAL,
+    Perm.MANAGER: Perm.VIEW_PATIENTS | Perm.MANAGE_APPOINTMENTS | Perm.BILLING | Perm.REPORTS | Perm.MANAGE_USERS,
+}
+
+MASK_KEY = "accounts:perm:{}"
+
+
+def mask_ttl():
+    # invalidate_mask يحذف من كاش هذه العملية فقط إن كان الكاش LocMem؛ فسحب دور يصل العمليات
+    # الأخرى بعد هذه المدة على الأكثر، مثل إبطال التوكنات (JWT_REVOCATION_CACHE_TTL)
+    return getattr(settings, "JWT_REVOCATION_CACHE_TTL", 60)
+
+
+def compile_mask(user_type=None, is_superuser=False, role_names=()):
+    roles = Perm(0)
+    if is_superuser:
+        roles |= Perm.ADMIN
+    if user_type in USER_TYPE_ROLES:
+        roles |= ROLE_BITS[USER_TYPE_ROLES[user_type]]
+    for name in role_names:
+        roles |= ROLE_BITS.get(name, Perm(0))
+
+    mask = roles
+    for bit, perms in ROLE_PERMISSIONS.items():
+        if roles & bit:
+            mask |= perms
+    return int(mask)
+
+
+def get_mask(user):
+    """القناع الفعلي للمستخدم: من الطلب نفسه، ثم الكاش، ثم استعلام واحد."""
+    if not getattr(user, "is_authenticated", False):
+        return 0
+    mask = getattr(user, "_perm_mask", None)
+    if mask is None:
+        key = MASK_KEY.format(user.pk)
+        mask = cache.get(key)
+        if mask is None:
+            names = UserRole.objects.filter(user_id=user.pk).values_list("role__name", flat=True)
+            mask = compile_mask(user.user_type, user.is_superuser, names)
+            cache.set(key, mask, mask_ttl())
+        user._perm_mask = mask
+    return mask
+
+
+def has_perm(user, perm):
+    return bool(get_mask(user) & perm)
+
+
+def invalidate_mask(user_id):
+    cache.delete(MASK_KEY.format(user_id))
+
+
+# ---------------------------------------------------------------------
+# صلاحيات DRF
+# ---------------------------------------------------------------------
+class HasPerm(BasePermission):
+    """يكفي أي بت من required؛ الأصناف الفرعية تحدد required فقط."""
+    required = Perm(0)
+
+    def has_permission(self, request, view):
+        return has_perm(request.user, self.required)
+
+
+def require(perm):
+    """permission_classes = [require(Perm.BILLING)]"""
+    return type(f"Require{perm.name or int(perm)}", (HasPerm,), {"required": perm})
+
+
+class IsClinicAdmin(HasPerm):
+    required = Perm.ADMIN
+
+
+class IsDoctor(HasPerm):
+    required = Perm.DENTIST
+
+
+class IsReceptionist(HasPerm):
+    required = Perm.RECEPTIONIST
+
+
+class IsAssistant(HasPerm):
+    required = Perm.ASSISTANT
+
+
+class IsManager(HasPerm):
+    required = Perm.MANAGER
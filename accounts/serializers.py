@@ -12,6 +12,13 @@ class UserProfileNestedSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = ['phone', 'gender', 'birth_date', 'address', 'image']
+
+    def get_attribute(self, instance):
+        # مستخدمون بلا ملف شخصي (مثل createsuperuser) يُعرضون profile = null
+        try:
+            return super().get_attribute(instance)
+        except UserProfile.DoesNotExist:
+            return None
     
     def validate_gender(self, value):
         allowed = ['ذكر', 'أنثى', 'male', 'female']
@@ -27,6 +34,15 @@ class DoctorNestedSerializer(serializers.ModelSerializer):
         model = Doctor
         fields = ['specialization', 'license_number', 'revenue_share']
 
+    def get_attribute(self, instance):
+        # doctor_profile علاقة عكسية (FK) تعيد manager؛ نعرض أول ملف طبيب
+        # .all() تستخدم prefetch_related إن وُجد فلا استعلام لكل صف
+        doctors = super().get_attribute(instance)
+        if doctors is None:
+            return None
+        doctors = list(doctors.all())
+        return doctors[0] if doctors else None
+
 
 class UnifiedUserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
@@ -110,8 +126,8 @@ class UnifiedUserSerializer(serializers.ModelSerializer):
             setattr(profile, attr, value)
         profile.save()
 
-        if instance.user_type == 'doctor' and hasattr(instance, 'doctor_profile'):
-            doctor = instance.doctor_profile
+        doctor = instance.doctor_profile.first() if instance.user_type == 'doctor' else None
+        if doctor is not None:
             for attr, value in doctor_data.items():
                 setattr(doctor, attr, value)
             doctor.save()
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import forget_user
+from .directory import invalidate_directory
+from .models import CustomUser, Doctor, UserRole
+from .permissions import invalidate_mask
+from .tokens import cache_token_version, revoke_user_tokens
+
+
+# الحقول التي تُكتب في التوكن أو تحدد صلاحيته؛ تغييرها يُبطل التوكنات القائمة
+TOKEN_FIELDS = ("password", "is_active", "is_staff", "is_superuser", "user_type")
+
+
+@receiver(pre_save, sender=CustomUser)
+def revoke_tokens_on_sensitive_change(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_FIELDS):
+        return
+    old = CustomUser.objects.filter(pk=instance.pk).values(*TOKEN_FIELDS, "token_version").first()
+    changed = [f for f in TOKEN_FIELDS if old and old[f] != getattr(instance, f)]
+    if changed == ["password"] and instance._password is None:
+        # إعادة تجزئة تلقائية عند الدخول (check_password يصفّر _password قبل الحفظ): نفس كلمة المرور
+        return
+    if changed:
+        instance.token_version = max(instance.token_version, old["token_version"]) + 1
+        if update_fields is not None:
+            # token_version ليس ضمن update_fields فلن يُحفظ مع الصف
+            CustomUser.objects.filter(pk=instance.pk).update(token_version=instance.token_version)
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_cached_user(sender, instance, created, **kwargs):
+    if created:
+        return
+    user_id, version = instance.pk, instance.token_version
+    forget_user(user_id)
+    invalidate_mask(user_id)
+    if instance.user_type == "doctor":
+        invalidate_directory()
+    transaction.on_commit(lambda: cache_token_version(user_id, version))
+
+
+@receiver(post_save, sender=Doctor)
+def revoke_tokens_on_doctor_created(sender, instance, created, **kwargs):
+    # مطالبة doctor_id تتغير عند إنشاء ملف الطبيب أو حذفه
+    if created:
+        revoke_user_tokens(instance.user_id)
+
+
+@receiver(post_delete, sender=Doctor)
+def revoke_tokens_on_doctor_deleted(sender, instance, **kwargs):
+    revoke_user_tokens(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserRole)
+def invalidate_role_mask(sender, instance, **kwargs):
+    # الحذف بعد التثبيت أيضًا حتى لا يعيد طلب متزامن ملء الكاش بالقيمة القديمة
+    invalidate_mask(instance.user_id)
+    transaction.on_commit(lambda: invalidate_mask(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def refresh_doctor_directory(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_directory)
@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import CustomUser, Doctor
+
+
+# =====================================================================
+# مطالبات التوكن (claims): تُكتب عند الإصدار فلا يحتاج التحقق إلى قاعدة البيانات
+#   user_type, is_staff, doctor_id, ver (نسخة إبطال توكنات المستخدم)
+#
+# الإبطال:
+#   - لكل مستخدم token_version في قاعدة البيانات (المصدر الموثوق) ونسخة منه في الكاش؛
+#     رفعها يُبطل كل توكنات المستخدم (تغيير كلمة المرور/الدور/التعطيل، أو الخروج من كل الأجهزة).
+#   - التوكنات المفردة (jti) المبطلة بتسجيل الخروج تُحفظ في قاعدة البيانات (token_blacklist من
+#     simplejwt)؛ تُقرأ مع المستخدم عند تحميله (authentication.py)، وحذف نسخة الكاش يفرض التحميل.
+#     أمر flushexpiredtokens (simplejwt) يحذف المنتهية منها.
+# =====================================================================
+VERSION_KEY = "accounts:auth:ver:{}"
+
+
+def version_ttl():
+    # مع LocMemCache (كاش لكل عملية) هذه أقصى مدة يبقى فيها توكن مُبطل مقبولًا في العمليات الأخرى
+    return getattr(settings, "JWT_REVOCATION_CACHE_TTL", 60)
+
+
+def cache_token_version(user_id, version):
+    cache.set(VERSION_KEY.format(user_id), version, version_ttl())
+
+
+def revoke_user_tokens(user_id):
+    """يُبطل كل توكنات المستخدم الصادرة حتى الآن."""
+    CustomUser.objects.filter(pk=user_id).update(token_version=F("token_version") + 1)
+    # الطلب التالي يقرأ النسخة الجديدة من قاعدة البيانات
+    transaction.on_commit(lambda: cache.delete(VERSION_KEY.format(user_id)))
+
+
+def revoke_token(token):
+    """يُبطل توكنًا واحدًا (jti) حتى انتهاء صلاحيته؛ دائم (قاعدة البيانات) ويصل كل العمليات."""
+    jti = token.get(api_settings.JTI_CLAIM)
+    if not jti or token["exp"] <= time.time():
+        return
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    outstanding, _ = OutstandingToken.objects.get_or_create(
+        jti=jti,
+        defaults={
+            "user_id": user_id,
+            "token": str(token),
+            "created_at": datetime_from_epoch(token["iat"]) if "iat" in token else None,
+            "expires_at": datetime_from_epoch(token["exp"]),
+        },
+    )
+    BlacklistedToken.objects.get_or_create(token=outstanding)
+    # النسخة المفقودة من الكاش تفرض إعادة تحميل المستخدم (ومعه قائمة jti المبطلة)
+    transaction.on_commit(lambda: cache.delete(VERSION_KEY.format(user_id)))
+
+
+def revoked_jtis(user_id):
+    """jti توكنات المستخدم المبطلة التي لم تنتهِ صلاحيتها بعد (استعلام واحد)."""
+    return frozenset(
+        BlacklistedToken.objects
+        .filter(token__user_id=user_id, token__expires_at__gt=timezone.now())
+        .values_list("token__jti", flat=True)
+    )
+
+
+def add_claims(token, user):
+    token["user_type"] = user.user_type
+    token["is_staff"] = user.is_staff
+    doctor_id = (
+        Doctor.objects.filter(user_id=user.pk).order_by("created_at").values_list("id", flat=True).first()
+        if user.user_type == "doctor" else None
+    )
+    token["doctor_id"] = str(doctor_id) if doctor_id else None
+    token["ver"] = user.token_version
+    return token
+
+
+def access_token_for_user(user):
+    return add_claims(AccessToken.for_user(user), user)
+
+
+class ClinicTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """توكنات /api/token/ بنفس مطالبات login_user (تُنسخ من refresh إلى access)."""
+
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
@@ -10,5 +10,5 @@ urlpatterns = [
     path('list-users/', views.list_users, name='list_users'),
     path('doctor-list/', views.DoctorListSimpleAPIView.as_view(), name='doctor_list'),
     path('doctors/<uuid:id>/', views.DoctorDetailAPIView.as_view(), name='doctor-detail'),
-    # path('logout_user/', views.logout_user, name='logout_user'),
+    path('logout-user/', views.logout_user, name='logout_user'),
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.shortcuts import render
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .serializers import UnifiedUserSerializer , DoctorProfileSerializer
@@ -9,7 +9,12 @@ from .models import CustomUser, Doctor
 from rest_framework.views import APIView
 from rest_framework import generics
 from rest_framework.permissions import IsAdminUser
-from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.pagination import PageNumberPagination
+from django.db.models import Prefetch
+from .directory import doctor_directory
+from rest_framework_simplejwt.views import TokenObtainPairView
+from .login import LOGIN_THROTTLES, authenticate_limited, hashing_budget
+from .tokens import access_token_for_user, revoke_token, revoke_user_tokens
 # from rest_framework_simplejwt.tokens import RefreshToken
 # from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 # Create your views here.
@@ -33,14 +38,15 @@ def update_user(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
+@throttle_classes(LOGIN_THROTTLES)
 def login_user(request):
     email = request.data.get('email')
     password = request.data.get('password')
 
-    user = authenticate(request, email=email, password=password)
+    user = authenticate_limited(request, email, password)
 
     if user:
-        access_token = AccessToken.for_user(user)
+        access_token = access_token_for_user(user)
         return Response({
             'access': str(access_token),
             'user': {
@@ -60,12 +66,31 @@ def current_user(request):
     serializer = UnifiedUserSerializer(request.user)
     return Response(serializer.data)
 
+class AccountsPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+def paginate_if_requested(request, items, serialize=None):
+    """الترقيم اختياري (?page=) حتى تبقى الاستجابة قائمة كاملة للعملاء الحاليين."""
+    if 'page' not in request.query_params:
+        return Response(serialize(items) if serialize else items)
+    paginator = AccountsPagination()
+    page = paginator.paginate_queryset(items, request)
+    return paginator.get_paginated_response(serialize(page) if serialize else page)
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def list_users(request):
-    users = CustomUser.objects.all()
-    serializer = UnifiedUserSerializer(users, many=True)
-    return Response(serializer.data)
+    # الملف الشخصي بـ JOIN وملفات الأطباء باستعلام واحد بدل استعلامين لكل مستخدم
+    users = (
+        CustomUser.objects.select_related('profile')
+        .prefetch_related(Prefetch('doctor_profile', queryset=Doctor.objects.order_by('created_at')))
+        .order_by('email')
+    )
+    return paginate_if_requested(request, users, lambda rows: UnifiedUserSerializer(rows, many=True).data)
 
 
 
@@ -73,21 +98,32 @@ class DoctorListSimpleAPIView(generics.ListAPIView):
     # permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        doctors = Doctor.objects.all()
-        data = [
-            {
-                "id": str(doctor.id),
-                "name": doctor.user.get_full_name(),
-                "email": doctor.user.email
-            }
-            for doctor in doctors
-        ]
-        return Response(data)
+        return paginate_if_requested(request, doctor_directory())
 
 class DoctorDetailAPIView(generics.RetrieveAPIView):
     queryset = Doctor.objects.select_related('user', 'user__profile').all()
     serializer_class = DoctorProfileSerializer
     lookup_field = 'id'
+class ClinicTokenObtainPairView(TokenObtainPairView):
+    """/api/token/ بنفس حدود وميزانية login_user."""
+    throttle_classes = LOGIN_THROTTLES
+
+    def post(self, request, *args, **kwargs):
+        with hashing_budget():
+            return super().post(request, *args, **kwargs)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_user(request):
+    """يُبطل التوكن الحالي؛ {"all": true} يُبطل كل توكنات المستخدم (كل الأجهزة)."""
+    if request.data.get('all'):
+        revoke_user_tokens(request.user.pk)
+    elif request.auth is not None:
+        revoke_token(request.auth)
+    return Response({'message': 'تم تسجيل الخروج'}, status=status.HTTP_200_OK)
+
+
 # @api_view(['POST'])
 # @permission_classes([IsAuthenticated])
 # def logout_user(request):
@@ -1,13 +1,16 @@
 from django.contrib import admin
+from core.admin_mixins import ClinicAdminMixin
+
 from .models import Appointment
 # Register your models here.
 
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'patient', 'doctor', 'date', 'time', 'status', 'created_at')
     list_filter = ('status', 'date', 'doctor')
-    search_fields = ('patient__first_name', 'patient__last_name', 'doctor__first_name', 'doctor__last_name')
+    search_fields = ('patient__first_name', 'patient__last_name', 'doctor__user__first_name', 'doctor__user__last_name')
+    list_select_related = ('patient', 'doctor__user')
     ordering = ('-created_at',)
     date_hierarchy = 'date'
     readonly_fields = ('created_at',)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from core.utils import clinic_now
+from core.versioning import bump_version, get_version
+
+from .models import Appointment, normalize_status, status_variants
+
+
+# =====================================================================
+# لوحة اليوم لموظفي الاستقبال
+# استعلام واحد (values + joins) مجمّع حسب الطبيب، ومخزّن في الكاش بنسخة لكل يوم:
+# أي حفظ/حذف لموعد في ذلك اليوم يرفع النسخة، وTTL قصير يغطي ما لا تلتقطه الإشارات
+# (مثل QuerySet.update أو تعديل اسم المريض).
+# =====================================================================
+BOARD_TTL = 30
+
+
+def board_version_key(day):
+    return f"appointment:day-board-version:{day}"
+
+
+def bump_board(*days):
+    for day in {d for d in days if d}:
+        bump_version(board_version_key(day))
+
+
+def _fetch(day, doctor_ids=None, statuses=None):
+    qs = Appointment.objects.filter(date=day)
+    if doctor_ids:
+        qs = qs.filter(doctor_id__in=doctor_ids)
+    if statuses:
+        qs = qs.filter(status__in=[v for s in statuses for v in status_variants(s)])
+    return (
+        qs.values(
+            "id", "time", "status", "reason", "patient_id", "doctor_id",
+            patient_first_name=F("patient__first_name"),
+            patient_last_name=F("patient__last_name"),
+            patient_phone=F("patient__phone"),
+            doctor_first_name=F("doctor__user__first_name"),
+            doctor_last_name=F("doctor__user__last_name"),
+            clinical_exam_id=F("clinical_exam__id"),
+        )
+        .order_by("doctor__user__first_name", "doctor__user__last_name", "doctor_id", "time", "id")
+    )
+
+
+def build_board(day, doctor_ids=None, statuses=None):
+    counts, doctors = {}, {}
+    for row in _fetch(day, doctor_ids, statuses):
+        status = normalize_status(row["status"])
+        counts[status] = counts.get(status, 0) + 1
+        doc = doctors.setdefault(row["doctor_id"], {
+            "doctor": row["doctor_id"],
+            "doctor_name": f"{row['doctor_first_name']} {row['doctor_last_name']}".strip(),
+            "counts": {},
+            "appointments": [],
+        })
+        doc["counts"][status] = doc["counts"].get(status, 0) + 1
+        doc["appointments"].append({
+            "id": row["id"],
+            "time": row["time"].strftime("%I:%M %p"),
+            "status": status,
+            "reason": row["reason"],
+            "patient": row["patient_id"],
+            "patient_display": f"{row['patient_first_name']} {row['patient_last_name']}",
+            "patient_phone": row["patient_phone"],
+            "clinical_exam": row["clinical_exam_id"],
+        })
+
+    board = {
+        "date": day,
+        "total": sum(counts.values()),
+        "counts": counts,
+        "doctors": list(doctors.values()),
+    }
+    body = json.dumps(board, cls=DjangoJSONEncoder, sort_keys=True)
+    board["etag"] = hashlib.md5(body.encode()).hexdigest()
+    board["generated_at"] = clinic_now()
+    return board
+
+
+def get_board(day, doctor_ids=None, statuses=None):
+    doctor_ids = sorted(str(d) for d in doctor_ids or [])
+    statuses = sorted({normalize_status(s) for s in statuses or []})
+    key = "appointment:day-board:{}:{}:{}:{}".format(
+        day, get_version(board_version_key(day)), ",".join(doctor_ids), ",".join(statuses),
+    )
+    board = cache.get(key)
+    if board is None:
+        board = build_board(day, doctor_ids, statuses)
+        cache.set(key, board, BOARD_TTL)
+    return board
@@ -4,8 +4,28 @@ from django.utils.translation import gettext_lazy as _
 from accounts.models import CustomUser
 from patients.models import Patient
 from accounts.models import Doctor
+from core.tracking import LoadedValuesMixin
 # Create your models here.
-class Appointment(models.Model):
+# المرادفات العربية لحالات الموعد → الصيغة الإنجليزية الموحدة
+STATUS_ALIASES = {
+    'معلق': 'pending',
+    'مؤكد': 'confirmed',
+    'منجز': 'completed',
+    'ملغي': 'cancelled',
+}
+
+
+def normalize_status(status):
+    return STATUS_ALIASES.get(status, status)
+
+
+def status_variants(status):
+    """كل القيم المخزنة المكافئة لحالة ما (الإنجليزية ومرادفها العربي)."""
+    canonical = normalize_status(status)
+    return [canonical] + [ar for ar, en in STATUS_ALIASES.items() if en == canonical]
+
+
+class Appointment(LoadedValuesMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'pending'),
         ('confirmed', 'confirmed'),
@@ -23,6 +43,16 @@ class Appointment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     reason = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # مزامنة الأجهزة: keyset على (updated_at, id)
+            models.Index(fields=["updated_at", "id"], name="appointment_sync_idx"),
+        ]
 
     def __str__(self):
         return f"Appointment for {self.patient} with {self.doctor} on {self.date} at {self.time}"
+
+    # الحقول التي تحدد خانة الموعد في الإحصاءات اليومية؛ قيمها القديمة من _loaded_values (LoadedValuesMixin)
+    TRACKED_FIELDS = ("date", "doctor_id", "status")
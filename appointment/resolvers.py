@@ -0,0 +1,74 @@
+import difflib
+
+from django.db import connection
+from django.db.models import F
+
+from accounts.models import Doctor
+from core.text import normalize_name
+from patients.models import Patient
+
+
+# =====================================================================
+# تحويل الاسم المكتوب عند الحجز إلى طبيب/مريض
+#   1) مطابقة تامة على normalized_name (فهرس btree)
+#   2) وإلا مرشحون مرتبون بالتشابه: trigram على PostgreSQL (فهرس GIN)،
+#      وعلى قواعد أخرى icontains لكل كلمة + difflib
+# =====================================================================
+CANDIDATE_LIMIT = 5
+MIN_SIMILARITY = 0.3
+
+
+def _ranked(queryset, field, key, limit):
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return [
+            (row, round(row.pop("score"), 3))
+            for row in queryset.filter(**{f"{field}__trigram_similar": key})
+            .annotate(score=TrigramSimilarity(field, key))
+            .filter(score__gte=MIN_SIMILARITY)
+            .order_by("-score")[:limit]
+        ]
+
+    for word in key.split():
+        queryset = queryset.filter(**{f"{field}__icontains": word})
+    rows = [
+        (row, round(difflib.SequenceMatcher(None, key, row["key"]).ratio(), 3))
+        for row in queryset[:200]
+    ]
+    rows.sort(key=lambda r: -r[1])
+    return rows[:limit]
+
+
+def _resolve(queryset, field, name, limit):
+    """يعيد (الكائن المطابق أو None، قائمة المرشحين [{id, name, score}])."""
+    key = normalize_name(name)
+    if not key:
+        return None, []
+    rows = queryset.values("id", "display_first", "display_last", key=F(field))
+
+    exact = list(rows.filter(**{field: key})[:2])
+    if len(exact) == 1:
+        return exact[0]["id"], [_candidate(exact[0], 1.0)]
+    if exact:
+        # أكثر من تطابق تام (اسمان متطابقان): يجب الاختيار بالمعرّف
+        return None, [_candidate(row, 1.0) for row in rows.filter(**{field: key})[:limit]]
+    return None, [_candidate(row, score) for row, score in _ranked(rows, field, key, limit)]
+
+
+def _candidate(row, score):
+    return {
+        "id": row["id"],
+        "name": f"{row['display_first']} {row['display_last']}".strip(),
+        "score": score,
+    }
+
+
+def resolve_doctor(name, limit=CANDIDATE_LIMIT):
+    qs = Doctor.objects.annotate(display_first=F("user__first_name"), display_last=F("user__last_name"))
+    return _resolve(qs, "user__normalized_name", name, limit)
+
+
+def resolve_patient(name, limit=CANDIDATE_LIMIT):
+    qs = Patient.objects.annotate(display_first=F("first_name"), display_last=F("last_name"))
+    return _resolve(qs, "normalized_name", name, limit)
@@ -1,11 +1,10 @@
 from rest_framework import serializers
-from django.db.models import Value as V
-from django.db.models.functions import Concat
 from django.db.models import Q
 from datetime import date ,datetime,time 
 from .models import Appointment
 from patients.models import Patient
 from accounts.models import Doctor
+from .resolvers import resolve_doctor, resolve_patient
 
 class FlexibleTimeField(serializers.TimeField):
     def to_internal_value(self, value):
@@ -53,6 +52,16 @@ class FlexibleTimeField(serializers.TimeField):
     def to_representation(self, value):
         return value.strftime("%I:%M %p")  # مثال: 02:30 PM
 
+def name_error(label, candidates):
+    """رسالة خطأ الاسم مع المرشحين الأقرب (إن وُجدوا) ليختار العميل بالمعرّف."""
+    if not candidates:
+        return f"{label} غير موجود."
+    return {
+        "detail": f"{label} غير محدد بدقة؛ اختر أحد المرشحين.",
+        "candidates": [{**c, "id": str(c["id"])} for c in candidates],
+    }
+
+
 class AppointmentSerializer(serializers.ModelSerializer):
     time = FlexibleTimeField()
     patient_name = serializers.CharField(write_only=True, required=False)
@@ -86,13 +95,11 @@ class AppointmentSerializer(serializers.ModelSerializer):
         doctor = data.get('doctor')
         doctor_name = self.initial_data.get('doctor_name')
         if not doctor and doctor_name:
-            try:
-                doctor = Doctor.objects.annotate(
-                    full_name=Concat('user__first_name', V(' '), 'user__last_name')
-                ).get(full_name__iexact=doctor_name.strip())
-                data['doctor'] = doctor
-            except Doctor.DoesNotExist:
-                errors['doctor_name'] = "اسم الطبيب غير موجود."
+            doctor_id, candidates = resolve_doctor(doctor_name)
+            if doctor_id:
+                doctor = data['doctor'] = Doctor.objects.select_related('user').get(pk=doctor_id)
+            else:
+                errors['doctor_name'] = name_error("اسم الطبيب", candidates)
 
         if not doctor:
             errors['doctor'] = "يجب تحديد الطبيب إما عبر ID أو الاسم."
@@ -101,15 +108,11 @@ class AppointmentSerializer(serializers.ModelSerializer):
         patient = data.get('patient')
         patient_name = self.initial_data.get('patient_name')
         if not patient and patient_name:
-            try:
-                first, last = patient_name.strip().split(" ", 1)
-                patient = Patient.objects.get(
-                    first_name__iexact=first.strip(),
-                    last_name__iexact=last.strip()
-                )
-                data['patient'] = patient
-            except Patient.DoesNotExist:
-                errors['patient_name'] = "اسم المريض غير موجود."
+            patient_id, candidates = resolve_patient(patient_name)
+            if patient_id:
+                patient = data['patient'] = Patient.objects.get(pk=patient_id)
+            else:
+                errors['patient_name'] = name_error("اسم المريض", candidates)
 
         if not patient:
             errors['patient'] = "يجب تحديد المريض إما عبر ID أو الاسم."
@@ -141,6 +144,7 @@ class AppointmentSerializer(serializers.ModelSerializer):
                 active_statuses = ['مؤكد', 'معلق']
                 if Appointment.objects.filter(
                     Q(date__gt=date_) | Q(date=date_, time__gt=time_),
+                    date__gte=date_,  # نطاق صريح على date: على الجدول المقسّم تُستبعد الأشهر السابقة
                     patient=patient,
                     status__in=active_statuses
                 ).exclude(id=getattr(self.instance, 'id', None)).exists():
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .board import bump_board
+from .models import Appointment
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_day_board(sender, instance, **kwargs):
+    # اليوم الجديد واليوم القديم (عند نقل الموعد ليوم آخر)
+    old = getattr(instance, "_loaded_values", {}).get("date")
+    bump_board(instance.__dict__.get("date"), old)
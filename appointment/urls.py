@@ -8,6 +8,8 @@ urlpatterns = [
     path('detailsapp/<int:id>/', views.AppointmentDetailAPIView.as_view(), name='appointment-detail'),
     path('update/<int:id>/', views.AppointmentUpdateAPIView.as_view(), name='update-appointment'),
     path('today/', views.TodayAppointmentsAPIView.as_view(), name='today-appointments'),
+    path('day-board/', views.DayBoardAPIView.as_view(), name='day-board'),
+    path('resolve-name/', views.ResolveNameAPIView.as_view(), name='resolve-name'),
     path('status-update/<int:id>/', views.AppointmentStatusUpdateAPIView.as_view(), name='appointment-status-update'),
     path('last-appointment-patient/<uuid:patient_id>/',views.LastAppointmentByPatientAPIView.as_view(), name='last-appointment-by-patient'),
 ]
\ No newline at end of file
@@ -2,9 +2,15 @@ from django.shortcuts import render
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, permissions
 from rest_framework.views import APIView
+import uuid
+
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
 from .models import Appointment
 from .serializers import AppointmentSerializer, AppointmentStatusUpdateSerializer
-from datetime import date
+from .board import get_board
+from .resolvers import resolve_doctor, resolve_patient
+from core.utils import clinic_today
 from rest_framework import status
 from rest_framework.response import Response
 # Create your views here.
@@ -18,7 +24,13 @@ class AppointmentListAPIView(generics.ListAPIView):
     queryset = Appointment.objects.all().order_by('-date', '-time')
     serializer_class = AppointmentSerializer
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['doctor', 'patient', 'date', 'status']
+    # date__gte/date__lte: نطاق (هذا الأسبوع...) على عمود التقسيم فلا تُقرأ إلا أقسام أشهره
+    filterset_fields = {
+        'doctor': ['exact'],
+        'patient': ['exact'],
+        'date': ['exact', 'gte', 'lte'],
+        'status': ['exact'],
+    }
     # permission_classes = [permissions.IsAuthenticated]
 
 class AppointmentUpdateAPIView(generics.RetrieveUpdateAPIView):
@@ -36,8 +48,67 @@ class TodayAppointmentsAPIView(generics.ListAPIView):
     serializer_class = AppointmentSerializer
 
     def get_queryset(self):
-        today = date.today()
-        return Appointment.objects.filter(date=today).order_by('time')
+        # "اليوم" بتوقيت العيادة وليس توقيت الخادم
+        return (Appointment.objects
+                .filter(date=clinic_today())
+                .select_related('patient', 'doctor__user')
+                .order_by('time'))
+
+
+class DayBoardAPIView(APIView):
+    """
+    لوحة اليوم للاستقبال (مجمّعة حسب الطبيب):
+    GET /api/appointment/day-board/?date=YYYY-MM-DD&doctor=<uuid>&doctor=<uuid>&status=pending&status=confirmed
+    - date افتراضيًا اليوم بتوقيت العيادة
+    - status يقبل الإنجليزية أو العربية (منجز = completed)
+    - يدعم If-None-Match: إذا لم تتغير اللوحة يُرجع 304 بدون جسم
+    """
+    VALID_STATUSES = {choice for choice, _ in Appointment.STATUS_CHOICES}
+
+    def get(self, request):
+        raw_date = request.query_params.get('date')
+        day = parse_date(raw_date) if raw_date else clinic_today()
+        if day is None:
+            raise ValidationError({"date": "صيغة التاريخ YYYY-MM-DD."})
+
+        doctor_ids = []
+        for value in request.query_params.getlist('doctor'):
+            try:
+                doctor_ids.append(uuid.UUID(value))
+            except ValueError:
+                raise ValidationError({"doctor": f"معرّف طبيب غير صالح: {value}"})
+
+        statuses = request.query_params.getlist('status')
+        invalid = [s for s in statuses if s not in self.VALID_STATUSES]
+        if invalid:
+            raise ValidationError({"status": f"حالات غير معروفة: {', '.join(invalid)}"})
+
+        board = get_board(day, doctor_ids, statuses)
+        etag = f'"{board["etag"]}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(board, headers=headers)
+class ResolveNameAPIView(APIView):
+    """
+    اقتراح الطبيب/المريض من اسم مكتوب (نموذج الحجز):
+    GET /api/appointment/resolve-name/?kind=patient|doctor&q=احمد علي
+    - match: المعرّف عند وجود تطابق وحيد بعد توحيد الاسم (الهمزات/التاء المربوطة/التشكيل)
+    - candidates: الأقرب مرتبين حسب التشابه
+    """
+    RESOLVERS = {"doctor": resolve_doctor, "patient": resolve_patient}
+
+    def get(self, request):
+        kind = request.query_params.get('kind', 'patient')
+        if kind not in self.RESOLVERS:
+            raise ValidationError({"kind": "القيم المسموحة: patient أو doctor."})
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            raise ValidationError({"q": "الاسم مطلوب."})
+        match, candidates = self.RESOLVERS[kind](query)
+        return Response({"match": match, "candidates": candidates})
+
+
 class AppointmentStatusUpdateAPIView(generics.UpdateAPIView):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentStatusUpdateSerializer
@@ -1,3 +1,76 @@
 from django.contrib import admin
 
-# Register your models here.
+from core.admin_mixins import ClinicAdminMixin
+
+from .models import DoctorSettlement, Invoice, InvoiceLine, LedgerEntry, Payment, PatientBalance
+
+
+class InvoiceLineInline(admin.TabularInline):
+    model = InvoiceLine
+    extra = 0
+    readonly_fields = ["exam_item", "procedure", "description", "quantity", "unit_price", "discount_percent", "line_total"]
+    can_delete = False
+
+
+class PaymentInline(admin.TabularInline):
+    model = Payment
+    extra = 0
+    readonly_fields = ["amount", "method", "reference", "received_by", "received_at"]
+    can_delete = False
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["number", "patient", "doctor", "status", "issued_on", "total", "amount_paid"]
+    list_filter = ["status", "issued_on"]
+    search_fields = ["number", "patient__first_name", "patient__last_name"]
+    list_select_related = ["patient", "doctor__user"]
+    raw_id_fields = ["patient", "doctor", "appointment", "clinical_exam", "created_by"]
+    inlines = [InvoiceLineInline, PaymentInline]
+
+
+@admin.register(Payment)
+class PaymentAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["invoice", "patient", "amount", "method", "received_at"]
+    list_filter = ["method", "received_at"]
+    search_fields = ["invoice__number", "reference", "patient__first_name", "patient__last_name"]
+    list_select_related = ["invoice", "patient"]
+    raw_id_fields = ["invoice", "patient", "received_by"]
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["patient", "entry_type", "amount", "balance_after", "invoice", "created_at"]
+    list_filter = ["entry_type", "created_at"]
+    search_fields = ["patient__first_name", "patient__last_name", "invoice__number"]
+    list_select_related = ["patient", "invoice"]
+
+    # الدفتر إضافة فقط
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PatientBalance)
+class PatientBalanceAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["patient", "balance", "total_billed", "total_paid", "updated_at"]
+    search_fields = ["patient__first_name", "patient__last_name"]
+    list_select_related = ["patient"]
+    readonly_fields = ["patient", "balance", "total_billed", "total_paid", "updated_at"]
+
+
+@admin.register(DoctorSettlement)
+class DoctorSettlementAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["doctor", "period_start", "period_end", "gross", "revenue_share", "share_amount", "finalized_at"]
+    list_filter = ["period_start", "period_end"]
+    search_fields = ["doctor__user__first_name", "doctor__user__last_name"]
+    list_select_related = ["doctor__user"]
+
+    # اللقطات المجمّدة للقراءة فقط
+    def has_change_permission(self, request, obj=None):
+        return False
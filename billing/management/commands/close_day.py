@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from billing.services import generate_invoices_for_day
+from core.utils import clinic_today
+
+
+class Command(BaseCommand):
+    help = "Generate invoices for all completed, uninvoiced appointments of a day (default: today)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        day = clinic_today()
+        if options["date"]:
+            day = parse_date(options["date"])
+            if day is None:
+                raise CommandError("Invalid --date, expected YYYY-MM-DD")
+
+        invoices = generate_invoices_for_day(day)
+        total = sum((inv.total for inv in invoices), 0)
+        self.stdout.write(self.style.SUCCESS(f"{day}: {len(invoices)} invoices created, total {total}"))
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_alter_doctor_user'),
+        ('billing', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorSettlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(verbose_name='Period Start')),
+                ('period_end', models.DateField(verbose_name='Period End')),
+                ('items_count', models.PositiveIntegerField(default=0, verbose_name='Exam Items')),
+                ('items_gross', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Exam Items Gross')),
+                ('procedures_count', models.PositiveIntegerField(default=0, verbose_name='Procedure Teeth')),
+                ('procedures_gross', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Procedures Gross')),
+                ('gross', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Gross')),
+                ('revenue_share', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Revenue Share %')),
+                ('share_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Doctor Share')),
+                ('finalized_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Finalized At')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='settlements', to='accounts.doctor', verbose_name='Doctor')),
+                ('finalized_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Doctor Settlement',
+                'verbose_name_plural': 'Doctor Settlements',
+                'ordering': ['-period_start', 'doctor_id'],
+                'indexes': [models.Index(fields=['period_start', 'period_end'], name='settlement_period_idx')],
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'period_start', 'period_end'), name='uniq_doctor_settlement_period'), models.CheckConstraint(condition=models.Q(('period_end__gte', models.F('period_start'))), name='settlement_period_valid')],
+            },
+        ),
+    ]
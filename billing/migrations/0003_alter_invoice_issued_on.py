@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:49
+
+import core.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_doctorsettlement'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invoice',
+            name='issued_on',
+            field=models.DateField(default=core.utils.clinic_today, verbose_name='Issued On'),
+        ),
+    ]
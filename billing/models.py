@@ -1,3 +1,212 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from accounts.models import CustomUser, Doctor
+from appointment.models import Appointment
+from core.utils import clinic_today
+from patients.models import Patient
+
+
+# --------------------------------------------------------------------
+# Invoice: فاتورة المريض (غالبًا فاتورة واحدة لكل فحص سريري)
+# --------------------------------------------------------------------
+class Invoice(models.Model):
+    class Status(models.TextChoices):
+        ISSUED = "issued", _("Issued")
+        PARTIALLY_PAID = "partially_paid", _("Partially Paid")
+        PAID = "paid", _("Paid")
+        CANCELLED = "cancelled", _("Cancelled")
+
+    number = models.CharField(max_length=40, unique=True, verbose_name=_("Invoice Number"))
+    patient = models.ForeignKey(Patient, on_delete=models.PROTECT, related_name="invoices", verbose_name=_("Patient"))
+    doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, blank=True, related_name="invoices", verbose_name=_("Doctor"))
+    appointment = models.ForeignKey(
+        Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name="invoices", verbose_name=_("Appointment")
+    )
+    # فريد: لا تُصدر فاتورتان لنفس الفحص (يجعل إغلاق اليوم آمنًا عند التكرار)
+    clinical_exam = models.OneToOneField(
+        "procedures.ClinicalExam", on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="invoice", verbose_name=_("Clinical Exam"),
+    )
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.ISSUED, verbose_name=_("Status"))
+    issued_on = models.DateField(default=clinic_today, verbose_name=_("Issued On"))
+
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name=_("Subtotal"))
+    discount_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name=_("Discount"))
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name=_("Total"))
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name=_("Amount Paid"))
+
+    notes = models.TextField(blank=True, null=True, verbose_name=_("Notes"))
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Invoice")
+        verbose_name_plural = _("Invoices")
+        ordering = ["-issued_on", "-id"]
+        indexes = [
+            models.Index(fields=["patient", "-issued_on"], name="invoice_patient_issued_idx"),
+            models.Index(fields=["status", "issued_on"], name="invoice_status_issued_idx"),
+            models.Index(fields=["issued_on"], name="invoice_issued_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.number} - {self.patient}"
+
+    @property
+    def balance_due(self):
+        return self.total - self.amount_paid
+
+
+# --------------------------------------------------------------------
+# InvoiceLine: سطر فاتورة؛ يُولَّد من ClinicalExamItem (إجراء × سن) أو Procedure
+# --------------------------------------------------------------------
+class InvoiceLine(models.Model):
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name="lines", verbose_name=_("Invoice"))
+    exam_item = models.ForeignKey(
+        "procedures.ClinicalExamItem", on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="invoice_lines", verbose_name=_("Exam Item"),
+    )
+    procedure = models.ForeignKey(
+        "procedures.Procedure", on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="invoice_lines", verbose_name=_("Procedure"),
+    )
+    description = models.CharField(max_length=255, verbose_name=_("Description"))
+    quantity = models.PositiveIntegerField(default=1, verbose_name=_("Quantity"))
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name=_("Unit Price"))
+    discount_percent = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name=_("Discount %"))
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, verbose_name=_("Line Total"))
+
+    class Meta:
+        verbose_name = _("Invoice Line")
+        verbose_name_plural = _("Invoice Lines")
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.description} x{self.quantity}"
+
+
+# --------------------------------------------------------------------
+# Payment: دفعة على فاتورة
+# --------------------------------------------------------------------
+class Payment(models.Model):
+    class Method(models.TextChoices):
+        CASH = "cash", _("Cash")
+        CARD = "card", _("Card")
+        TRANSFER = "transfer", _("Bank Transfer")
+        OTHER = "other", _("Other")
+
+    invoice = models.ForeignKey(Invoice, on_delete=models.PROTECT, related_name="payments", verbose_name=_("Invoice"))
+    patient = models.ForeignKey(Patient, on_delete=models.PROTECT, related_name="payments", verbose_name=_("Patient"))
+    amount = models.DecimalField(max_digits=12, decimal_places=2, verbose_name=_("Amount"))
+    method = models.CharField(max_length=20, choices=Method.choices, default=Method.CASH, verbose_name=_("Method"))
+    reference = models.CharField(max_length=100, blank=True, null=True, verbose_name=_("Reference"))
+    received_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    received_at = models.DateTimeField(default=timezone.now, verbose_name=_("Received At"))
+
+    class Meta:
+        verbose_name = _("Payment")
+        verbose_name_plural = _("Payments")
+        ordering = ["-received_at"]
+        indexes = [
+            models.Index(fields=["patient", "-received_at"], name="payment_patient_received_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.amount} ({self.get_method_display()}) - {self.invoice.number}"
+
+
+# --------------------------------------------------------------------
+# LedgerEntry: دفتر الحسابات (إضافة فقط، لا تعديل ولا حذف)
+# المبلغ موجب للمستحقات (فاتورة) وسالب للمدفوعات؛ balance_after رصيد المريض بعد القيد
+# --------------------------------------------------------------------
+class LedgerEntry(models.Model):
+    class EntryType(models.TextChoices):
+        CHARGE = "charge", _("Charge")
+        PAYMENT = "payment", _("Payment")
+        ADJUSTMENT = "adjustment", _("Adjustment")
+
+    patient = models.ForeignKey(Patient, on_delete=models.PROTECT, related_name="ledger_entries", verbose_name=_("Patient"))
+    invoice = models.ForeignKey(Invoice, on_delete=models.PROTECT, null=True, blank=True, related_name="ledger_entries")
+    payment = models.OneToOneField(Payment, on_delete=models.PROTECT, null=True, blank=True, related_name="ledger_entry")
+    entry_type = models.CharField(max_length=20, choices=EntryType.choices, verbose_name=_("Entry Type"))
+    amount = models.DecimalField(max_digits=12, decimal_places=2, verbose_name=_("Amount"))
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2, verbose_name=_("Balance After"))
+    description = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name=_("Created At"))
+
+    class Meta:
+        verbose_name = _("Ledger Entry")
+        verbose_name_plural = _("Ledger Entries")
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["patient", "-created_at", "-id"], name="ledger_patient_created_idx"),
+            models.Index(fields=["created_at"], name="ledger_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} {self.amount} - {self.patient}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError("قيود الدفتر لا تُعدّل؛ أضف قيد تسوية بدلًا من ذلك.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("قيود الدفتر لا تُحذف؛ أضف قيد تسوية بدلًا من ذلك.")
+
+
+# --------------------------------------------------------------------
+# PatientBalance: الرصيد الجاري لكل مريض (يُحدَّث مع كل قيد) حتى لا نجمع الدفتر كاملًا
+# --------------------------------------------------------------------
+class PatientBalance(models.Model):
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, primary_key=True, related_name="balance")
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"), verbose_name=_("Balance"))
+    total_billed = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"), verbose_name=_("Total Billed"))
+    total_paid = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"), verbose_name=_("Total Paid"))
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Patient Balance")
+        verbose_name_plural = _("Patient Balances")
+
+    def __str__(self):
+        return f"{self.patient}: {self.balance}"
+
+
+# --------------------------------------------------------------------
+# DoctorSettlement: لقطة نهائية لمستحقات طبيب عن فترة (تُحسب في SQL ثم تُجمَّد)
+# --------------------------------------------------------------------
+class DoctorSettlement(models.Model):
+    doctor = models.ForeignKey(Doctor, on_delete=models.PROTECT, related_name="settlements", verbose_name=_("Doctor"))
+    period_start = models.DateField(verbose_name=_("Period Start"))
+    period_end = models.DateField(verbose_name=_("Period End"))
+
+    items_count = models.PositiveIntegerField(default=0, verbose_name=_("Exam Items"))
+    items_gross = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_("Exam Items Gross"))
+    procedures_count = models.PositiveIntegerField(default=0, verbose_name=_("Procedure Teeth"))
+    procedures_gross = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_("Procedures Gross"))
+    gross = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_("Gross"))
+    revenue_share = models.DecimalField(max_digits=5, decimal_places=2, verbose_name=_("Revenue Share %"))
+    share_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_("Doctor Share"))
+
+    finalized_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    finalized_at = models.DateTimeField(default=timezone.now, verbose_name=_("Finalized At"))
+
+    class Meta:
+        verbose_name = _("Doctor Settlement")
+        verbose_name_plural = _("Doctor Settlements")
+        ordering = ["-period_start", "doctor_id"]
+        constraints = [
+            models.UniqueConstraint(fields=["doctor", "period_start", "period_end"], name="uniq_doctor_settlement_period"),
+            models.CheckConstraint(check=models.Q(period_end__gte=models.F("period_start")), name="settlement_period_valid"),
+        ]
+        indexes = [models.Index(fields=["period_start", "period_end"], name="settlement_period_idx")]
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.doctor} {self.period_start} → {self.period_end}: {self.share_amount}"
@@ -0,0 +1,120 @@
+from rest_framework import serializers
+
+from procedures.models import ClinicalExam
+
+from .models import DoctorSettlement, Invoice, InvoiceLine, LedgerEntry, Payment
+
+
+# =====================================================================
+# الفواتير
+# =====================================================================
+class InvoiceLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InvoiceLine
+        fields = [
+            "id", "exam_item", "procedure", "description",
+            "quantity", "unit_price", "discount_percent", "line_total",
+        ]
+        read_only_fields = fields
+
+
+class InvoiceListSerializer(serializers.ModelSerializer):
+    patient_name = serializers.CharField(source="patient.full_name", read_only=True)
+    balance_due = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Invoice
+        fields = [
+            "id", "number", "patient", "patient_name", "doctor", "appointment", "clinical_exam",
+            "status", "issued_on", "subtotal", "discount_total", "total", "amount_paid", "balance_due",
+        ]
+        read_only_fields = fields
+
+
+class InvoiceSerializer(InvoiceListSerializer):
+    lines = InvoiceLineSerializer(many=True, read_only=True)
+
+    class Meta(InvoiceListSerializer.Meta):
+        fields = InvoiceListSerializer.Meta.fields + ["notes", "lines", "created_at", "updated_at"]
+        read_only_fields = fields
+
+
+class InvoiceFromExamSerializer(serializers.Serializer):
+    clinical_exam = serializers.PrimaryKeyRelatedField(queryset=ClinicalExam.objects.all())
+
+
+class CloseDaySerializer(serializers.Serializer):
+    date = serializers.DateField()
+
+
+# =====================================================================
+# الدفعات والدفتر
+# =====================================================================
+class PaymentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Payment
+        fields = ["id", "invoice", "patient", "amount", "method", "reference", "received_by", "received_at"]
+        read_only_fields = ["id", "invoice", "patient", "received_by", "received_at"]
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("المبلغ يجب أن يكون أكبر من صفر.")
+        return value
+
+
+class LedgerEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LedgerEntry
+        fields = ["id", "entry_type", "amount", "balance_after", "invoice", "payment", "description", "created_at"]
+        read_only_fields = fields
+
+
+class PatientBalanceSerializer(serializers.Serializer):
+    patient = serializers.UUIDField()
+    balance = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total_billed = serializers.DecimalField(max_digits=14, decimal_places=2)
+    total_paid = serializers.DecimalField(max_digits=14, decimal_places=2)
+    updated_at = serializers.DateTimeField(allow_null=True)
+
+
+# =====================================================================
+# تسوية الأطباء
+# =====================================================================
+class SettlementPeriodSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    doctor = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=True)
+
+    def validate(self, attrs):
+        if attrs["end"] < attrs["start"]:
+            raise serializers.ValidationError({"end": "نهاية الفترة قبل بدايتها."})
+        return attrs
+
+
+class SettlementReportRowSerializer(serializers.Serializer):
+    """صف محسوب مباشرة من settlement_queryset (values)."""
+    doctor = serializers.UUIDField()
+    doctor_name = serializers.SerializerMethodField()
+    items_count = serializers.IntegerField()
+    items_gross = serializers.DecimalField(max_digits=14, decimal_places=2)
+    procedures_count = serializers.IntegerField()
+    procedures_gross = serializers.DecimalField(max_digits=14, decimal_places=2)
+    gross = serializers.DecimalField(max_digits=14, decimal_places=2)
+    revenue_share = serializers.DecimalField(max_digits=5, decimal_places=2)
+    share_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+    def get_doctor_name(self, row):
+        return f"{row['doctor_first_name']} {row['doctor_last_name']}".strip()
+
+
+class DoctorSettlementSerializer(serializers.ModelSerializer):
+    doctor_name = serializers.CharField(source="doctor.get_full_name", read_only=True)
+
+    class Meta:
+        model = DoctorSettlement
+        fields = [
+            "id", "doctor", "doctor_name", "period_start", "period_end",
+            "items_count", "items_gross", "procedures_count", "procedures_gross",
+            "gross", "revenue_share", "share_amount", "finalized_by", "finalized_at",
+        ]
+        read_only_fields = fields
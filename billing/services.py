@@ -0,0 +1,329 @@
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from appointment.models import Appointment
+from core.utils import clinic_today
+from procedures.estimates import DISCOUNT_PERCENT, MONEY, NET_PRICE, UNIT_PRICE
+from procedures.models import ClinicalExamItem, Procedure
+
+from .models import Invoice, InvoiceLine, LedgerEntry, Payment, PatientBalance
+
+
+# =====================================================================
+# محرك الفوترة
+# - الأسعار تُحسب داخل SQL بنفس تعابير التقدير (procedures.estimates)
+# - الرصيد الجاري في PatientBalance يُحدَّث بـ upsert ذرّي (balance = balance + delta)
+# - الدفتر LedgerEntry إضافة فقط؛ كل قيد يحمل الرصيد بعده
+# =====================================================================
+CENTS = Decimal("0.01")
+ZERO = Decimal("0")
+
+# الحالة "منجز" موجودة بالإنجليزية والعربية في Appointment.STATUS_CHOICES
+COMPLETED_STATUSES = ("completed", "منجز")
+
+PROCEDURE_PRICE = Coalesce(
+    "cost", "definition__default_price", Value(ZERO, output_field=MONEY), output_field=MONEY,
+)
+
+
+def _money(value):
+    return (value or ZERO).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def invoice_number(day, exam_id):
+    # رقم حتمي لكل فحص: إعادة إغلاق اليوم لا تولّد أرقامًا جديدة
+    return f"INV-{day:%Y%m%d}-{exam_id}"
+
+
+def _invoice_status(total, paid):
+    if paid <= ZERO:
+        return Invoice.Status.ISSUED
+    if paid >= total:
+        return Invoice.Status.PAID
+    return Invoice.Status.PARTIALLY_PAID
+
+
+# ---------------------------------------------------------------------
+# الرصيد الجاري
+# ---------------------------------------------------------------------
+def apply_balance_deltas(deltas):
+    """
+    deltas: {patient_id: (billed, paid)}
+    upsert واحد متعدد الصفوف؛ يقفل صفوف الأرصدة حتى نهاية المعاملة (يسلسل الكتّاب لكل مريض)
+    ويعيد {patient_id: الرصيد الجديد}.
+    """
+    if not deltas:
+        return {}
+
+    table = connection.ops.quote_name(PatientBalance._meta.db_table)
+    patient_field = PatientBalance._meta.get_field("patient")
+    now = timezone.now()
+
+    rows, params = [], []
+    for patient_id, (billed, paid) in deltas.items():
+        rows.append("(%s, %s, %s, %s, %s)")
+        params += [
+            patient_field.get_db_prep_save(patient_id, connection),
+            billed - paid,
+            billed,
+            paid,
+            PatientBalance._meta.get_field("updated_at").get_db_prep_save(now, connection),
+        ]
+
+    sql = (
+        f"INSERT INTO {table} (patient_id, balance, total_billed, total_paid, updated_at) "
+        f"VALUES {', '.join(rows)} "
+        f"ON CONFLICT (patient_id) DO UPDATE SET "
+        f"balance = {table}.balance + EXCLUDED.balance, "
+        f"total_billed = {table}.total_billed + EXCLUDED.total_billed, "
+        f"total_paid = {table}.total_paid + EXCLUDED.total_paid, "
+        f"updated_at = EXCLUDED.updated_at "
+        f"RETURNING patient_id, balance"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        result = cursor.fetchall()
+
+    balance_field = PatientBalance._meta.get_field("balance")
+    return {
+        patient_field.to_python(pid): _money(balance_field.to_python(balance))
+        for pid, balance in result
+    }
+
+
+def get_patient_balance(patient_id):
+    row = (
+        PatientBalance.objects
+        .filter(patient_id=patient_id)
+        .values("balance", "total_billed", "total_paid", "updated_at")
+        .first()
+    )
+    return row or {"balance": ZERO, "total_billed": ZERO, "total_paid": ZERO, "updated_at": None}
+
+
+def _write_ledger(entries):
+    """
+    entries: قائمة LedgerEntry غير محفوظة (amount مُعبّأ)؛
+    يطبّق الفروقات على الأرصدة ثم يملأ balance_after لكل قيد بالترتيب ويحفظها دفعة واحدة.
+    """
+    deltas = defaultdict(lambda: [ZERO, ZERO])
+    for entry in entries:
+        if entry.amount >= ZERO:
+            deltas[entry.patient_id][0] += entry.amount
+        else:
+            deltas[entry.patient_id][1] += -entry.amount
+
+    new_balances = apply_balance_deltas({pid: tuple(v) for pid, v in deltas.items()})
+
+    # الرصيد قبل هذه الدفعة من القيود = الرصيد الجديد - مجموع فروقاتها
+    running = {pid: new_balances[pid] - (billed - paid) for pid, (billed, paid) in deltas.items()}
+    for entry in entries:
+        running[entry.patient_id] += entry.amount
+        entry.balance_after = running[entry.patient_id]
+
+    return LedgerEntry.objects.bulk_create(entries)
+
+
+# ---------------------------------------------------------------------
+# توليد الفواتير
+# ---------------------------------------------------------------------
+def _lines_by_exam(exam_ids):
+    """استعلامان فقط لكل الفحوصات: عناصر الفحص + الإجراءات المنفّذة."""
+    lines = defaultdict(list)
+
+    items = (
+        ClinicalExamItem.objects
+        .filter(clinical_exam_id__in=exam_ids)
+        .annotate(unit_price=UNIT_PRICE, discount=DISCOUNT_PERCENT, net=NET_PRICE)
+        .values("id", "clinical_exam_id", "procedure__name", "toothcode__tooth_number", "unit_price", "discount", "net")
+        .order_by("clinical_exam_id", "id")
+    )
+    for row in items:
+        lines[row["clinical_exam_id"]].append(InvoiceLine(
+            exam_item_id=row["id"],
+            description=f"{row['procedure__name']} - {row['toothcode__tooth_number']}",
+            quantity=1,
+            unit_price=_money(row["unit_price"]),
+            discount_percent=_money(row["discount"]),
+            line_total=_money(row["net"]),
+        ))
+
+    procedures = (
+        Procedure.objects
+        .filter(clinical_exam_id__in=exam_ids)
+        .exclude(status="cancelled")
+        .annotate(price=PROCEDURE_PRICE)
+        .values("id", "clinical_exam_id", "name", "price")
+        .order_by("clinical_exam_id", "id")
+    )
+    for row in procedures:
+        price = _money(row["price"])
+        lines[row["clinical_exam_id"]].append(InvoiceLine(
+            procedure_id=row["id"],
+            description=row["name"],
+            quantity=1,
+            unit_price=price,
+            discount_percent=ZERO,
+            line_total=price,
+        ))
+
+    return lines
+
+
+def _build_invoices(exams, day, user=None):
+    """
+    exams: قائمة dict فيها exam_id, patient_id, doctor_id, appointment_id
+    ينشئ الفواتير وأسطرها وقيود الدفتر بعدد ثابت من الاستعلامات مهما كان عدد الفحوصات.
+    """
+    if not exams:
+        return []
+
+    lines_by_exam = _lines_by_exam([e["exam_id"] for e in exams])
+
+    invoices = []
+    for exam in exams:
+        lines = lines_by_exam.get(exam["exam_id"], [])
+        if not lines:
+            continue  # فحص بلا إجراءات لا يُفوتر
+        subtotal = sum((line.unit_price * line.quantity for line in lines), ZERO)
+        total = sum((line.line_total for line in lines), ZERO)
+        invoice = Invoice(
+            number=invoice_number(day, exam["exam_id"]),
+            patient_id=exam["patient_id"],
+            doctor_id=exam["doctor_id"],
+            appointment_id=exam["appointment_id"],
+            clinical_exam_id=exam["exam_id"],
+            issued_on=day,
+            subtotal=subtotal,
+            discount_total=subtotal - total,
+            total=total,
+            created_by=user if getattr(user, "is_authenticated", False) else None,
+        )
+        invoice._pending_lines = lines
+        invoices.append(invoice)
+
+    if not invoices:
+        return []
+
+    # PostgreSQL يعيد المفاتيح من bulk_create
+    Invoice.objects.bulk_create(invoices)
+
+    all_lines = []
+    for invoice in invoices:
+        for line in invoice._pending_lines:
+            line.invoice_id = invoice.pk
+            all_lines.append(line)
+        del invoice._pending_lines
+    InvoiceLine.objects.bulk_create(all_lines, batch_size=1000)
+
+    now = timezone.now()
+    _write_ledger([
+        LedgerEntry(
+            patient_id=invoice.patient_id,
+            invoice_id=invoice.pk,
+            entry_type=LedgerEntry.EntryType.CHARGE,
+            amount=invoice.total,
+            description=f"فاتورة {invoice.number}",
+            created_at=now,
+        )
+        for invoice in invoices
+    ])
+    return invoices
+
+
+def uninvoiced_exams(**filters):
+    return list(
+        Appointment.objects
+        .filter(clinical_exam__isnull=False, clinical_exam__invoice__isnull=True, **filters)
+        .values(
+            "patient_id", "doctor_id",
+            appointment_id=F("id"),
+            exam_id=F("clinical_exam__id"),
+        )
+        .order_by("time", "id")
+    )
+
+
+CONFLICT_RETRIES = 3
+
+
+@transaction.atomic
+def generate_invoices_for_day(day, user=None):
+    """
+    إغلاق اليوم: فاتورة لكل موعد منجز له فحص ولم يُفوتر بعد، في معاملة واحدة.
+    آمن عند التكرار: الفحوصات المفوترة مستبعدة، والقيد الفريد على clinical_exam يمنع التكرار المتزامن؛
+    إن سبقنا طلب متزامن إلى بعض الفحوصات يُعاد الحساب بدونها.
+    """
+    for attempt in range(CONFLICT_RETRIES):
+        exams = uninvoiced_exams(date=day, status__in=COMPLETED_STATUSES)
+        try:
+            with transaction.atomic():  # نقطة حفظ: التعارض لا يُفسد المعاملة الخارجية
+                return _build_invoices(exams, day, user=user)
+        except IntegrityError:
+            if attempt == CONFLICT_RETRIES - 1:
+                raise
+
+
+@transaction.atomic
+def invoice_for_exam(exam, user=None):
+    """فاتورة لفحص واحد (بنفس مسار إغلاق اليوم)؛ تعيد الفاتورة الموجودة إن سبق إصدارها."""
+    existing = Invoice.objects.filter(clinical_exam_id=exam.pk).first()
+    if existing:
+        return existing, False
+    exams = uninvoiced_exams(clinical_exam__id=exam.pk)
+    try:
+        with transaction.atomic():
+            invoices = _build_invoices(exams, clinic_today(), user=user)
+    except IntegrityError:
+        # طلب متزامن (أو إغلاق اليوم) أصدر فاتورة الفحص بعد قراءتنا
+        existing = Invoice.objects.filter(clinical_exam_id=exam.pk).first()
+        if existing is None:
+            raise
+        return existing, False
+    return (invoices[0] if invoices else None), bool(invoices)
+
+
+# ---------------------------------------------------------------------
+# الدفعات
+# ---------------------------------------------------------------------
+@transaction.atomic
+def record_payment(invoice_id, amount, method=Payment.Method.CASH, reference=None, user=None):
+    amount = _money(amount)
+    invoice = Invoice.objects.select_for_update().get(pk=invoice_id)
+    if invoice.status == Invoice.Status.CANCELLED:
+        raise ValueError("لا يمكن تسجيل دفعة على فاتورة ملغاة.")
+    if amount <= ZERO:
+        raise ValueError("المبلغ يجب أن يكون أكبر من صفر.")
+    if amount > invoice.balance_due:
+        raise ValueError(f"المبلغ أكبر من المتبقي على الفاتورة ({invoice.balance_due}).")
+
+    payment = Payment.objects.create(
+        invoice=invoice,
+        patient_id=invoice.patient_id,
+        amount=amount,
+        method=method,
+        reference=reference,
+        received_by=user if getattr(user, "is_authenticated", False) else None,
+    )
+
+    invoice.amount_paid = invoice.amount_paid + amount
+    invoice.status = _invoice_status(invoice.total, invoice.amount_paid)
+    invoice.save(update_fields=["amount_paid", "status", "updated_at"])
+
+    _write_ledger([
+        LedgerEntry(
+            patient_id=invoice.patient_id,
+            invoice_id=invoice.pk,
+            payment=payment,
+            entry_type=LedgerEntry.EntryType.PAYMENT,
+            amount=-amount,
+            description=f"دفعة على {invoice.number}",
+            created_at=payment.received_at,
+        )
+    ])
+    return payment, invoice
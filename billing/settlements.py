@@ -0,0 +1,141 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import Doctor
+from core.utils import clinic_day_bounds
+from procedures.estimates import MONEY, NET_PRICE
+from procedures.models import ClinicalExamItem, ProcedureToothcode
+
+from .models import DoctorSettlement
+
+
+# =====================================================================
+# تسوية مستحقات الأطباء
+# المصدران:
+#   - ClinicalExamItem.performed_by: كل عنصر بسعره الصافي (نفس تعبير التقدير والفاتورة)
+#   - ProcedureToothcode.performed_by: تكلفة الإجراء المنفّذ موزعة بالتساوي على أسنانه
+# الحصة = الإجمالي × revenue_share / 100، وكل ذلك داخل استعلام واحد مجمّع لكل طبيب.
+# =====================================================================
+CENTS = Decimal("0.01")
+ZERO = Value(0, output_field=MONEY)
+ZERO_INT = Value(0, output_field=IntegerField())
+
+# تكلفة الإجراء المنفّذ (أو سعر القاموس إن لم تُحدد)
+PROCEDURE_COST = Coalesce("procedure__cost", "procedure__definition__default_price", ZERO, output_field=MONEY)
+
+# عدد أسنان الإجراء نفسه (لتقسيم التكلفة دون احتساب مكرر)
+_TEETH_PER_PROCEDURE = (
+    ProcedureToothcode.objects
+    .filter(procedure=OuterRef("procedure"))
+    .order_by()
+    .values("procedure")
+    .annotate(n=Count("id"))
+    .values("n")
+)
+
+
+def _money(value):
+    return Decimal(value or 0).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _grouped(qs, value_expr, doctor_field="performed_by"):
+    """subquery مرتبط بالطبيب: (عدد، مجموع) في عمودين."""
+    grouped = qs.filter(**{doctor_field: OuterRef("pk")}).order_by().values(doctor_field)
+    count = Subquery(grouped.annotate(n=Count("id")).values("n"), output_field=IntegerField())
+    total = Subquery(grouped.annotate(s=Sum(value_expr)).values("s"), output_field=MONEY)
+    return Coalesce(count, ZERO_INT), Coalesce(total, ZERO)
+
+
+def settlement_queryset(start, end, doctor_ids=None):
+    """
+    صف لكل طبيب له نشاط في الفترة؛ كل الأرقام محسوبة في قاعدة البيانات.
+    يعيد values() (لا كائنات) وجاهز للتقرير أو للتجميد.
+    """
+    lo, hi = clinic_day_bounds(start, end)
+
+    items = ClinicalExamItem.objects.filter(created_at__gte=lo, created_at__lt=hi)
+    teeth = (
+        ProcedureToothcode.objects
+        .filter(performed_at__gte=lo, performed_at__lt=hi)
+        .exclude(procedure__status="cancelled")
+    )
+
+    items_count, items_gross = _grouped(items, NET_PRICE)
+    procedures_count, procedures_gross = _grouped(
+        teeth, ExpressionWrapper(PROCEDURE_COST / Subquery(_TEETH_PER_PROCEDURE), output_field=MONEY),
+    )
+
+    qs = Doctor.objects.all()
+    if doctor_ids:
+        qs = qs.filter(pk__in=doctor_ids)
+
+    return (
+        qs
+        .annotate(
+            items_count=items_count,
+            items_gross=items_gross,
+            procedures_count=procedures_count,
+            procedures_gross=procedures_gross,
+        )
+        .annotate(gross=ExpressionWrapper(F("items_gross") + F("procedures_gross"), output_field=MONEY))
+        .annotate(share_amount=ExpressionWrapper(F("gross") * F("revenue_share") / 100, output_field=MONEY))
+        .filter(Q(items_count__gt=0) | Q(procedures_count__gt=0))
+        .values(
+            "items_count", "items_gross", "procedures_count", "procedures_gross",
+            "gross", "revenue_share", "share_amount",
+            doctor=F("pk"),
+            doctor_first_name=F("user__first_name"),
+            doctor_last_name=F("user__last_name"),
+        )
+        .order_by("user__first_name", "user__last_name")
+    )
+
+
+@transaction.atomic
+def finalize_settlements(start, end, user=None, doctor_ids=None):
+    """
+    يجمّد أرقام الفترة كلقطات DoctorSettlement. اللقطة الموجودة لا تُستبدل (قيد فريد على الطبيب+الفترة).
+    يعيد (لقطات الفترة للأطباء المطلوبين (أو كلهم)، عدد ما أُدرج فعلًا الآن).
+    """
+    existing = set(
+        DoctorSettlement.objects
+        .filter(period_start=start, period_end=end)
+        .values_list("doctor_id", flat=True)
+    )
+    now = timezone.now()
+    rows = [r for r in settlement_queryset(start, end, doctor_ids) if r["doctor"] not in existing]
+    DoctorSettlement.objects.bulk_create(
+        [
+            DoctorSettlement(
+                doctor_id=r["doctor"],
+                period_start=start,
+                period_end=end,
+                items_count=r["items_count"],
+                items_gross=_money(r["items_gross"]),
+                procedures_count=r["procedures_count"],
+                procedures_gross=_money(r["procedures_gross"]),
+                gross=_money(r["gross"]),
+                revenue_share=r["revenue_share"],
+                share_amount=_money(r["share_amount"]),
+                finalized_by=user if getattr(user, "is_authenticated", False) else None,
+                finalized_at=now,
+            )
+            for r in rows
+        ],
+        ignore_conflicts=True,
+    )
+    snapshots = (
+        DoctorSettlement.objects
+        .filter(period_start=start, period_end=end)
+        .select_related("doctor__user")
+    )
+    if doctor_ids:
+        snapshots = snapshots.filter(doctor_id__in=doctor_ids)
+    snapshots = list(snapshots)
+    # ignore_conflicts لا يعيد ما تُخطّي (طلب متزامن جمّد نفس الطبيب)؛ المُنشأ الآن يحمل finalized_at هذا الاستدعاء
+    created = sum(1 for snap in snapshots if snap.finalized_at == now)
+    return snapshots, created
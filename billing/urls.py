@@ -3,5 +3,14 @@ from . import views
 
 
 urlpatterns = [
-    
-]
\ No newline at end of file
+    path("invoices/", views.InvoiceListAPIView.as_view(), name="invoice-list"),
+    path("invoices/from-exam/", views.InvoiceFromExamAPIView.as_view(), name="invoice-from-exam"),
+    path("invoices/<int:pk>/", views.InvoiceDetailAPIView.as_view(), name="invoice-detail"),
+    path("invoices/<int:pk>/payments/", views.InvoicePaymentCreateAPIView.as_view(), name="invoice-payment-create"),
+    path("close-day/", views.CloseDayAPIView.as_view(), name="billing-close-day"),
+    path("patients/<uuid:patient_id>/balance/", views.PatientBalanceAPIView.as_view(), name="patient-balance"),
+    path("patients/<uuid:patient_id>/ledger/", views.PatientLedgerAPIView.as_view(), name="patient-ledger"),
+    path("settlements/", views.DoctorSettlementListAPIView.as_view(), name="settlement-list"),
+    path("settlements/report/", views.SettlementReportAPIView.as_view(), name="settlement-report"),
+    path("settlements/finalize/", views.SettlementFinalizeAPIView.as_view(), name="settlement-finalize"),
+]
@@ -1,3 +1,194 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from accounts.permissions import Perm, require
+from patients.models import Patient
+
+from .models import DoctorSettlement, Invoice, LedgerEntry
+from .serializers import (
+    CloseDaySerializer,
+    DoctorSettlementSerializer,
+    InvoiceFromExamSerializer,
+    InvoiceListSerializer,
+    InvoiceSerializer,
+    LedgerEntrySerializer,
+    PatientBalanceSerializer,
+    PaymentSerializer,
+    SettlementPeriodSerializer,
+    SettlementReportRowSerializer,
+)
+from .services import generate_invoices_for_day, get_patient_balance, invoice_for_exam, record_payment
+from .settlements import finalize_settlements, settlement_queryset
+
+
+# الفواتير والدفعات والأرصدة: موظفو الفوترة (الاستقبال/المدير/الإدارة) فقط
+BILLING_PERMISSIONS = [permissions.IsAuthenticated, require(Perm.BILLING)]
+# مستحقات الأطباء (التقرير واللقطات وتجميدها): المدير أو الإدارة
+SETTLEMENT_PERMISSIONS = [permissions.IsAuthenticated, require(Perm.ADMIN | Perm.MANAGER)]
+
+
+class BillingPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+# =====================================================================
+# الفواتير
+# =====================================================================
+class InvoiceListAPIView(generics.ListAPIView):
+    """
+    ?patient=<uuid>&status=issued&issued_on=YYYY-MM-DD
+    """
+    permission_classes = BILLING_PERMISSIONS
+    serializer_class = InvoiceListSerializer
+    pagination_class = BillingPagination
+    filterset_fields = ["patient", "doctor", "status", "issued_on"]
+    queryset = Invoice.objects.select_related("patient")
+
+
+class InvoiceDetailAPIView(generics.RetrieveAPIView):
+    permission_classes = BILLING_PERMISSIONS
+    serializer_class = InvoiceSerializer
+    queryset = Invoice.objects.select_related("patient").prefetch_related("lines")
+
+
+class InvoiceFromExamAPIView(APIView):
+    permission_classes = BILLING_PERMISSIONS
+
+    def post(self, request):
+        s = InvoiceFromExamSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        invoice, created = invoice_for_exam(s.validated_data["clinical_exam"], user=request.user)
+        if invoice is None:
+            raise ValidationError({"clinical_exam": "لا توجد إجراءات قابلة للفوترة في هذا الفحص."})
+        invoice = Invoice.objects.select_related("patient").prefetch_related("lines").get(pk=invoice.pk)
+        return Response(
+            InvoiceSerializer(invoice).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class CloseDayAPIView(APIView):
+    """
+    POST {"date": "YYYY-MM-DD"} → فاتورة لكل موعد منجز لم يُفوتر بعد (معاملة واحدة).
+    """
+    permission_classes = BILLING_PERMISSIONS
+
+    def post(self, request):
+        s = CloseDaySerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        invoices = generate_invoices_for_day(s.validated_data["date"], user=request.user)
+        return Response({
+            "date": s.validated_data["date"],
+            "invoices_created": len(invoices),
+            "total": str(sum((inv.total for inv in invoices), 0)),
+            "invoices": [inv.number for inv in invoices],
+        }, status=status.HTTP_200_OK)
+
+
+# =====================================================================
+# الدفعات
+# =====================================================================
+class InvoicePaymentCreateAPIView(APIView):
+    permission_classes = BILLING_PERMISSIONS
+
+    def post(self, request, pk):
+        get_object_or_404(Invoice.objects.only("pk"), pk=pk)
+        s = PaymentSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        try:
+            payment, invoice = record_payment(
+                pk,
+                s.validated_data["amount"],
+                method=s.validated_data.get("method") or "cash",
+                reference=s.validated_data.get("reference"),
+                user=request.user,
+            )
+        except ValueError as e:
+            raise ValidationError({"amount": str(e)})
+        data = PaymentSerializer(payment).data
+        data["invoice_status"] = invoice.status
+        data["invoice_balance_due"] = str(invoice.balance_due)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+# =====================================================================
+# رصيد المريض ودفتره
+# =====================================================================
+class PatientBalanceAPIView(APIView):
+    """يُقرأ من الرصيد الجاري (صف واحد) وليس بجمع الدفتر."""
+    permission_classes = BILLING_PERMISSIONS
+
+    def get(self, request, patient_id):
+        if not Patient.objects.filter(pk=patient_id).exists():
+            return Response({"detail": "المريض غير موجود."}, status=status.HTTP_404_NOT_FOUND)
+        data = dict(get_patient_balance(patient_id), patient=patient_id)
+        return Response(PatientBalanceSerializer(data).data)
+
+
+class PatientLedgerAPIView(generics.ListAPIView):
+    """الأحدث أولًا؛ يستخدم الفهرس (patient, -created_at, -id)."""
+    permission_classes = BILLING_PERMISSIONS
+    serializer_class = LedgerEntrySerializer
+    pagination_class = BillingPagination
+
+    def get_queryset(self):
+        return LedgerEntry.objects.filter(patient_id=self.kwargs["patient_id"]).order_by("-created_at", "-id")
+
+
+# =====================================================================
+# تسوية مستحقات الأطباء
+# =====================================================================
+class SettlementReportAPIView(APIView):
+    """
+    GET ?start=YYYY-MM-DD&end=YYYY-MM-DD[&doctor=<uuid>...]
+    حساب حي في استعلام واحد مجمّع؛ لا تُحمّل عناصر الإجراءات إلى بايثون.
+    """
+    permission_classes = SETTLEMENT_PERMISSIONS
+
+    def get(self, request):
+        s = SettlementPeriodSerializer(data={
+            "start": request.query_params.get("start"),
+            "end": request.query_params.get("end"),
+            "doctor": request.query_params.getlist("doctor"),
+        })
+        s.is_valid(raise_exception=True)
+        start, end = s.validated_data["start"], s.validated_data["end"]
+        rows = settlement_queryset(start, end, s.validated_data.get("doctor"))
+        return Response({
+            "start": start,
+            "end": end,
+            "finalized": DoctorSettlement.objects.filter(period_start=start, period_end=end).exists(),
+            "results": SettlementReportRowSerializer(rows, many=True).data,
+        })
+
+
+class SettlementFinalizeAPIView(APIView):
+    """POST {"start", "end", "doctor": [..] اختياري} → تجميد اللقطات (اللقطات السابقة لا تتغير)."""
+    permission_classes = SETTLEMENT_PERMISSIONS
+
+    def post(self, request):
+        s = SettlementPeriodSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        snapshots, created = finalize_settlements(
+            s.validated_data["start"], s.validated_data["end"],
+            user=request.user, doctor_ids=s.validated_data.get("doctor"),
+        )
+        return Response(
+            {"created": created, "results": DoctorSettlementSerializer(snapshots, many=True).data},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class DoctorSettlementListAPIView(generics.ListAPIView):
+    """اللقطات المجمّدة: ?doctor=<uuid>&period_start=&period_end="""
+    permission_classes = SETTLEMENT_PERMISSIONS
+    serializer_class = DoctorSettlementSerializer
+    pagination_class = BillingPagination
+    filterset_fields = ["doctor", "period_start", "period_end"]
+    queryset = DoctorSettlement.objects.select_related("doctor__user")
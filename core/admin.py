@@ -1,3 +1,82 @@
 from django.contrib import admin
 
-# Register your models here.
+from .admin_mixins import ClinicAdminMixin
+from .models import (
+    AuditEvent,
+    ChangeLogEntry,
+    DailyAppointmentStat,
+    DailyPatientStat,
+    DailyPrescriptionStat,
+    DailyProcedureStat,
+    Tombstone,
+)
+
+
+@admin.register(DailyAppointmentStat)
+class DailyAppointmentStatAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["day", "doctor", "status", "count"]
+    list_filter = ["day", "status"]
+    list_select_related = ["doctor__user"]
+
+
+@admin.register(DailyPatientStat)
+class DailyPatientStatAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["day", "new_patients"]
+
+
+@admin.register(DailyProcedureStat)
+class DailyProcedureStatAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["day", "procedure", "count"]
+    list_filter = ["day"]
+    list_select_related = ["procedure"]
+
+
+@admin.register(DailyPrescriptionStat)
+class DailyPrescriptionStatAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["day", "medication", "count"]
+    list_filter = ["day"]
+    list_select_related = ["medication"]
+
+
+@admin.register(ChangeLogEntry)
+class ChangeLogEntryAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["id", "entity", "object_id", "action", "day", "created_at"]
+    list_filter = ["entity", "action", "day"]
+    search_fields = ["object_id"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["id", "entity", "object_id", "deleted_at"]
+    list_filter = ["entity"]
+    search_fields = ["object_id"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    # سجل إلحاقي: لا إضافة ولا تعديل ولا حذف من الأدمن
+    list_display = ["occurred_at", "entity", "object_id", "action", "actor_id", "patient_id"]
+    list_filter = ["entity", "action"]
+    search_fields = ["=object_id", "=patient_id", "=actor_id"]
+    date_hierarchy = "occurred_at"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+# =====================================================================
+# أداء صفحات القوائم في الأدمن
+#   - list_select_related لكل عمود/__str__ يمشي على FK (تحدده كل ModelAdmin)
+#   - list_annotations: أعمدة محسوبة (أعداد...) في استعلام الصفحة نفسه بدل استعلام لكل صف
+#   - show_full_result_count=False: لا COUNT(*) ثانٍ على الجدول كاملًا عند البحث/الفلترة
+#   - عدد تقديري من pg_class.reltuples للجداول الكبيرة غير المفلترة بدل COUNT(*) الدقيق
+#   - خيارات فلاتر FK بخطة select_related الخاصة بأدمن النموذج البعيد (__str__ الطبيب يمشي على user)
+# =====================================================================
+def estimated_count(model, using="default"):
+    """reltuples من آخر ANALYZE؛ None إن لم يكن PostgreSQL أو لم يُحلل الجدول بعد."""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    العدد الدقيق ما دام الاستعلام مفلترًا أو الجدول صغيرًا؛ وإلا التقدير
+    (الفرق بعد آخر autovacuum لا يهم في ترقيم الأدمن).
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if isinstance(qs, QuerySet) and not qs.query.where:
+            estimate = estimated_count(qs.model, qs.db)
+            if estimate is not None and estimate >= getattr(settings, "ADMIN_ESTIMATED_COUNT_THRESHOLD", 10000):
+                return estimate
+        return super().count
+
+
+class RelatedPlanListFilter(admin.RelatedFieldListFilter):
+    def field_choices(self, field, request, model_admin):
+        related_admin = model_admin.admin_site._registry.get(field.remote_field.model)
+        plan = getattr(related_admin, "list_select_related", False)
+        if not isinstance(plan, (list, tuple)) or not plan:
+            return super().field_choices(field, request, model_admin)
+        qs = field.remote_field.model._default_manager.select_related(*plan).complex_filter(
+            field.get_limit_choices_to()
+        )
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        if ordering:
+            qs = qs.order_by(*ordering)
+        return [(obj.pk, str(obj)) for obj in qs]
+
+
+class ClinicAdminMixin:
+    """يوضع قبل admin.ModelAdmin (أو UserAdmin) في كل أدمن مسجل."""
+    list_prefetch_related = ()
+    list_annotations = {}
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if self.list_annotations:
+            qs = qs.annotate(**self.list_annotations)
+        if self.list_prefetch_related:
+            qs = qs.prefetch_related(*self.list_prefetch_related)
+        return qs
+
+    def get_list_filter(self, request):
+        filters = []
+        for item in super().get_list_filter(request):
+            if isinstance(item, str):
+                try:
+                    field = self.model._meta.get_field(item)
+                except FieldDoesNotExist:
+                    field = None
+                if field is not None and (field.many_to_one or field.one_to_one):
+                    item = (item, RelatedPlanListFilter)
+            filters.append(item)
+        return filters
@@ -0,0 +1,281 @@
+import atexit
+import base64
+import binascii
+import json
+import logging
+import os
+import threading
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+
+# =====================================================================
+# سجل التدقيق: فروق الحقول لكل إنشاء/تعديل/حذف على النماذج المتتبعة (core/signals.py)
+#   - القيم القديمة من LoadedValuesMixin (core/tracking.py) فلا استعلام قبل الحفظ
+#   - الفاعل وعنوانه من الطلب الحالي (AuditRequestMiddleware)، مقروءًا عند الحدث حتى يشمل
+#     مستخدم JWT الذي يضبطه DRF بعد الـ middleware
+#   - الأحداث تُضاف بعد نجاح المعاملة إلى مخزن في الذاكرة، وخيط خلفي يكتبها دفعات
+#     (bulk_create) خارج مسار الطلب؛ AUDIT_SYNC_WRITES=True يكتبها فورًا عند الـ commit
+# الإدخال/التعديل الجماعي (bulk_create/bulk_update) يُسجَّل فقط حين يرسل كاتبه prescriptions_changed
+# أو exam_items_changed؛ QuerySet.update وbulk_create/bulk_update بلا هاتين الإشارتين لا تُسجَّل.
+# =====================================================================
+EXCLUDED_FIELDS = {"updated_at", "normalized_name", "name_key"}
+
+DEFAULT_QUERY_DAYS = 90
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+CURSOR_VERSION = 1
+
+Action = AuditEvent.Action
+
+_request = ContextVar("core_audit_request", default=None)
+
+
+def flush_interval():
+    return getattr(settings, "AUDIT_FLUSH_INTERVAL", 2)
+
+
+def batch_size():
+    return getattr(settings, "AUDIT_BATCH_SIZE", 500)
+
+
+def max_pending():
+    # أكثر من ذلك في الذاكرة (قاعدة بيانات بطيئة/متوقفة): يكتب الطلب نفسه بدل تراكم غير محدود
+    return getattr(settings, "AUDIT_MAX_PENDING", 20000)
+
+
+def sync_writes():
+    return getattr(settings, "AUDIT_SYNC_WRITES", False)
+
+
+# ---------------------------------------------------------------------
+# الفاعل
+# ---------------------------------------------------------------------
+def bind_request(request):
+    return _request.set(request)
+
+
+def unbind_request(token):
+    _request.reset(token)
+
+
+def current_actor():
+    """(actor_id, ip) للطلب الجاري أو (None, None) خارج الطلبات (أوامر الإدارة، المهام)."""
+    request = _request.get()
+    if request is None:
+        return None, None
+    user = getattr(request, "user", None)
+    actor_id = user.pk if user is not None and user.is_authenticated else None
+    return actor_id, request.META.get("REMOTE_ADDR") or None
+
+
+# ---------------------------------------------------------------------
+# الفروق
+# ---------------------------------------------------------------------
+def _plain(value):
+    if isinstance(value, FieldFile):
+        return value.name or None
+    return value
+
+
+def _fields(instance):
+    return [f.attname for f in instance._meta.concrete_fields if f.attname not in EXCLUDED_FIELDS]
+
+
+def current_values(instance):
+    data = instance.__dict__
+    # من __dict__ فقط: الحقول المؤجلة (defer) لا تُحمّل لأجل التدقيق
+    return {name: _plain(data[name]) for name in _fields(instance) if name in data}
+
+
+def diff(old, new, only=None):
+    names = [n for n in new if n in old] if only is None else [n for n in only if n in new and n in old]
+    return {name: [_plain(old[name]), new[name]] for name in names if _plain(old[name]) != new[name]}
+
+
+def build_event(entity, instance, action, patient_id=None, patient_via=None, update_fields=None):
+    """AuditEvent (غير محفوظ) أو None إذا لم يتغير شيء. patient_via: (النموذج، المعرّف) يُحل دفعة عند الكتابة."""
+    values = current_values(instance)
+    if action == Action.CREATED:
+        changes = {name: [None, value] for name, value in values.items() if value not in (None, "")}
+    elif action == Action.DELETED:
+        loaded = getattr(instance, "_loaded_values", None) or values
+        changes = {name: [_plain(value), None] for name, value in loaded.items()
+                   if name not in EXCLUDED_FIELDS and value not in (None, "")}
+    else:
+        only = None
+        if update_fields is not None:
+            only = [instance._meta.get_field(name).attname for name in update_fields]
+        changes = diff(getattr(instance, "_loaded_values", {}), values, only)
+        if not changes:
+            return None
+
+    actor_id, ip = current_actor()
+    event = AuditEvent(
+        occurred_at=timezone.now(),
+        entity=entity,
+        object_id=str(instance.pk),
+        action=action,
+        patient_id=patient_id,
+        actor_id=actor_id,
+        ip_address=ip,
+        changes=changes,
+    )
+    event._patient_via = patient_via if patient_id is None else None
+    return event
+
+
+# ---------------------------------------------------------------------
+# الكتابة
+# ---------------------------------------------------------------------
+def resolve_patients(events):
+    from medicalrecord.models import MedicalRecord
+    from procedures.models import ClinicalExam
+
+    sources = {"clinical_exam": ClinicalExam, "medical_record": MedicalRecord}
+    wanted = {}
+    for event in events:
+        via = getattr(event, "_patient_via", None)
+        if via and via[1] is not None:
+            wanted.setdefault(via[0], set()).add(via[1])
+    found = {
+        (name, pk): patient_id
+        for name, ids in wanted.items()
+        for pk, patient_id in sources[name].objects.filter(pk__in=ids).values_list("pk", "patient_id")
+    }
+    for event in events:
+        via = getattr(event, "_patient_via", None)
+        if via:
+            event.patient_id = found.get(via)
+            event._patient_via = None
+
+
+def write(events):
+    resolve_patients(events)
+    AuditEvent.objects.bulk_create(events, batch_size=batch_size())
+
+
+class AuditBuffer:
+    """مخزن لكل عملية مع خيط كتابة خلفي يُنشأ عند أول حدث (ومن جديد بعد fork)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    def add(self, events):
+        with self._lock:
+            self._pending.extend(events)
+            size = len(self._pending)
+        if size >= max_pending():
+            self.flush()
+            return
+        self._ensure_worker()
+        if size >= batch_size():
+            self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            write(batch)
+        except Exception:
+            logger.exception("audit: failed to write %d events; will retry", len(batch))
+            with self._lock:
+                self._pending[:0] = batch
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name="audit-writer", daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(flush_interval())
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.flush)
+
+
+def record(*events):
+    events = [e for e in events if e is not None]
+    if not events:
+        return
+    # بعد نجاح المعاملة فقط: التغيير الذي تراجعت عنه المعاملة لا يُسجَّل
+    transaction.on_commit(lambda: write(events) if sync_writes() else buffer.add(events))
+
+
+# ---------------------------------------------------------------------
+# القراءة: keyset على (occurred_at, id) داخل نافذة زمنية محدودة
+# النافذة تسمح لـ PostgreSQL بتجاهل الأقسام خارجها (partition pruning)
+# ---------------------------------------------------------------------
+class InvalidAuditCursor(ValueError):
+    pass
+
+
+def encode_cursor(occurred_at, pk):
+    raw = json.dumps({"v": CURSOR_VERSION, "at": occurred_at.isoformat(), "id": pk}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise InvalidAuditCursor("مؤشر غير صالح.")
+    if not isinstance(payload, dict) or payload.get("v") != CURSOR_VERSION:
+        raise InvalidAuditCursor("مؤشر غير صالح.")
+    at = parse_datetime(payload["at"]) if isinstance(payload.get("at"), str) else None
+    if at is None or timezone.is_naive(at) or not isinstance(payload.get("id"), int):
+        raise InvalidAuditCursor("مؤشر غير صالح.")
+    return at, payload["id"]
+
+
+def query_events(since, until, patient_id=None, actor_id=None, entity=None, object_id=None,
+                 cursor=None, limit=DEFAULT_LIMIT):
+    """{"results": [...], "next": مؤشر أو None}؛ الأحدث أولًا."""
+    qs = AuditEvent.objects.filter(occurred_at__gte=since, occurred_at__lt=until)
+    if patient_id:
+        qs = qs.filter(patient_id=patient_id)
+    if actor_id:
+        qs = qs.filter(actor_id=actor_id)
+    if entity:
+        qs = qs.filter(entity=entity)
+    if object_id:
+        qs = qs.filter(object_id=object_id)
+    if cursor:
+        at, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(occurred_at__lt=at) | Q(occurred_at=at, id__lt=pk))
+
+    rows = list(
+        qs.order_by("-occurred_at", "-id").values(
+            "id", "occurred_at", "entity", "object_id", "action", "patient_id", "actor_id", "ip_address", "changes",
+        )[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "results": rows,
+        "next": encode_cursor(rows[-1]["occurred_at"], rows[-1]["id"]) if has_more else None,
+    }
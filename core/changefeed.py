@@ -0,0 +1,204 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
+
+from .models import ChangeLogEntry
+from .utils import clinic_date
+
+
+# =====================================================================
+# Change feed: كل تغيير على المواعيد/الفحوصات/الوصفات يُضاف كسطر في ChangeLogEntry
+# والعميل يطلب ?since=<cursor> فيستلم الفروقات فقط بدل اللقطة الكاملة.
+#
+# الكتابة تتم بعد نجاح المعاملة (on_commit) كإدخال قصير مستقل، فلا يظهر للعملاء تغيير
+# تراجعت عنه المعاملة، ويضيق جدًا احتمال أن يُقرأ رقم أكبر قبل رقم أصغر لم يُثبَّت بعد.
+# =====================================================================
+Entity = ChangeLogEntry.Entity
+Action = ChangeLogEntry.Action
+
+HEAD_KEY = "core:changefeed:head"
+FEED_LIMIT = 500
+POLL_INTERVAL = 0.5        # فحص تلميح الكاش أثناء الانتظار
+DB_RECHECK_INTERVAL = 5    # فحص قاعدة البيانات دوريًا حتى لو ضاع تلميح الكاش
+HEARTBEAT_INTERVAL = 15    # تعليق SSE يبقي الاتصال حيًا عبر الـ proxies
+
+
+def max_wait():
+    # الانتظار الطويل يحجز عاملًا (worker) طوال المدة تحت WSGI؛ اجعله قصيرًا مع gunicorn sync
+    return getattr(settings, "CHANGE_FEED_MAX_WAIT", 20)
+
+
+def wsgi_stream_wait():
+    # بث SSE تحت WSGI: انتظار قصير ثم إغلاق مع retry؛ لا يحجز العامل أكثر من ثانية أو ثانيتين
+    return min(getattr(settings, "CHANGE_FEED_WSGI_STREAM_WAIT", 1), max_wait())
+
+
+def wsgi_retry_ms():
+    return getattr(settings, "CHANGE_FEED_WSGI_RETRY_MS", 2000)
+
+
+# ---------------------------------------------------------------------
+# الكتابة
+# ---------------------------------------------------------------------
+def _advance_head(cursor):
+    current = cache.get(HEAD_KEY)
+    if current is None or cursor > current:
+        cache.set(HEAD_KEY, cursor, None)
+
+
+def record(*entries):
+    entries = [e for e in entries if e is not None]
+    if not entries:
+        return
+
+    def write():
+        created = ChangeLogEntry.objects.bulk_create(entries)
+        _advance_head(max(e.pk for e in created))
+
+    transaction.on_commit(write)
+
+
+def appointment_change(appointment, action):
+    data = appointment.__dict__
+    return ChangeLogEntry(
+        entity=Entity.APPOINTMENT,
+        object_id=str(appointment.pk),
+        action=action,
+        day=clinic_date(data.get("date")),
+        doctor_id=data.get("doctor_id"),
+        patient_id=data.get("patient_id"),
+        data={
+            "id": appointment.pk,
+            "date": data.get("date"),
+            "time": data.get("time"),
+            "status": data.get("status"),
+            "doctor": data.get("doctor_id"),
+            "patient": data.get("patient_id"),
+        },
+    )
+
+
+def exam_change(exam, action, **extra):
+    return ChangeLogEntry(
+        entity=Entity.CLINICAL_EXAM,
+        object_id=str(exam.pk),
+        action=action,
+        day=clinic_date(exam.created_at),
+        doctor_id=exam.doctor_id,
+        patient_id=exam.patient_id,
+        data={
+            "id": exam.pk,
+            "appointment": exam.appointment_id,
+            "patient": exam.patient_id,
+            "doctor": exam.doctor_id,
+            **extra,
+        },
+    )
+
+
+def prescription_change(prescription, action):
+    return ChangeLogEntry(
+        entity=Entity.PRESCRIBED_MEDICATION,
+        object_id=str(prescription.pk),
+        action=action,
+        day=clinic_date(prescription.prescribed_at),
+        doctor_id=prescription.prescribed_by_id,
+        data={
+            "id": prescription.pk,
+            "clinical_exam": prescription.clinical_exam_id,
+            "medication": prescription.medication_id,
+        },
+    )
+
+
+# ---------------------------------------------------------------------
+# القراءة
+# ---------------------------------------------------------------------
+class CursorExpired(Exception):
+    """المؤشر أقدم من السجلات المحفوظة (حُذفت بالتنظيف)؛ على العميل إعادة التحميل الكامل."""
+
+
+def _row(entry):
+    return {
+        "cursor": entry["id"],
+        "entity": entry["entity"],
+        "id": entry["object_id"],
+        "action": entry["action"],
+        "day": entry["day"],
+        "data": entry["data"],
+        "at": entry["created_at"],
+    }
+
+
+def fetch_changes(since=None, entities=None, day=None, doctor_id=None, limit=FEED_LIMIT):
+    """
+    since=None → لا تغييرات، فقط المؤشر الحالي (يبدأ منه العميل بعد تحميل اللقطة).
+    يعيد {"cursor", "changes", "has_more"}؛ المؤشر يتقدم حتى لو استبعدت الفلاتر كل الصفوف.
+    """
+    bounds = ChangeLogEntry.objects.aggregate(head=Max("id"), tail=Min("id"))
+    head = bounds["head"] or 0
+    if since is None:
+        return {"cursor": head, "changes": [], "has_more": False}
+    if bounds["tail"] is not None and since + 1 < bounds["tail"]:
+        raise CursorExpired()
+    if since >= head:
+        return {"cursor": max(since, head), "changes": [], "has_more": False}
+
+    qs = ChangeLogEntry.objects.filter(id__gt=since, id__lte=head)
+    if entities:
+        qs = qs.filter(entity__in=entities)
+    if day:
+        qs = qs.filter(day=day)
+    if doctor_id:
+        qs = qs.filter(doctor_id=doctor_id)
+    rows = list(
+        qs.order_by("id")
+        .values("id", "entity", "object_id", "action", "day", "data", "created_at")[: limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "cursor": rows[-1]["id"] if has_more else head,
+        "changes": [_row(r) for r in rows],
+        "has_more": has_more,
+    }
+
+
+def _should_recheck(cursor, last_check):
+    head = cache.get(HEAD_KEY)
+    return (head is not None and head > cursor) or time.monotonic() - last_check >= DB_RECHECK_INTERVAL
+
+
+def wait_for_changes(since, timeout, **filters):
+    """Long-poll: يعود فور ظهور تغيير أو عند انتهاء المهلة (بدون ضغط على قاعدة البيانات أثناء الانتظار)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = fetch_changes(since, **filters)
+        last_check = time.monotonic()
+        if result["changes"] or since is None or last_check >= deadline:
+            return result
+        since = result["cursor"]
+        while time.monotonic() < deadline and not _should_recheck(since, last_check):
+            time.sleep(POLL_INTERVAL)
+
+
+async def stream_changes(since, **filters):
+    """مولّد غير متزامن لـ SSE تحت ASGI: دفعات متتالية + نبضات keep-alive."""
+    fetch = sync_to_async(fetch_changes)
+    last_beat = time.monotonic()
+    while True:
+        result = await fetch(since, **filters)
+        if result["changes"] or result["cursor"] != since:
+            yield result
+        since = result["cursor"]
+        last_check = time.monotonic()
+        while not await sync_to_async(_should_recheck)(since, last_check):
+            if time.monotonic() - last_beat >= HEARTBEAT_INTERVAL:
+                last_beat = time.monotonic()
+                yield None
+            await asyncio.sleep(POLL_INTERVAL)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    # الإبطال عبر نسخ الكاش لا يصل إلى العمال الآخرين مع كاش لكل عملية
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if backend in LOCAL_CACHES:
+        return [Warning(
+            "الكاش الافتراضي محلي لكل عملية؛ الإبطال لا يصل إلى عمال gunicorn الآخرين.",
+            hint="اضبط REDIS_URL (خدمة redis في docker-compose.yml).",
+            id="core.W001",
+        )]
+    return []
@@ -0,0 +1,12 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
+
+
+# =====================================================================
+# فهارس بحث الأدمن/autocomplete
+# icontains في PostgreSQL يُترجم إلى UPPER(col::text) LIKE '%..%'، ولا يخدمه إلا فهرس
+# trigram على التعبير نفسه. فهرس GIN متعدد الأعمدة يخدم شرطًا على أي عمود منه،
+# فيكفي فهرس واحد لكل جدول (يتطلب امتداد pg_trgm: accounts/0010).
+# =====================================================================
+def search_trgm_index(*fields, name):
+    return GinIndex(*(OpClass(Upper(field), name="gin_trgm_ops") for field in fields), name=name)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.partitions import (
+    PARTITIONED_TABLES,
+    archive_schema,
+    detach_partition,
+    expired_partitions,
+    is_partitioned,
+    retention_months,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Detach monthly partitions older than the retention window and move them to the archive schema "
+        "(PARTITION_RETENTION_MONTHS per table; tables without a setting are never archived)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--table", choices=list(PARTITIONED_TABLES), default=None)
+        parser.add_argument("--older-than", type=int, default=None, help="Months; overrides the setting")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["older_than"] is not None and not options["table"]:
+            raise CommandError("--older-than requires --table")
+        tables = [options["table"]] if options["table"] else list(PARTITIONED_TABLES)
+        for table in tables:
+            months = options["older_than"] if options["older_than"] is not None else retention_months(table)
+            if months is None or not is_partitioned(table):
+                continue
+            expired = expired_partitions(table, months)
+            for _, name in expired:
+                if options["dry_run"]:
+                    self.stdout.write(f"would detach {name} -> {archive_schema()}.{name}")
+                else:
+                    self.stdout.write(f"detached {name} -> {detach_partition(table, name)}")
+            self.stdout.write(self.style.SUCCESS(f"{table}: {len(expired)} partitions older than {months} months"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.partitions import PARTITIONED_TABLES, ensure_monthly_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions for partitioned tables (run daily; no-op outside PostgreSQL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=None)
+
+    def handle(self, *args, **options):
+        for table, (column, timestamp, months_ahead) in PARTITIONED_TABLES.items():
+            # الجداول غير المحوّلة (partition_table) تبقى عادية
+            if not is_partitioned(table):
+                continue
+            created, skipped = ensure_monthly_partitions(
+                table, column, timestamp=timestamp, months_ahead=options["months_ahead"] or months_ahead,
+            )
+            for name in skipped:
+                self.stderr.write(self.style.WARNING(
+                    f"{name}: rows for this month are in {table}_default; move them, then re-run"
+                ))
+            self.stdout.write(self.style.SUCCESS(f"{table}: created {len(created)} partitions"))
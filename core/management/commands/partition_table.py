@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.partitions import PARTITIONED_TABLES, PartitioningError, conversion_plan, convert_to_partitioned
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert a large history table to monthly range partitions (PostgreSQL only). "
+        "Without --execute only prints the plan. Takes an exclusive lock and copies every row: "
+        "run in a maintenance window, after a backup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=[t for t in PARTITIONED_TABLES if t != "core_auditevent"])
+        parser.add_argument("--execute", action="store_true")
+        parser.add_argument(
+            "--drop-foreign-keys", action="store_true",
+            help="Drop database FKs that point at this table (Django still applies on_delete)",
+        )
+        parser.add_argument(
+            "--relax-unique", action="store_true",
+            help="Re-create unique constraints with the partition column added (unique per month only)",
+        )
+        parser.add_argument("--keep-old", action="store_true", help="Keep the original as <table>_unpartitioned")
+
+    def handle(self, *args, **options):
+        table = options["table"]
+        try:
+            plan = conversion_plan(table)
+        except PartitioningError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{table}: {plan['rows']} rows since {plan['first_month'] or '-'}")
+        for owner, name in plan["inbound_fks"]:
+            self.stdout.write(f"  inbound FK to drop: {owner}.{name}")
+        for name, definition, covered in plan["unique"]:
+            if not covered:
+                self.stdout.write(f"  unique to relax: {name} {definition}")
+        for name, _ in plan["indexes"]:
+            self.stdout.write(f"  index: {name}")
+        if not options["execute"]:
+            self.stdout.write("Dry run; pass --execute to convert.")
+            return
+
+        try:
+            result = convert_to_partitioned(
+                table,
+                drop_foreign_keys=options["drop_foreign_keys"],
+                relax_unique=options["relax_unique"],
+                keep_old=options["keep_old"],
+            )
+        except PartitioningError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{table}: partitioned into {len(result['partitions'])} monthly partitions"))
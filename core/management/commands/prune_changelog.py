@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ChangeLogEntry
+
+
+class Command(BaseCommand):
+    help = "Delete change-feed entries older than the retention window (clients with older cursors get 410 and resync)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None)
+
+    def handle(self, *args, **options):
+        days = options["days"] or getattr(settings, "CHANGE_FEED_RETENTION_DAYS", 7)
+        cutoff = timezone.now() - timedelta(days=days)
+        # نحذف حسب المؤشر حتى يبقى السجل المتبقي متصلًا (بدون فجوات في الوسط)
+        last_id = (
+            ChangeLogEntry.objects.filter(created_at__lt=cutoff)
+            .order_by("-id").values_list("id", flat=True).first()
+        )
+        deleted = 0
+        if last_id is not None:
+            deleted, _ = ChangeLogEntry.objects.filter(id__lte=last_id).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change-log entries older than {days} days"))
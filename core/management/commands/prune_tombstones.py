@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+from core.sync import tombstone_retention
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than the retention window (older sync tokens get 410 and do a full resync)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None)
+
+    def handle(self, *args, **options):
+        retention = tombstone_retention()
+        if options["days"]:
+            retention = timedelta(days=options["days"])
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - retention).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones older than {retention.days} days"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily dashboard rollup tables from source data (whole history or a date range)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--end", help="YYYY-MM-DD (inclusive)")
+
+    def handle(self, *args, **options):
+        bounds = []
+        for name in ("start", "end"):
+            raw = options[name]
+            value = parse_date(raw) if raw else None
+            if raw and value is None:
+                raise CommandError(f"Invalid --{name}, expected YYYY-MM-DD")
+            bounds.append(value)
+
+        written = rebuild_rollups(*bounds)
+        summary = ", ".join(f"{name}: {n}" for name, n in written.items())
+        self.stdout.write(self.style.SUCCESS(f"Rollups rebuilt ({summary})"))
@@ -0,0 +1,17 @@
+from .audit import bind_request, unbind_request
+
+
+class AuditRequestMiddleware:
+    """
+    يجعل الطلب الحالي متاحًا لسجل التدقيق (الفاعل وعنوان IP).
+    المستخدم يُقرأ عند وقوع الحدث لا هنا: مصادقة JWT في DRF تضبطه بعد الـ middleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = bind_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            unbind_request(token)
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0008_alter_doctor_user'),
+        ('medicalrecord', '0009_patientprescriptionreport'),
+        ('procedures', '0016_performer_period_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPatientStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True, verbose_name='Day')),
+                ('new_patients', models.IntegerField(default=0, verbose_name='New Patients')),
+            ],
+            options={
+                'verbose_name': 'Daily Patient Stat',
+                'verbose_name_plural': 'Daily Patient Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyAppointmentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('status', models.CharField(max_length=20, verbose_name='Status')),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.doctor', verbose_name='Doctor')),
+            ],
+            options={
+                'verbose_name': 'Daily Appointment Stat',
+                'verbose_name_plural': 'Daily Appointment Stats',
+                'constraints': [models.UniqueConstraint(fields=('day', 'doctor', 'status'), name='uniq_daily_appt_stat')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPrescriptionStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+                ('medication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='medicalrecord.medication', verbose_name='Medication')),
+            ],
+            options={
+                'verbose_name': 'Daily Prescription Stat',
+                'verbose_name_plural': 'Daily Prescription Stats',
+                'constraints': [models.UniqueConstraint(fields=('day', 'medication'), name='uniq_daily_prescription_stat')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProcedureStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+                ('procedure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='procedures.dentalprocedure', verbose_name='Procedure')),
+            ],
+            options={
+                'verbose_name': 'Daily Procedure Stat',
+                'verbose_name_plural': 'Daily Procedure Stats',
+                'constraints': [models.UniqueConstraint(fields=('day', 'procedure'), name='uniq_daily_procedure_stat')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:52
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('appointment', 'Appointment'), ('clinical_exam', 'Clinical Exam'), ('prescribed_medication', 'Prescribed Medication')], max_length=30, verbose_name='Entity')),
+                ('object_id', models.CharField(max_length=64, verbose_name='Object ID')),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10, verbose_name='Action')),
+                ('day', models.DateField(blank=True, null=True, verbose_name='Day')),
+                ('doctor_id', models.UUIDField(blank=True, null=True, verbose_name='Doctor')),
+                ('patient_id', models.UUIDField(blank=True, null=True, verbose_name='Patient')),
+                ('data', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Data')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Change Log Entry',
+                'verbose_name_plural': 'Change Log',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['day', 'id'], name='changelog_day_id_idx'), models.Index(fields=['created_at'], name='changelog_created_idx')],
+            },
+        ),
+    ]
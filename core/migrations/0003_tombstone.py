@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_changelogentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(max_length=30, verbose_name='Entity')),
+                ('object_id', models.CharField(max_length=64, verbose_name='Object ID')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Deleted At')),
+            ],
+            options={
+                'verbose_name': 'Tombstone',
+                'verbose_name_plural': 'Tombstones',
+                'indexes': [models.Index(fields=['deleted_at', 'id'], name='tombstone_sync_idx')],
+            },
+        ),
+    ]
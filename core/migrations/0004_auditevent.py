@@ -0,0 +1,108 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:30
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.indexes import PostgresIndex
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+from core.partitions import create_default_partition, ensure_monthly_partitions
+
+TABLE = 'core_auditevent'
+
+# المفتاح الأساسي في جدول مقسّم يجب أن يشمل عمود التقسيم
+CREATE_TABLE = f"""
+CREATE TABLE {TABLE} (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    occurred_at timestamp with time zone NOT NULL,
+    entity varchar(40) NOT NULL,
+    object_id varchar(64) NOT NULL,
+    action varchar(10) NOT NULL,
+    patient_id uuid NULL,
+    actor_id uuid NULL,
+    ip_address inet NULL,
+    changes jsonb NOT NULL,
+    PRIMARY KEY (id, occurred_at)
+) PARTITION BY RANGE (occurred_at)
+"""
+
+# إلحاقي فقط: تعديل/حذف صفوف التدقيق مرفوض؛ الاحتفاظ يتم بفصل أقسام كاملة (DDL)
+APPEND_ONLY = [
+    """
+    CREATE FUNCTION core_audit_append_only() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        RAISE EXCEPTION 'core_auditevent is append-only';
+    END;
+    $$
+    """,
+    f"""
+    CREATE TRIGGER core_audit_append_only BEFORE UPDATE OR DELETE ON {TABLE}
+        FOR EACH ROW EXECUTE FUNCTION core_audit_append_only()
+    """,
+]
+
+
+def create_audit_table(apps, schema_editor):
+    AuditEvent = apps.get_model('core', 'AuditEvent')
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        # BRIN (autosummarize) خاص بـ PostgreSQL؛ بقية الفهارس تُنشأ كالمعتاد
+        indexes = AuditEvent._meta.indexes
+        AuditEvent._meta.indexes = [index for index in indexes if not isinstance(index, PostgresIndex)]
+        try:
+            schema_editor.create_model(AuditEvent)
+        finally:
+            AuditEvent._meta.indexes = indexes
+        return
+    schema_editor.execute(CREATE_TABLE)
+    for index in AuditEvent._meta.indexes:
+        schema_editor.add_index(AuditEvent, index)
+    create_default_partition(TABLE, connection)
+    ensure_monthly_partitions(TABLE, 'occurred_at', connection=connection)
+    for sql in APPEND_ONLY:
+        schema_editor.execute(sql)
+
+
+def drop_audit_table(apps, schema_editor):
+    AuditEvent = apps.get_model('core', 'AuditEvent')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.delete_model(AuditEvent)
+        return
+    schema_editor.execute(f"DROP TABLE {TABLE} CASCADE")
+    schema_editor.execute("DROP FUNCTION core_audit_append_only()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_tombstone'),
+    ]
+
+    operations = [
+        # الجدول نفسه يُنشأ يدويًا (مقسّم على PostgreSQL)؛ Django يعرف النموذج فقط
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='AuditEvent',
+                    fields=[
+                        ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                        ('occurred_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Occurred At')),
+                        ('entity', models.CharField(max_length=40, verbose_name='Entity')),
+                        ('object_id', models.CharField(max_length=64, verbose_name='Object ID')),
+                        ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10, verbose_name='Action')),
+                        ('patient_id', models.UUIDField(blank=True, null=True, verbose_name='Patient')),
+                        ('actor_id', models.UUIDField(blank=True, null=True, verbose_name='Actor')),
+                        ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP Address')),
+                        ('changes', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Changes')),
+                    ],
+                    options={
+                        'verbose_name': 'Audit Event',
+                        'verbose_name_plural': 'Audit Log',
+                        'ordering': ['-occurred_at', '-id'],
+                        'indexes': [django.contrib.postgres.indexes.BrinIndex(autosummarize=True, fields=['occurred_at'], name='audit_occurred_brin'), models.Index(fields=['patient_id', '-occurred_at'], name='audit_patient_idx'), models.Index(fields=['actor_id', '-occurred_at'], name='audit_actor_idx'), models.Index(fields=['entity', 'object_id', '-occurred_at'], name='audit_object_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_audit_table, drop_audit_table),
+    ]
@@ -1,3 +1,176 @@
+from django.contrib.postgres.indexes import BrinIndex
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+from accounts.models import Doctor
+
+
+# =====================================================================
+# جداول التجميع اليومي (rollups) للوحة المعلومات
+# تُحدَّث تراكميًا من الإشارات (core/signals.py) وتُعاد بناؤها بأمر rebuild_rollups.
+# اللوحة تقرأ منها فقط، فزمن التحميل لا يتأثر بحجم التاريخ.
+# =====================================================================
+class DailyAppointmentStat(models.Model):
+    day = models.DateField(verbose_name=_("Day"))
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name="+", verbose_name=_("Doctor"))
+    # الحالة بصيغتها الإنجليزية الموحدة (المرادفات العربية تُحوَّل عند الكتابة)
+    status = models.CharField(max_length=20, verbose_name=_("Status"))
+    count = models.IntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        verbose_name = _("Daily Appointment Stat")
+        verbose_name_plural = _("Daily Appointment Stats")
+        constraints = [
+            models.UniqueConstraint(fields=["day", "doctor", "status"], name="uniq_daily_appt_stat"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.doctor_id} {self.status}: {self.count}"
+
+
+class DailyPatientStat(models.Model):
+    day = models.DateField(unique=True, verbose_name=_("Day"))
+    new_patients = models.IntegerField(default=0, verbose_name=_("New Patients"))
+
+    class Meta:
+        verbose_name = _("Daily Patient Stat")
+        verbose_name_plural = _("Daily Patient Stats")
+
+    def __str__(self):
+        return f"{self.day}: {self.new_patients}"
+
+
+class DailyProcedureStat(models.Model):
+    """الإجراءات المنفّذة (عناصر الفحص) لكل يوم وإجراء؛ التصنيف يُضم عند القراءة."""
+    day = models.DateField(verbose_name=_("Day"))
+    procedure = models.ForeignKey(
+        "procedures.DentalProcedure", on_delete=models.CASCADE, related_name="+", verbose_name=_("Procedure")
+    )
+    count = models.IntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        verbose_name = _("Daily Procedure Stat")
+        verbose_name_plural = _("Daily Procedure Stats")
+        constraints = [
+            models.UniqueConstraint(fields=["day", "procedure"], name="uniq_daily_procedure_stat"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.procedure_id}: {self.count}"
+
+
+class DailyPrescriptionStat(models.Model):
+    day = models.DateField(verbose_name=_("Day"))
+    medication = models.ForeignKey(
+        "medicalrecord.Medication", on_delete=models.CASCADE, related_name="+", verbose_name=_("Medication")
+    )
+    count = models.IntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        verbose_name = _("Daily Prescription Stat")
+        verbose_name_plural = _("Daily Prescription Stats")
+        constraints = [
+            models.UniqueConstraint(fields=["day", "medication"], name="uniq_daily_prescription_stat"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.medication_id}: {self.count}"
+
+
+# =====================================================================
+# سجل التغييرات (change feed): رقم تسلسلي متزايد يُستخدم كمؤشر (cursor) للعملاء
+# لا FK على الكيانات حتى يبقى السجل بعد حذفها
+# =====================================================================
+class ChangeLogEntry(models.Model):
+    class Entity(models.TextChoices):
+        APPOINTMENT = "appointment", _("Appointment")
+        CLINICAL_EXAM = "clinical_exam", _("Clinical Exam")
+        PRESCRIBED_MEDICATION = "prescribed_medication", _("Prescribed Medication")
+
+    class Action(models.TextChoices):
+        CREATED = "created", _("Created")
+        UPDATED = "updated", _("Updated")
+        DELETED = "deleted", _("Deleted")
+
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=30, choices=Entity.choices, verbose_name=_("Entity"))
+    object_id = models.CharField(max_length=64, verbose_name=_("Object ID"))
+    action = models.CharField(max_length=10, choices=Action.choices, verbose_name=_("Action"))
+    # يوم الكيان بتوقيت العيادة (تاريخ الموعد، يوم الفحص/الوصفة) لتصفية شاشة اليوم
+    day = models.DateField(null=True, blank=True, verbose_name=_("Day"))
+    doctor_id = models.UUIDField(null=True, blank=True, verbose_name=_("Doctor"))
+    patient_id = models.UUIDField(null=True, blank=True, verbose_name=_("Patient"))
+    data = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, verbose_name=_("Data"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+
+    class Meta:
+        verbose_name = _("Change Log Entry")
+        verbose_name_plural = _("Change Log")
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["day", "id"], name="changelog_day_id_idx"),
+            models.Index(fields=["created_at"], name="changelog_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.entity}:{self.object_id} {self.action}"
+
+
+# =====================================================================
+# شواهد الحذف (tombstones) لمزامنة الأجهزة: الصف المحذوف لا يظهر في استعلام updated_at
+# فيُسجَّل معرّفه هنا داخل نفس معاملة الحذف
+# =====================================================================
+class Tombstone(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=30, verbose_name=_("Entity"))
+    object_id = models.CharField(max_length=64, verbose_name=_("Object ID"))
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name=_("Deleted At"))
+
+    class Meta:
+        verbose_name = _("Tombstone")
+        verbose_name_plural = _("Tombstones")
+        indexes = [models.Index(fields=["deleted_at", "id"], name="tombstone_sync_idx")]
+
+    def __str__(self):
+        return f"{self.entity}:{self.object_id} @ {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+# =====================================================================
+# سجل التدقيق (core/audit.py): من غيّر ماذا ومتى، بفروق الحقول
+# إلحاقي فقط: على PostgreSQL الجدول مقسّم حسب الشهر (occurred_at) ومحمي بمشغّل يمنع
+# UPDATE/DELETE (migrations/0004)، فالمفتاح الفعلي (id, occurred_at) وإن عرّفه Django بـ id.
+# لا FK على المريض/المستخدم حتى يبقى السجل بعد حذفهما.
+# =====================================================================
+class AuditEvent(models.Model):
+    class Action(models.TextChoices):
+        CREATED = "created", _("Created")
+        UPDATED = "updated", _("Updated")
+        DELETED = "deleted", _("Deleted")
+
+    id = models.BigAutoField(primary_key=True)
+    occurred_at = models.DateTimeField(default=timezone.now, verbose_name=_("Occurred At"))
+    entity = models.CharField(max_length=40, verbose_name=_("Entity"))
+    object_id = models.CharField(max_length=64, verbose_name=_("Object ID"))
+    action = models.CharField(max_length=10, choices=Action.choices, verbose_name=_("Action"))
+    patient_id = models.UUIDField(null=True, blank=True, verbose_name=_("Patient"))
+    actor_id = models.UUIDField(null=True, blank=True, verbose_name=_("Actor"))
+    ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name=_("IP Address"))
+    # {الحقل: [القيمة القديمة، الجديدة]}
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder, verbose_name=_("Changes"))
+
+    class Meta:
+        verbose_name = _("Audit Event")
+        verbose_name_plural = _("Audit Log")
+        ordering = ["-occurred_at", "-id"]
+        indexes = [
+            # BRIN صغير جدًا مع إدخال متزايد زمنيًا؛ نطاقات الوقت بلا تصفية أخرى
+            BrinIndex(fields=["occurred_at"], autosummarize=True, name="audit_occurred_brin"),
+            models.Index(fields=["patient_id", "-occurred_at"], name="audit_patient_idx"),
+            models.Index(fields=["actor_id", "-occurred_at"], name="audit_actor_idx"),
+            models.Index(fields=["entity", "object_id", "-occurred_at"], name="audit_object_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.entity}:{self.object_id} {self.action} @ {self.occurred_at:%Y-%m-%d %H:%M}"
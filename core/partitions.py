@@ -0,0 +1,297 @@
+import datetime
+import re
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .utils import clinic_date, clinic_tz
+
+
+# =====================================================================
+# تقسيم الجداول حسب الشهر (PostgreSQL: PARTITION BY RANGE)
+# الجدول الأب بلا بيانات؛ لكل شهر قسم <table>_pYYYYMM حدوده بداية الشهر بتوقيت العيادة،
+# وقسم <table>_default يلتقط ما لا قسم له حتى لا يفشل الإدخال إن تأخر إنشاء الأقسام.
+# الأقسام تُنشأ مسبقًا بأمر ensure_partitions (يوميًا من cron)؛ على قواعد أخرى لا شيء يتغير.
+#
+# سجل التدقيق مقسّم منذ إنشائه (core/migrations/0004). جداول السجل السريري الكبيرة اختيارية:
+# تُحوَّل بأمر partition_table في نافذة صيانة، والأقسام القديمة تُفصل بأمر archive_partitions.
+# قيود PostgreSQL على الجدول المقسّم:
+#   - المفتاح الأساسي وكل قيد فريد يجب أن يشمل عمود التقسيم: PK يصبح (id, العمود)،
+#     فتفرّد id وحده تضمنه الـ identity لا القاعدة
+#   - لا مفتاح أجنبي يشير إلى id وحده: المفاتيح الواردة (الفواتير، الفحص ← الموعد...) تُحذف
+#     من القاعدة، ويبقى on_delete يعمل من Django (Collector) كما هو
+# =====================================================================
+DEFAULT_MONTHS_AHEAD = 3
+
+# الجدول: (عمود التقسيم، timestamp؟ (وإلا date)، أشهر تُنشأ مسبقًا)
+PARTITIONED_TABLES = {
+    "core_auditevent": ("occurred_at", True, DEFAULT_MONTHS_AHEAD),
+    # المواعيد تُحجز قبل أشهر؛ ما يتجاوز الأفق يقع في القسم default
+    "appointment_appointment": ("date", False, 12),
+    "procedures_clinicalexamitem": ("created_at", True, DEFAULT_MONTHS_AHEAD),
+    "medicalrecord_prescribedmedication": ("prescribed_at", True, DEFAULT_MONTHS_AHEAD),
+}
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def is_supported(connection=default_connection):
+    return connection.vendor == "postgresql"
+
+
+def add_months(day, months):
+    years, month = divmod(day.month - 1 + months, 12)
+    return datetime.date(day.year + years, month + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def month_of(value):
+    """الشهر (أول يوم) الذي يقع فيه تاريخ أو وقت، بتوقيت العيادة."""
+    return clinic_date(value).replace(day=1)
+
+
+def _bound(month, timestamp):
+    if not timestamp:
+        return month.isoformat()
+    return datetime.datetime.combine(month, datetime.time.min, tzinfo=clinic_tz()).isoformat()
+
+
+def is_partitioned(table, connection=default_connection):
+    if not is_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def monthly_partitions(table, connection=default_connection):
+    """[(الشهر، اسم القسم)] للأقسام الشهرية الملحقة حاليًا، مرتبة بالأقدم."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})(\d{{2}})$")
+    found = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            found.append((datetime.date(int(match[1]), int(match[2]), 1), name))
+    return sorted(found)
+
+
+def create_default_partition(table, connection=default_connection):
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+
+
+def ensure_monthly_partitions(table, column, timestamp=True, months_ahead=DEFAULT_MONTHS_AHEAD,
+                              start=None, connection=default_connection):
+    """
+    ينشئ أقسام الأشهر من start (افتراضيًا الشهر الحالي بتوقيت العيادة) حتى months_ahead بعده.
+    يعيد (المنشأة، المتخطاة): يُتخطى الشهر إذا كان في القسم default صفوف من نطاقه
+    (إنشاؤه سيفشل)؛ تُنقل يدويًا ثم يُعاد تشغيل الأمر.
+    """
+    qn = connection.ops.quote_name
+    first = month_of(start or timezone.now())
+    existing = {month for month, _ in monthly_partitions(table, connection)}
+    created, skipped = [], []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(first, offset)
+            if month in existing:
+                continue
+            lower, upper = _bound(month, timestamp), _bound(add_months(month, 1), timestamp)
+            cursor.execute(
+                f"SELECT EXISTS (SELECT 1 FROM {qn(table + '_default')} WHERE {qn(column)} >= %s AND {qn(column)} < %s)",
+                [lower, upper],
+            )
+            if cursor.fetchone()[0]:
+                skipped.append(partition_name(table, month))
+                continue
+            # الحدود قيم نولّدها هنا (تواريخ)، فلا خطر من تضمينها نصيًا في DDL
+            cursor.execute(
+                f"CREATE TABLE {qn(partition_name(table, month))} PARTITION OF {qn(table)} "
+                f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            )
+            created.append(partition_name(table, month))
+    return created, skipped
+
+
+# ---------------------------------------------------------------------
+# تحويل جدول قائم إلى جدول مقسّم (PostgreSQL فقط، داخل معاملة واحدة)
+# ---------------------------------------------------------------------
+def _fetch(cursor, sql, params):
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def conversion_plan(table, connection=default_connection):
+    """ما سيحدث عند التحويل: {inbound_fks, unique, indexes, rows, first_month}؛ لا يغيّر شيئًا."""
+    if table not in PARTITIONED_TABLES:
+        raise PartitioningError(f"{table}: ليس ضمن PARTITIONED_TABLES.")
+    if not is_supported(connection):
+        raise PartitioningError("التقسيم متاح على PostgreSQL فقط.")
+    if is_partitioned(table, connection):
+        raise PartitioningError(f"{table}: مقسّم بالفعل.")
+    column = PARTITIONED_TABLES[table][0]
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        inbound = _fetch(cursor, (
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = %s::regclass ORDER BY 1, 2"
+        ), [table])
+        # القيود الفريدة (غير PK) وهل تشمل عمود التقسيم
+        unique = _fetch(cursor, (
+            "SELECT c.conname, pg_get_constraintdef(c.oid), EXISTS ("
+            "  SELECT 1 FROM pg_attribute a WHERE a.attrelid = c.conrelid "
+            "  AND a.attnum = ANY (c.conkey) AND a.attname = %s) "
+            "FROM pg_constraint c WHERE c.conrelid = %s::regclass AND c.contype = 'u'"
+        ), [column, table])
+        # الفهارس غير المرتبطة بقيد (تُعاد كما هي على الجدول الأب فتنتقل إلى كل قسم)
+        indexes = _fetch(cursor, (
+            "SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT EXISTS ("
+            "  SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)"
+        ), [table])
+        cursor.execute(f"SELECT count(*), min({qn(column)}) FROM {qn(table)}")
+        rows, first = cursor.fetchone()
+    return {
+        "inbound_fks": inbound,
+        "unique": unique,
+        "indexes": indexes,
+        "rows": rows,
+        "first_month": month_of(first) if first is not None else None,
+    }
+
+
+def convert_to_partitioned(table, drop_foreign_keys=False, relax_unique=False, keep_old=False,
+                           connection=default_connection):
+    """
+    ينسخ الجدول إلى جدول أب مقسّم بنفس الاسم والأعمدة والفهارس والقيود، مع قسم لكل شهر
+    من أقدم صف حتى الأفق. يرفض ما لم يُسمح صراحة بـ:
+      drop_foreign_keys: حذف المفاتيح الأجنبية الواردة إلى الجدول
+      relax_unique: إعادة القيود الفريدة مع عمود التقسيم (التفرّد يصبح داخل الشهر فقط)
+    keep_old: يُبقي الجدول الأصلي باسم <table>_unpartitioned بدل حذفه.
+    يعيد plan مع "partitions" المنشأة.
+    """
+    plan = conversion_plan(table, connection)
+    if plan["inbound_fks"] and not drop_foreign_keys:
+        names = ", ".join(f"{owner}.{name}" for owner, name in plan["inbound_fks"])
+        raise PartitioningError(f"{table}: مفاتيح أجنبية تشير إليه ({names}).")
+    narrow = [name for name, _, covered in plan["unique"] if not covered]
+    if narrow and not relax_unique:
+        names = ", ".join(narrow)
+        raise PartitioningError(f"{table}: قيود فريدة لا تشمل عمود التقسيم ({names}).")
+
+    column, timestamp, months_ahead = PARTITIONED_TABLES[table]
+    qn = connection.ops.quote_name
+    old = f"{table}_unpartitioned"
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for owner, name in plan["inbound_fks"]:
+            cursor.execute(f"ALTER TABLE {owner} DROP CONSTRAINT {qn(name)}")
+        foreign = _fetch(cursor, (
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'"
+        ), [table])
+        pk = _fetch(cursor, (
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'"
+        ), [table])
+
+        # أسماء الفهارس والقيود عامة في المخطط: الجدول القديم يتنحى عنها قبل إنشاء الجديد
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+        for i, (name, _) in enumerate(plan["indexes"]):
+            cursor.execute(f"ALTER INDEX {name} RENAME TO {qn(f'{old}_idx{i}')}")
+        for i, (name, *_) in enumerate(pk + plan["unique"]):
+            cursor.execute(f"ALTER TABLE {qn(old)} RENAME CONSTRAINT {qn(name)} TO {qn(f'{old}_key{i}')}")
+
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+            f"INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS, "
+            f"PRIMARY KEY (id, {qn(column)})) PARTITION BY RANGE ({qn(column)})"
+        )
+        create_default_partition(table, connection)
+        this_month = month_of(timezone.now())
+        first = min(plan["first_month"] or this_month, this_month)
+        span = (this_month.year - first.year) * 12 + this_month.month - first.month
+        created, _ = ensure_monthly_partitions(
+            table, column, timestamp=timestamp, months_ahead=span + months_ahead,
+            start=first, connection=connection,
+        )
+
+        for _, sql in plan["indexes"]:
+            cursor.execute(sql)
+        for name, definition, covered in plan["unique"]:
+            if not covered:
+                # UNIQUE (a, b) ← UNIQUE (a, b, العمود)
+                definition = f"{definition[:definition.rindex(')')]}, {qn(column)})"
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+        for name, definition in foreign:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+
+        cursor.execute(f"INSERT INTO {qn(table)} OVERRIDING SYSTEM VALUE SELECT * FROM {qn(old)}")
+        # identity (Django الحديث): تسلسل جديد؛ serial (جداول قديمة): الافتراضي المنسوخ يشير
+        # إلى تسلسل الجدول القديم فتنتقل ملكيته حتى لا يُحذف معه
+        sequence = _fetch(cursor, "SELECT pg_get_serial_sequence(%s, 'id')", [table])[0][0]
+        if sequence is None:
+            sequence = _fetch(cursor, "SELECT pg_get_serial_sequence(%s, 'id')", [old])[0][0]
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {qn(table)}.id")
+        cursor.execute(
+            f"SELECT setval(%s, COALESCE((SELECT max(id) FROM {qn(table)}), 0) + 1, false)", [sequence],
+        )
+        if not keep_old:
+            cursor.execute(f"DROP TABLE {qn(old)}")
+        cursor.execute(f"ANALYZE {qn(table)}")
+    return {**plan, "partitions": created}
+
+
+# ---------------------------------------------------------------------
+# الأرشفة: فصل الأقسام الأقدم من مدة الاحتفاظ ونقلها إلى مخطط الأرشيف
+# الجدول المفصول يبقى في القاعدة (يُقرأ يدويًا أو يُصدَّر بـ pg_dump ثم يُحذف) لكن التطبيق
+# لا يراه؛ الاستعلامات لا تمسح بياناته ولا فهارسه، وVACUUM على الجدول الحي يتقلص معه.
+# ---------------------------------------------------------------------
+def archive_schema():
+    return getattr(settings, "PARTITION_ARCHIVE_SCHEMA", "archive")
+
+
+def archive_tablespace():
+    # مساحة تخزين أرخص/أبطأ إن وُجدت (CREATE TABLESPACE ... على قرص آخر)
+    return getattr(settings, "PARTITION_ARCHIVE_TABLESPACE", None)
+
+
+def retention_months(table):
+    """None: لا أرشفة تلقائية (الافتراضي للسجل السريري)."""
+    return getattr(settings, "PARTITION_RETENTION_MONTHS", {}).get(table)
+
+
+def expired_partitions(table, months, today=None, connection=default_connection):
+    """الأقسام الشهرية التي انتهى شهرها كاملًا قبل months شهرًا."""
+    cutoff = add_months(month_of(today or timezone.now()), -months)
+    return [(month, name) for month, name in monthly_partitions(table, connection) if month < cutoff]
+
+
+def detach_partition(table, name, connection=default_connection):
+    qn = connection.ops.quote_name
+    schema, tablespace = archive_schema(), archive_tablespace()
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {qn(schema)}")
+        cursor.execute(f"ALTER TABLE {qn(name)} SET SCHEMA {qn(schema)}")
+        if tablespace:
+            cursor.execute(f"ALTER TABLE {qn(schema)}.{qn(name)} SET TABLESPACE {qn(tablespace)}")
+    return f"{schema}.{name}"
@@ -0,0 +1,159 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from appointment.models import Appointment, normalize_status
+from medicalrecord.models import PrescribedMedication
+from patients.models import Patient
+from procedures.models import ClinicalExamItem
+
+from .models import DailyAppointmentStat, DailyPatientStat, DailyPrescriptionStat, DailyProcedureStat
+from .utils import clinic_date, clinic_tz
+
+
+# =====================================================================
+# تحديث جداول التجميع اليومي
+# كل تحديث = upsert واحد متعدد الصفوف: count = count + delta (ذرّي وآمن مع التزامن)
+# =====================================================================
+
+# الأيام تُحسب بتوقيت العيادة
+to_day = clinic_date
+
+
+def countable(key):
+    """القاعدة الوحيدة للمفاتيح الناقصة: مفتاح فيه None لا يُعد (لا في التحديث ولا في إعادة البناء)؛
+    ON CONFLICT لا يطابق NULL فيتكرر الصف بدل أن يُجمع."""
+    return None not in key
+
+
+def increment(model, key_fields, value_field, deltas):
+    """
+    deltas: Counter {(قيم key_fields...): delta}
+    تُهمل الفروقات الصفرية؛ الصفوف التي يصل عدّها إلى صفر تبقى (تُستبعد عند القراءة).
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta and countable(key)}
+    if not deltas:
+        return
+
+    opts = model._meta
+    table = connection.ops.quote_name(opts.db_table)
+    fields = [opts.get_field(name) for name in key_fields]
+    key_columns = [connection.ops.quote_name(f.column) for f in fields]
+    value_column = connection.ops.quote_name(opts.get_field(value_field).column)
+
+    rows, params = [], []
+    for key, delta in deltas.items():
+        rows.append("(" + ", ".join(["%s"] * (len(fields) + 1)) + ")")
+        params += [f.get_db_prep_save(v, connection) for f, v in zip(fields, key)]
+        params.append(delta)
+
+    sql = (
+        f"INSERT INTO {table} ({', '.join(key_columns)}, {value_column}) "
+        f"VALUES {', '.join(rows)} "
+        f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET "
+        f"{value_column} = {table}.{value_column} + EXCLUDED.{value_column}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def bump_appointments(deltas):
+    increment(DailyAppointmentStat, ("day", "doctor", "status"), "count", deltas)
+
+
+def bump_patients(deltas):
+    increment(DailyPatientStat, ("day",), "new_patients", deltas)
+
+
+def bump_procedures(deltas):
+    increment(DailyProcedureStat, ("day", "procedure"), "count", deltas)
+
+
+def bump_prescriptions(deltas):
+    increment(DailyPrescriptionStat, ("day", "medication"), "count", deltas)
+
+
+def item_deltas(added=(), removed=(), day_attr="created_at", key_attr="procedure_id"):
+    """Counter {(day, key): +/-n} من قوائم كائنات مضافة/محذوفة."""
+    deltas = Counter()
+    for obj in added:
+        deltas[(to_day(getattr(obj, day_attr)), getattr(obj, key_attr))] += 1
+    for obj in removed:
+        deltas[(to_day(getattr(obj, day_attr)), getattr(obj, key_attr))] -= 1
+    return deltas
+
+
+# =====================================================================
+# إعادة البناء الكامل (أو لفترة) من الجداول الأصلية باستعلامات مجمّعة
+# =====================================================================
+def _day_range(field, start, end):
+    lookups = {}
+    if start:
+        lookups[f"{field}__gte"] = start
+    if end:
+        lookups[f"{field}__lte"] = end
+    return lookups
+
+
+@transaction.atomic
+def rebuild_rollups(start=None, end=None):
+    """يحذف صفوف الفترة ويعيد حسابها؛ يعيد عدد الصفوف المكتوبة لكل جدول."""
+    tz = clinic_tz()
+    written = {}
+
+    DailyAppointmentStat.objects.filter(**_day_range("day", start, end)).delete()
+    counts = Counter()
+    for row in (
+        Appointment.objects.filter(**_day_range("date", start, end))
+        .order_by().values("date", "doctor_id", "status").annotate(n=Count("id"))
+    ):
+        key = (row["date"], row["doctor_id"], normalize_status(row["status"]))
+        if countable(key):
+            counts[key] += row["n"]
+    DailyAppointmentStat.objects.bulk_create(
+        [DailyAppointmentStat(day=d, doctor_id=doc, status=st, count=n) for (d, doc, st), n in counts.items()],
+        batch_size=1000,
+    )
+    written["appointments"] = len(counts)
+
+    DailyPatientStat.objects.filter(**_day_range("day", start, end)).delete()
+    rows = list(
+        Patient.objects.annotate(day=TruncDate("created_at", tzinfo=tz))
+        .filter(**_day_range("day", start, end))
+        .order_by().values("day").annotate(n=Count("id"))
+    )
+    rows = [r for r in rows if countable((r["day"],))]
+    DailyPatientStat.objects.bulk_create(
+        [DailyPatientStat(day=r["day"], new_patients=r["n"]) for r in rows], batch_size=1000,
+    )
+    written["patients"] = len(rows)
+
+    DailyProcedureStat.objects.filter(**_day_range("day", start, end)).delete()
+    rows = list(
+        ClinicalExamItem.objects.annotate(day=TruncDate("created_at", tzinfo=tz))
+        .filter(**_day_range("day", start, end))
+        .order_by().values("day", "procedure_id").annotate(n=Count("id"))
+    )
+    rows = [r for r in rows if countable((r["day"], r["procedure_id"]))]
+    DailyProcedureStat.objects.bulk_create(
+        [DailyProcedureStat(day=r["day"], procedure_id=r["procedure_id"], count=r["n"]) for r in rows],
+        batch_size=1000,
+    )
+    written["procedures"] = len(rows)
+
+    DailyPrescriptionStat.objects.filter(**_day_range("day", start, end)).delete()
+    rows = list(
+        PrescribedMedication.objects.annotate(day=TruncDate("prescribed_at", tzinfo=tz))
+        .filter(**_day_range("day", start, end))
+        .order_by().values("day", "medication_id").annotate(n=Count("id"))
+    )
+    rows = [r for r in rows if countable((r["day"], r["medication_id"]))]
+    DailyPrescriptionStat.objects.bulk_create(
+        [DailyPrescriptionStat(day=r["day"], medication_id=r["medication_id"], count=r["n"]) for r in rows],
+        batch_size=1000,
+    )
+    written["prescriptions"] = len(rows)
+
+    return written
@@ -0,0 +1,291 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from appointment.models import Appointment, normalize_status
+from medicalrecord.models import Attachment, MedicalRecord, PrescribedMedication
+from medicalrecord.signals import prescriptions_changed
+from patients.models import Disease, Patient
+from procedures.models import ClinicalExam, ClinicalExamItem
+from procedures.signals import exam_items_changed
+
+from . import audit
+from .changefeed import (
+    Action,
+    Entity,
+    appointment_change,
+    exam_change,
+    prescription_change,
+    record,
+)
+from .models import ChangeLogEntry
+from .rollups import (
+    bump_appointments,
+    bump_patients,
+    bump_prescriptions,
+    bump_procedures,
+    item_deltas,
+    to_day,
+)
+from .sync import tombstone
+
+
+# ---------------------------------------------------------------------
+# المواعيد: القيم المحمّلة (_loaded_values من LoadedValuesMixin) تبيّن ما الذي تغيّر عند الحفظ
+# ---------------------------------------------------------------------
+def _appointment_key(values):
+    if not all(name in values for name in Appointment.TRACKED_FIELDS):
+        return None
+    return (to_day(values["date"]), values["doctor_id"], normalize_status(values["status"]))
+
+
+@receiver(post_save, sender=Appointment)
+def rollup_appointment_saved(sender, instance, created, **kwargs):
+    new_key = _appointment_key(instance.__dict__)
+    old_key = None if created else _appointment_key(getattr(instance, "_loaded_values", {}))
+    if new_key != old_key:
+        deltas = Counter()
+        if new_key:
+            deltas[new_key] += 1
+        if old_key:
+            deltas[old_key] -= 1
+        bump_appointments(deltas)
+
+
+@receiver(post_delete, sender=Appointment)
+def rollup_appointment_deleted(sender, instance, **kwargs):
+    key = _appointment_key(getattr(instance, "_loaded_values", None) or instance.__dict__)
+    if key:
+        bump_appointments(Counter({key: -1}))
+
+
+# ---------------------------------------------------------------------
+# المرضى الجدد
+# ---------------------------------------------------------------------
+@receiver(post_save, sender=Patient)
+def rollup_patient_created(sender, instance, created, **kwargs):
+    if created:
+        bump_patients(Counter({(to_day(instance.created_at),): 1}))
+
+
+@receiver(post_delete, sender=Patient)
+def rollup_patient_deleted(sender, instance, **kwargs):
+    bump_patients(Counter({(to_day(instance.created_at),): -1}))
+
+
+# ---------------------------------------------------------------------
+# الإجراءات والوصفات: من الإشارات الجماعية (bulk_create لا يُطلق post_save)
+# ---------------------------------------------------------------------
+@receiver(exam_items_changed)
+def rollup_exam_items(sender, added=(), removed=(), **kwargs):
+    bump_procedures(item_deltas(added, removed))
+
+
+@receiver(prescriptions_changed)
+def rollup_prescriptions(sender, added=(), removed=(), **kwargs):
+    bump_prescriptions(item_deltas(added, removed, day_attr="prescribed_at", key_attr="medication_id"))
+
+
+@receiver(pre_delete, sender=ClinicalExam)
+def rollup_exam_deleted(sender, instance, **kwargs):
+    # حذف الفحص يحذف عناصره ووصفاته بالتتابع (cascade) دون إشارات؛ نطرحها هنا مسبقًا
+    bump_procedures(item_deltas(removed=ClinicalExamItem.objects.filter(clinical_exam=instance).only(
+        "id", "created_at", "procedure_id",
+    )))
+    bump_prescriptions(item_deltas(
+        removed=PrescribedMedication.objects.filter(clinical_exam=instance).only("id", "prescribed_at", "medication_id"),
+        day_attr="prescribed_at", key_attr="medication_id",
+    ))
+
+
+# ---------------------------------------------------------------------
+# Change feed
+# ---------------------------------------------------------------------
+@receiver(post_save, sender=Appointment)
+def feed_appointment_saved(sender, instance, created, **kwargs):
+    record(appointment_change(instance, Action.CREATED if created else Action.UPDATED))
+
+
+@receiver(post_delete, sender=Appointment)
+def feed_appointment_deleted(sender, instance, **kwargs):
+    record(appointment_change(instance, Action.DELETED))
+
+
+@receiver(post_save, sender=ClinicalExam)
+def feed_exam_saved(sender, instance, created, **kwargs):
+    record(exam_change(instance, Action.CREATED if created else Action.UPDATED))
+
+
+@receiver(post_delete, sender=ClinicalExam)
+def feed_exam_deleted(sender, instance, **kwargs):
+    record(exam_change(instance, Action.DELETED))
+
+
+@receiver(exam_items_changed)
+def feed_exam_items(sender, exam_id, patient_id=None, exam=None, added=(), removed=(), **kwargs):
+    data = {"items_added": len(added), "items_removed": len(removed)}
+    if exam is not None:
+        record(exam_change(exam, Action.UPDATED, **data))
+    else:
+        record(ChangeLogEntry(
+            entity=Entity.CLINICAL_EXAM, object_id=str(exam_id), action=Action.UPDATED,
+            patient_id=patient_id, data={"id": exam_id, **data},
+        ))
+
+
+@receiver(prescriptions_changed)
+def feed_prescriptions(sender, added=(), removed=(), **kwargs):
+    added_ids = {pm.pk for pm in added}
+    removed_ids = {pm.pk for pm in removed}
+    record(
+        *[prescription_change(pm, Action.UPDATED if pm.pk in removed_ids else Action.CREATED) for pm in added],
+        *[prescription_change(pm, Action.DELETED) for pm in removed if pm.pk not in added_ids],
+    )
+
+
+# ---------------------------------------------------------------------
+# شواهد الحذف لمزامنة الأجهزة (داخل معاملة الحذف نفسها)
+# ---------------------------------------------------------------------
+SYNC_DELETES = {
+    Patient: "patient",
+    MedicalRecord: "medical_record",
+    Disease: "disease",
+    Appointment: "appointment",
+    ClinicalExam: "clinical_exam",
+}
+
+
+def sync_deleted(sender, instance, **kwargs):
+    tombstone(SYNC_DELETES[sender], [instance.pk])
+
+
+# مربوطة لكل نموذج على حدة: مستقبل بلا sender يُلغي fast delete لكل النماذج
+for _model in SYNC_DELETES:
+    post_delete.connect(sync_deleted, sender=_model, dispatch_uid=f"sync_deleted_{_model._meta.label_lower}")
+
+
+@receiver(pre_delete, sender=ClinicalExam)
+def sync_exam_items_cascade(sender, instance, **kwargs):
+    # شاهد واحد لكل عناصر الفحص قبل حذفها بالتتابع (بدل شاهد لكل post_delete)
+    tombstone("clinical_exam_item", ClinicalExamItem.objects.filter(clinical_exam=instance).values_list("pk", flat=True))
+
+
+@receiver(exam_items_changed)
+def sync_exam_items_removed(sender, added=(), removed=(), **kwargs):
+    ids = {it.pk for it in removed} - {it.pk for it in added}
+    if ids:
+        # عنصر نُقل إلى فحص آخر يصل في removed لفحصه القديم وهو ما زال موجودًا
+        ids -= set(ClinicalExamItem.objects.filter(pk__in=ids).values_list("pk", flat=True))
+    tombstone("clinical_exam_item", ids)
+
+
+# ---------------------------------------------------------------------
+# سجل التدقيق: فروق الحقول لكل حفظ/حذف (core/audit.py)
+# (النموذج: (اسم الكيان، دالة تعيد (patient_id, patient_via)))
+# ---------------------------------------------------------------------
+AUDITED = {
+    Patient: ("patient", lambda obj: (obj.pk, None)),
+    Appointment: ("appointment", lambda obj: (obj.patient_id, None)),
+    ClinicalExam: ("clinical_exam", lambda obj: (obj.patient_id, None)),
+    PrescribedMedication: ("prescribed_medication", lambda obj: (None, ("clinical_exam", obj.clinical_exam_id))),
+    ClinicalExamItem: ("clinical_exam_item", lambda obj: (None, ("clinical_exam", obj.clinical_exam_id))),
+    Attachment: ("attachment", lambda obj: (None, ("medical_record", obj.medical_record_id))),
+}
+
+
+def _audit_event(sender, instance, action, update_fields=None):
+    entity, owner = AUDITED[sender]
+    patient_id, patient_via = owner(instance)
+    return audit.build_event(
+        entity, instance, action, patient_id=patient_id, patient_via=patient_via, update_fields=update_fields,
+    )
+
+
+# عناصر الفحص والوصفات تُحذف غالبًا دفعات (diff، الوصفة، حذف الفحص): حذفها يُسجَّل من الإشارات الجماعية
+# ومن pre_delete للفحص، لا من post_delete لكل صف (الذي يلغي fast delete ويستعلم عن المريض لكل صف)
+AUDITED_IN_BATCHES = (PrescribedMedication, ClinicalExamItem)
+
+
+def audit_pre_save(sender, instance, raw=False, **kwargs):
+    # كائن لم يُحمّل من قاعدة البيانات (مثلًا بُني بمعرّف موجود): استعلام SELECT واحد بالمفتاح الأساسي
+    # لقيمه القديمة (الحقول المدققة فقط). الكائنات المحمّلة (LoadedValuesMixin) والجديدة لا تكلّف شيئًا.
+    if raw or instance._state.adding or hasattr(instance, "_loaded_values"):
+        return
+    fields = [f.attname for f in sender._meta.concrete_fields if f.attname not in audit.EXCLUDED_FIELDS]
+    row = sender._base_manager.filter(pk=instance.pk).values(*fields).first()
+    instance._loaded_values = row or {}
+
+
+def audit_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    action = audit.Action.CREATED if created else audit.Action.UPDATED
+    audit.record(_audit_event(sender, instance, action, update_fields))
+    # القيم الجديدة تصبح المرجع بعد save() نفسها (LoadedValuesMixin)، لا هنا: مستقبلات لاحقة تحتاج القديمة
+    # الإشارة الجماعية التي تتبع هذا الحفظ غالبًا (added=[instance]) لا تسجّله مرة ثانية
+    instance._audit_seen = True
+
+
+def audit_deleted(sender, instance, **kwargs):
+    event = _audit_event(sender, instance, audit.Action.DELETED)
+    if getattr(event, "_patient_via", None):
+        # المرفق: سجله الطبي قد يُحذف في نفس العملية (cascade) فنحل المريض الآن لا عند الكتابة
+        audit.resolve_patients([event])
+    audit.record(event)
+
+
+def audit_bulk(sender, added=(), removed=(), patient_id=None, **kwargs):
+    """
+    الإشارات الجماعية: added الجديدة تُسجَّل إنشاءً، والموجودة أيضًا في removed (نسخة ما قبل التعديل)
+    تعديلًا، وما في removed وحده حذفًا. المريض من الإشارة أو يُحل مرة واحدة للدفعة.
+    """
+    before = {obj.pk: obj for obj in removed}
+    events = []
+    for obj in added:
+        if obj.__dict__.pop("_audit_seen", False):
+            continue
+        if obj.pk in before:
+            if not hasattr(obj, "_loaded_values"):
+                obj._loaded_values = audit.current_values(before[obj.pk])
+            action = audit.Action.UPDATED
+        else:
+            action = audit.Action.CREATED
+        events.append(_audit_event(sender, obj, action))
+        obj.remember_loaded_values()
+
+    gone = set(before) - {obj.pk for obj in added}
+    if gone:
+        # عنصر نُقل إلى فحص آخر يصل في removed لفحصه القديم وهو ما زال موجودًا (تعديله سُجّل عند حفظه)
+        gone -= set(sender._base_manager.filter(pk__in=gone).values_list("pk", flat=True))
+        events += [_audit_event(sender, before[pk], audit.Action.DELETED) for pk in gone]
+
+    events = [e for e in events if e is not None]
+    if patient_id is not None:
+        for event in events:
+            if event._patient_via:
+                event.patient_id, event._patient_via = patient_id, None
+    # الباقي (الوصفات) يُحل دفعة واحدة عند الكتابة (audit.write)
+    audit.record(*events)
+
+
+@receiver(pre_delete, sender=ClinicalExam)
+def audit_exam_children_deleted(sender, instance, **kwargs):
+    # العناصر والوصفات تُحذف بالتتابع دون إشارات لكل صف؛ نسجّلها هنا والمريض معروف من الفحص
+    events = [
+        audit.build_event(AUDITED[model][0], child, audit.Action.DELETED, patient_id=instance.patient_id)
+        for model in AUDITED_IN_BATCHES
+        for child in model._base_manager.filter(clinical_exam=instance)
+    ]
+    audit.record(*events)
+
+
+prescriptions_changed.connect(audit_bulk, dispatch_uid="audit_bulk_prescriptions")
+exam_items_changed.connect(audit_bulk, dispatch_uid="audit_bulk_exam_items")
+
+for _model in AUDITED:
+    _label = _model._meta.label_lower
+    pre_save.connect(audit_pre_save, sender=_model, dispatch_uid=f"audit_pre_save_{_label}")
+    post_save.connect(audit_saved, sender=_model, dispatch_uid=f"audit_saved_{_label}")
+    if _model not in AUDITED_IN_BATCHES:
+        post_delete.connect(audit_deleted, sender=_model, dispatch_uid=f"audit_deleted_{_label}")
@@ -0,0 +1,196 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from appointment.models import Appointment
+from medicalrecord.models import MedicalRecord
+from patients.models import Disease, Patient
+from procedures.models import ClinicalExam, ClinicalExamItem
+
+from .models import Tombstone
+
+
+# =====================================================================
+# مزامنة الأجهزة (delta sync): ?since=<token> يعيد فقط الصفوف التي تغيّرت بعد آخر مزامنة
+# لكل نموذج مؤشر keyset على (updated_at, pk) يستخدم فهرس *_sync_idx، والمحذوفات
+# تأتي من جدول Tombstone بمؤشر (deleted_at, id) خاص بها.
+#
+# الحد الأعلى لكل دفعة = الآن - SYNC_SAFETY_SECONDS: updated_at يُحسب في بايثون قبل
+# التثبيت، فمعاملة بطيئة قد تظهر بطابع زمني أقدم من صفوف ثبتت قبلها؛ هامش الأمان يمنع
+# أن يتجاوزها المؤشر قبل أن تصبح مرئية.
+# =====================================================================
+TOKEN_VERSION = 1
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+
+# الاسم في الاستجابة → (النموذج، الحقول المرسلة بالترتيب)
+SYNC_MODELS = {
+    "patient": (Patient, (
+        "id", "first_name", "last_name", "date_of_birth", "gender", "phone", "email",
+        "address", "is_archived", "updated_at",
+    )),
+    "medical_record": (MedicalRecord, ("id", "patient_id", "updated_at")),
+    "disease": (Disease, ("id", "name", "dental_impact", "is_active", "updated_at")),
+    "appointment": (Appointment, (
+        "id", "patient_id", "doctor_id", "date", "time", "status", "reason", "updated_at",
+    )),
+    "clinical_exam": (ClinicalExam, (
+        "id", "patient_id", "doctor_id", "appointment_id", "complaint", "medical_advice",
+        "prescription_notes", "created_at", "updated_at",
+    )),
+    "clinical_exam_item": (ClinicalExamItem, (
+        "id", "clinical_exam_id", "procedure_id", "toothcode_id", "notes", "performed_by_id",
+        "created_at", "updated_at",
+    )),
+}
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class SyncResetRequired(Exception):
+    """الرمز أقدم من مدة الاحتفاظ بشواهد الحذف؛ على العميل مزامنة كاملة من جديد."""
+
+
+def safety_window():
+    return datetime.timedelta(seconds=getattr(settings, "SYNC_SAFETY_SECONDS", 2))
+
+
+def tombstone_retention():
+    return datetime.timedelta(days=getattr(settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+
+# ---------------------------------------------------------------------
+# شواهد الحذف
+# ---------------------------------------------------------------------
+def tombstone(entity, ids):
+    """يُستدعى من إشارات الحذف داخل نفس المعاملة؛ إن تراجعت المعاملة تتراجع الشواهد معها."""
+    ids = [str(pk) for pk in ids if pk is not None]
+    if ids:
+        Tombstone.objects.bulk_create([Tombstone(entity=entity, object_id=pk) for pk in ids])
+
+
+# ---------------------------------------------------------------------
+# الرمز: base64url(JSON) يحمل آخر (updated_at, pk) لكل نموذج وآخر (deleted_at, id) للمحذوفات
+# ---------------------------------------------------------------------
+def encode_token(issued_at, cursors, tomb_cursor):
+    payload = {
+        "v": TOKEN_VERSION,
+        "iat": issued_at.isoformat(),
+        "m": {name: [ts.isoformat(), str(pk)] if ts else None for name, (ts, pk) in cursors.items()},
+        "t": [tomb_cursor[0].isoformat(), tomb_cursor[1]] if tomb_cursor[0] else None,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _parse_ts(value):
+    ts = parse_datetime(value) if isinstance(value, str) else None
+    if ts is None or timezone.is_naive(ts):
+        raise InvalidSyncToken("طابع زمني غير صالح في الرمز.")
+    return ts
+
+
+def decode_token(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise InvalidSyncToken("رمز مزامنة غير صالح.")
+    if not isinstance(payload, dict) or payload.get("v") != TOKEN_VERSION:
+        raise InvalidSyncToken("إصدار رمز المزامنة غير مدعوم.")
+
+    models = payload.get("m")
+    if not isinstance(models, dict) or not models or not set(models) <= set(SYNC_MODELS):
+        raise InvalidSyncToken("رمز مزامنة غير صالح.")
+    try:
+        cursors = {
+            name: (_parse_ts(c[0]), c[1]) if c else (None, None)
+            for name, c in models.items()
+        }
+        t = payload.get("t")
+        tomb_cursor = (_parse_ts(t[0]), int(t[1])) if t else (None, None)
+    except (TypeError, IndexError, ValueError):
+        raise InvalidSyncToken("رمز مزامنة غير صالح.")
+    return _parse_ts(payload.get("iat")), cursors, tomb_cursor
+
+
+# ---------------------------------------------------------------------
+# القراءة
+# ---------------------------------------------------------------------
+def _after(ts_field, ts, pk_field, pk):
+    if ts is None:
+        return Q()
+    return Q(**{f"{ts_field}__gt": ts}) | Q(**{ts_field: ts, f"{pk_field}__gt": pk})
+
+
+def fetch_sync(token=None, models=None, limit=DEFAULT_LIMIT):
+    """
+    يعيد dict: token, has_more, changes {model: {fields, rows}}, deleted {model: [ids]}.
+    - مع since تُؤخذ مجموعة النماذج من الرمز نفسه (مؤشر المحذوفات مشترك بينها)؛
+      models تُستخدم فقط في المزامنة الأولى.
+    - has_more=true: اطلب مجددًا بالرمز الجديد فورًا؛ وإلا انتظر المزامنة الدورية التالية.
+    يرفع InvalidSyncToken أو SyncResetRequired.
+    """
+    now = timezone.now()
+    upper = now - safety_window()
+
+    if token:
+        issued_at, cursors, tomb_cursor = decode_token(token)
+        if issued_at < now - tombstone_retention():
+            raise SyncResetRequired()
+    else:
+        names = [name for name in SYNC_MODELS if not models or name in models]
+        cursors = {name: (None, None) for name in names}
+        tomb_cursor = (None, None)
+
+    has_more = False
+    changes = {}
+    for name, (ts, pk) in cursors.items():
+        model, fields = SYNC_MODELS[name]
+        rows = list(
+            model.objects.filter(_after("updated_at", ts, "pk", pk), updated_at__lte=upper)
+            .order_by("updated_at", "pk")
+            .values_list(*fields)[:limit + 1]
+        )
+        if len(rows) > limit:
+            rows, has_more = rows[:limit], True
+        if rows:
+            # id أول حقل و updated_at آخر حقل في كل قائمة
+            cursors[name] = (rows[-1][-1], rows[-1][0])
+        changes[name] = {"fields": fields, "rows": rows}
+
+    deleted = {}
+    if token:
+        # في المزامنة الأولى لا داعي للمحذوفات: اللقطة الكاملة لا تحتويها أصلًا
+        tombs = list(
+            Tombstone.objects.filter(
+                _after("deleted_at", tomb_cursor[0], "id", tomb_cursor[1]),
+                entity__in=list(cursors), deleted_at__lte=upper,
+            )
+            .order_by("deleted_at", "id")
+            .values_list("id", "entity", "object_id", "deleted_at")[:limit + 1]
+        )
+        if len(tombs) > limit:
+            tombs, has_more = tombs[:limit], True
+        for _, entity, object_id, _ in tombs:
+            deleted.setdefault(entity, []).append(object_id)
+        if tombs:
+            tomb_cursor = (tombs[-1][3], tombs[-1][0])
+    else:
+        # المحذوفات قبل اللقطة لا تعني العميل؛ نبدأ مؤشرها من حد هذه الدفعة
+        tomb_cursor = (upper, 0)
+
+    return {
+        "token": encode_token(upper, cursors, tomb_cursor),
+        "has_more": has_more,
+        "changes": changes,
+        "deleted": deleted,
+    }
@@ -0,0 +1,30 @@
+import re
+import unicodedata
+
+
+# =====================================================================
+# توحيد الأسماء للبحث والمطابقة (عربي + لاتيني)
+#   - إزالة التشكيل والتطويل
+#   - توحيد الهمزات: أ إ آ ٱ → ا ، ؤ → و ، ئ → ي
+#   - ة → ه ، ى → ي
+#   - حروف صغيرة ومسافات موحدة
+# "أحمد  عليّ" و "احمد علي" يعطيان نفس القيمة فتكفي مقارنة = على عمود مفهرس.
+# =====================================================================
+_TASHKEEL = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_FOLD = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و", "ئ": "ي", "ى": "ي", "ة": "ه",
+})
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_name(value):
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKC", str(value))
+    value = _TASHKEEL.sub("", value).translate(_FOLD).lower()
+    return _SPACES.sub(" ", value).strip()
+
+
+def full_name_key(first_name, last_name):
+    return normalize_name(f"{first_name or ''} {last_name or ''}")
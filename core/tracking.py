@@ -0,0 +1,27 @@
+# =====================================================================
+# القيم كما حُمّلت من قاعدة البيانات (_loaded_values: attname -> قيمة)، تقرؤها مستقبلات الحفظ/الحذف
+# (الإحصاءات اليومية، لوحة اليوم، سجل التدقيق core/audit.py) لمعرفة ما تغيّر دون استعلام قبل الحفظ.
+# يُضاف كأول أساس للنموذج: class Patient(LoadedValuesMixin, models.Model)
+# =====================================================================
+class LoadedValuesMixin:
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # field_names هي الحقول المحمّلة فقط (only/defer)، بنفس ترتيب values
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # كل مستقبلات post_save رأت القيم القديمة أيًا كان ترتيب ربطها؛ الآن تصبح الحالية هي المرجع
+        self.remember_loaded_values(kwargs.get("update_fields"))
+
+    def remember_loaded_values(self, update_fields=None):
+        data = self.__dict__
+        # من __dict__ فقط: الحقول المؤجلة (defer) لا تُحمّل
+        values = {f.attname: data[f.attname] for f in self._meta.concrete_fields if f.attname in data}
+        if update_fields is not None:
+            # الحقول خارج update_fields لم تُكتب؛ مرجعها يبقى كما حُمّل
+            saved = {self._meta.get_field(name).attname for name in update_fields}
+            values = {**getattr(self, "_loaded_values", {}), **{k: v for k, v in values.items() if k in saved}}
+        self._loaded_values = values
@@ -3,5 +3,9 @@ from . import views
 
 
 urlpatterns = [
-    
-]
\ No newline at end of file
+    path("dashboard/", views.DashboardAPIView.as_view(), name="dashboard"),
+    path("changes/", views.ChangeFeedAPIView.as_view(), name="change-feed"),
+    path("changes/stream/", views.change_stream, name="change-stream"),
+    path("sync/", views.SyncAPIView.as_view(), name="sync"),
+    path("audit/", views.AuditLogAPIView.as_view(), name="audit-log"),
+]
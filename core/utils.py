@@ -0,0 +1,47 @@
+import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+
+# =====================================================================
+# وقت العيادة: USE_TZ=True والتخزين بـ UTC، لكن "اليوم" يُحسب بتوقيت العيادة
+# =====================================================================
+@lru_cache(maxsize=None)
+def _zone(name):
+    return ZoneInfo(name)
+
+
+def clinic_tz():
+    return _zone(getattr(settings, "CLINIC_TIME_ZONE", None) or settings.TIME_ZONE)
+
+
+def clinic_now():
+    return timezone.now().astimezone(clinic_tz())
+
+
+def clinic_today():
+    return clinic_now().date()
+
+
+def clinic_date(value):
+    """تاريخ اليوم بتوقيت العيادة لقيمة datetime (أو date كما هي)."""
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            return value.astimezone(clinic_tz()).date()
+        return value.date()
+    return value
+
+
+def clinic_day_bounds(start, end=None):
+    """[بداية start، بداية اليوم التالي لـ end) كقيم aware بتوقيت العيادة؛ نطاق صديق للفهارس."""
+    end = end or start
+    tz = clinic_tz()
+    return (
+        datetime.datetime.combine(start, datetime.time.min, tzinfo=tz),
+        datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz),
+    )
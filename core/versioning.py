@@ -0,0 +1,23 @@
+import time
+
+from django.core.cache import cache
+
+
+# =====================================================================
+# عدّادات نسخ في الكاش تُستخدم داخل مفاتيح الكاش:
+# أي تغيير يرفع النسخة فتصبح المفاتيح القديمة غير مستخدمة (تنتهي بالـ TTL)
+# =====================================================================
+def get_version(key):
+    value = cache.get(key)
+    if value is None:
+        # قيمة ابتدائية فريدة حتى لا تعود نسخة قديمة بعد طرد المفتاح من الكاش
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
@@ -1,3 +1,337 @@
-from django.shortcuts import render
+import datetime
+import json
+import uuid
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Sum
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.permissions import IsAdminUser
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import audit
+from .changefeed import (
+    FEED_LIMIT, CursorExpired, Entity, fetch_changes, max_wait, stream_changes, wait_for_changes,
+    wsgi_retry_ms, wsgi_stream_wait,
+)
+from .models import DailyAppointmentStat, DailyPatientStat, DailyPrescriptionStat, DailyProcedureStat
+from .sync import DEFAULT_LIMIT as SYNC_LIMIT
+from .sync import MAX_LIMIT as SYNC_MAX_LIMIT
+from .sync import SYNC_MODELS, InvalidSyncToken, SyncResetRequired, fetch_sync
+from .utils import clinic_day_bounds, clinic_today
+
+
+MAX_DASHBOARD_DAYS = 366
+TOP_N = 10
+
+
+# =====================================================================
+# لوحة المعلومات: تقرأ من جداول التجميع اليومي فقط
+# =====================================================================
+class DashboardAPIView(APIView):
+    """
+    GET /api/core/dashboard/?start=YYYY-MM-DD&end=YYYY-MM-DD  (الافتراضي: اليوم)
+    عدد الصفوف المقروءة يتناسب مع طول الفترة وعدد الأطباء/الإجراءات، لا مع حجم التاريخ.
+    """
+    def get_period(self, request):
+        today = clinic_today()
+        start_raw = request.query_params.get("start") or request.query_params.get("date")
+        end_raw = request.query_params.get("end") or start_raw
+        start = parse_date(start_raw) if start_raw else today
+        end = parse_date(end_raw) if end_raw else start
+        if start is None or end is None:
+            raise ValidationError({"date": "صيغة التاريخ YYYY-MM-DD."})
+        if end < start:
+            raise ValidationError({"end": "نهاية الفترة قبل بدايتها."})
+        if (end - start) > datetime.timedelta(days=MAX_DASHBOARD_DAYS):
+            raise ValidationError({"end": f"أقصى فترة {MAX_DASHBOARD_DAYS} يومًا."})
+        return start, end
+
+    def get(self, request):
+        start, end = self.get_period(request)
+        period = {"day__gte": start, "day__lte": end}
+
+        # المواعيد حسب الطبيب والحالة (صف لكل طبيب × حالة)
+        by_status, by_doctor = {}, {}
+        for row in (
+            DailyAppointmentStat.objects.filter(**period, count__gt=0)
+            .values("doctor_id", "status", first_name=F("doctor__user__first_name"), last_name=F("doctor__user__last_name"))
+            .annotate(n=Sum("count"))
+            .order_by("first_name", "last_name")
+        ):
+            by_status[row["status"]] = by_status.get(row["status"], 0) + row["n"]
+            doc = by_doctor.setdefault(row["doctor_id"], {
+                "doctor": row["doctor_id"],
+                "doctor_name": f"{row['first_name']} {row['last_name']}".strip(),
+                "total": 0,
+                "by_status": {},
+            })
+            doc["total"] += row["n"]
+            doc["by_status"][row["status"]] = row["n"]
+
+        new_patients = DailyPatientStat.objects.filter(**period).aggregate(n=Sum("new_patients"))["n"] or 0
+
+        # الإجراءات حسب التصنيف + أكثر الإجراءات
+        procedures = list(
+            DailyProcedureStat.objects.filter(**period, count__gt=0)
+            .values(
+                "procedure_id",
+                procedure_name=F("procedure__name"),
+                category_id=F("procedure__category_id"),
+                category_name=F("procedure__category__name"),
+            )
+            .annotate(n=Sum("count"))
+            .order_by("-n", "procedure_name")
+        )
+        by_category = {}
+        for row in procedures:
+            cat = by_category.setdefault(row["category_id"], {
+                "category": row["category_id"], "category_name": row["category_name"], "count": 0,
+            })
+            cat["count"] += row["n"]
+
+        prescriptions = list(
+            DailyPrescriptionStat.objects.filter(**period, count__gt=0)
+            .values("medication_id", medication_name=F("medication__name"))
+            .annotate(n=Sum("count"))
+            .order_by("-n", "medication_name")
+        )
+
+        return Response({
+            "start": start,
+            "end": end,
+            "appointments": {
+                "total": sum(by_status.values()),
+                "by_status": by_status,
+                "by_doctor": list(by_doctor.values()),
+            },
+            "new_patients": new_patients,
+            "procedures": {
+                "total": sum(r["n"] for r in procedures),
+                "by_category": sorted(by_category.values(), key=lambda c: -c["count"]),
+                "top": [
+                    {"procedure": r["procedure_id"], "procedure_name": r["procedure_name"], "count": r["n"]}
+                    for r in procedures[:TOP_N]
+                ],
+            },
+            "prescriptions": {
+                "total": sum(r["n"] for r in prescriptions),
+                "top_medications": [
+                    {"medication": r["medication_id"], "medication_name": r["medication_name"], "count": r["n"]}
+                    for r in prescriptions[:TOP_N]
+                ],
+            },
+        })
+
+
+# =====================================================================
+# Change feed
+# =====================================================================
+def parse_feed_params(params):
+    """يعيد (since, filters, limit, wait) أو يرفع ValueError برسالة للعميل."""
+    since = params.get("since")
+    if since not in (None, ""):
+        if not str(since).isdigit():
+            raise ValueError("since يجب أن يكون رقمًا صحيحًا.")
+        since = int(since)
+    else:
+        since = None
+
+    entities = params.getlist("entity") if hasattr(params, "getlist") else []
+    invalid = [e for e in entities if e not in Entity.values]
+    if invalid:
+        raise ValueError(f"كيانات غير معروفة: {', '.join(invalid)}")
+
+    day = None
+    if params.get("day"):
+        day = parse_date(params["day"])
+        if day is None:
+            raise ValueError("صيغة اليوم YYYY-MM-DD.")
+
+    doctor_id = None
+    if params.get("doctor"):
+        try:
+            doctor_id = uuid.UUID(params["doctor"])
+        except ValueError:
+            raise ValueError("معرّف طبيب غير صالح.")
+
+    try:
+        limit = min(max(int(params.get("limit") or FEED_LIMIT), 1), FEED_LIMIT)
+        wait = min(max(float(params.get("wait") or 0), 0), max_wait())
+    except ValueError:
+        raise ValueError("limit/wait يجب أن تكون أرقامًا.")
+
+    return since, {"entities": entities, "day": day, "doctor_id": doctor_id}, limit, wait
+
+
+class ChangeFeedAPIView(APIView):
+    """
+    GET /api/core/changes/?since=<cursor>[&entity=appointment&entity=clinical_exam][&day=][&doctor=][&wait=20]
+    - بدون since: يعيد المؤشر الحالي فقط (حمّل اللقطة ثم تابع منه)
+    - wait: انتظار طويل (long-poll) بالثواني حتى يظهر تغيير، بحد أقصى CHANGE_FEED_MAX_WAIT
+    - 410: المؤشر أقدم من السجل المحفوظ؛ أعد تحميل اللقطة
+    """
+    def get(self, request):
+        try:
+            since, filters, limit, wait = parse_feed_params(request.query_params)
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
+        try:
+            if wait:
+                result = wait_for_changes(since, wait, limit=limit, **filters)
+            else:
+                result = fetch_changes(since, limit=limit, **filters)
+        except CursorExpired:
+            return Response({"detail": "المؤشر منتهي؛ أعد التحميل الكامل.", "reset": True}, status=status.HTTP_410_GONE)
+        return Response(result)
+
+
+def _sse_event(result):
+    body = json.dumps(result["changes"], cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"id: {result['cursor']}\nevent: changes\ndata: {body}\n\n"
+
+
+async def change_stream(request):
+    """
+    GET /api/core/changes/stream/?since=<cursor>  (text/event-stream، متوافق مع EventSource)
+    - تحت ASGI: اتصال مفتوح يدفع كل دفعة تغييرات كحدث، مع نبضات keep-alive.
+    - تحت WSGI: لا نحجز العامل؛ ننتظر ثانية أو ثانيتين على الأكثر (CHANGE_FEED_WSGI_STREAM_WAIT)
+      ثم نغلق مع retry، فيعيد EventSource الاتصال تلقائيًا مرسلًا Last-Event-ID كمؤشر.
+    """
+    params = request.GET.copy()
+    if not params.get("since") and request.headers.get("Last-Event-ID"):
+        params["since"] = request.headers["Last-Event-ID"]
+    try:
+        since, filters, limit, _wait = parse_feed_params(params)
+    except ValueError as e:
+        return JsonResponse({"detail": str(e)}, status=400)
+    filters["limit"] = limit
+
+    if isinstance(request, ASGIRequest):
+        async def events():
+            try:
+                yield "retry: 3000\n\n"
+                async for result in stream_changes(since, **filters):
+                    yield ": keep-alive\n\n" if result is None else _sse_event(result)
+            except CursorExpired:
+                yield "event: reset\ndata: {}\n\n"
+
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    else:
+        try:
+            result = await sync_to_async(wait_for_changes)(since, wsgi_stream_wait(), **filters)
+            body = f"retry: {wsgi_retry_ms()}\n\n" + _sse_event(result)
+        except CursorExpired:
+            body = "event: reset\ndata: {}\n\n"
+        response = HttpResponse(body, content_type="text/event-stream")
+
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: لا تخزّن البث مؤقتًا
+    return response
+
+
+# =====================================================================
+# مزامنة الأجهزة (delta sync)
+# =====================================================================
+class SyncAPIView(APIView):
+    """
+    GET /api/core/sync/?since=<token>[&models=patient,appointment][&limit=500]
+    - بدون since: لقطة كاملة مجزأة (models يحدد النماذج المطلوبة)
+    - الاستجابة: {token, has_more, changes: {model: {fields, rows}}, deleted: {model: [ids]}}
+    - 410: الرمز أقدم من مدة الاحتفاظ بشواهد الحذف؛ أعد المزامنة من الصفر
+    """
+    def get(self, request):
+        params = request.query_params
+        models = [m for m in (params.get("models") or "").split(",") if m]
+        unknown = [m for m in models if m not in SYNC_MODELS]
+        if unknown:
+            raise ValidationError({"models": f"نماذج غير معروفة: {', '.join(unknown)}"})
+        try:
+            limit = min(max(int(params.get("limit") or SYNC_LIMIT), 1), SYNC_MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({"limit": "limit يجب أن يكون رقمًا."})
+
+        try:
+            result = fetch_sync(params.get("since") or None, models=models, limit=limit)
+        except InvalidSyncToken as e:
+            raise ValidationError({"since": str(e)})
+        except SyncResetRequired:
+            return Response({"detail": "رمز المزامنة منتهي؛ أعد المزامنة الكاملة.", "reset": True}, status=status.HTTP_410_GONE)
+        return Response(result)
+
+
+# =====================================================================
+# سجل التدقيق (للمشرفين فقط)
+# =====================================================================
+def _audit_bound(raw, name, end=False):
+    """datetime كاملة أو تاريخ (بداية يوم العيادة، أو نهايته لـ until)."""
+    at = parse_datetime(raw)
+    if at is not None:
+        return timezone.make_aware(at) if timezone.is_naive(at) else at
+    day = parse_date(raw)
+    if day is None:
+        raise ValidationError({name: "صيغة التاريخ YYYY-MM-DD أو ISO 8601."})
+    start, stop = clinic_day_bounds(day)
+    return stop if end else start
+
+
+class AuditLogAPIView(APIView):
+    """
+    GET /api/core/audit/?patient=<uuid> | ?actor=<uuid> | ?entity=appointment&object_id=<id>
+        [&since=][&until=][&limit=100][&cursor=]
+    - مرشح واحد على الأقل (مريض أو فاعل أو كائن) حتى لا يُمسح السجل كاملًا
+    - بدون since: آخر AUDIT_QUERY_DEFAULT_DAYS يومًا؛ النطاق يحصر القراءة في أقسامه
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        patient_id, actor_id = params.get("patient") or None, params.get("actor") or None
+        entity, object_id = params.get("entity") or None, params.get("object_id") or None
+        if not (patient_id or actor_id or (entity and object_id)):
+            raise ValidationError({"detail": "حدد patient أو actor أو entity مع object_id."})
+        for name, value in (("patient", patient_id), ("actor", actor_id)):
+            if value:
+                try:
+                    uuid.UUID(value)
+                except ValueError:
+                    raise ValidationError({name: "معرّف UUID غير صالح."})
+
+        until = _audit_bound(params["until"], "until", end=True) if params.get("until") else timezone.now()
+        if params.get("since"):
+            since = _audit_bound(params["since"], "since")
+        else:
+            days = getattr(settings, "AUDIT_QUERY_DEFAULT_DAYS", audit.DEFAULT_QUERY_DAYS)
+            since = until - datetime.timedelta(days=days)
+        if until <= since:
+            raise ValidationError({"until": "نهاية الفترة قبل بدايتها."})
+        try:
+            limit = min(max(int(params.get("limit") or audit.DEFAULT_LIMIT), 1), audit.MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({"limit": "limit يجب أن يكون رقمًا."})
+
+        try:
+            result = audit.query_events(
+                since, until, patient_id=patient_id, actor_id=actor_id, entity=entity, object_id=object_id,
+                cursor=params.get("cursor") or None, limit=limit,
+            )
+        except audit.InvalidAuditCursor as e:
+            raise ValidationError({"cursor": str(e)})
+
+        # أسماء الفاعلين في استعلام واحد للصفحة
+        actor_ids = {row["actor_id"] for row in result["results"] if row["actor_id"]}
+        names = {
+            user.pk: user.get_full_name() or user.get_username()
+            for user in get_user_model().objects.filter(pk__in=actor_ids).only("id", "first_name", "last_name", "email")
+        } if actor_ids else {}
+        for row in result["results"]:
+            row["actor_name"] = names.get(row["actor_id"])
+        return Response({"since": since, "until": until, **result})
@@ -1,5 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html, format_html_join
+from django.db.models import Count
+from django.utils.safestring import mark_safe
+
+from core.admin_mixins import ClinicAdminMixin
 
 from .models import (
     MedicalRecord,
@@ -10,10 +14,12 @@ from .models import (
     MedicationPackageItem,
     AppliedMedicationPackage,
     PatientPrescriptionReport,
+    DiseaseContraindication,
+    MedicationInteraction,
 )
-from appointment.models import Appointment
-from procedures.models import Procedure, ProcedureToothcode,ClinicalExam
-from django.db.models import Count, Max
+from .history import history_fragments
+from .signals import prescriptions_changed
+from .reports import medication_summaries, prescription_report_queryset
 
 # ===========================
 # Inlines
@@ -36,8 +42,9 @@ class MedicationPackageItemInline(admin.TabularInline):
 # MedicalRecord Admin
 # ===========================
 @admin.register(MedicalRecord)
-class MedicalRecordAdmin(admin.ModelAdmin):
+class MedicalRecordAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["patient", "created_at"]
+    list_select_related = ["patient"]
     search_fields = ["patient__first_name", "patient__last_name", "patient__email"]
     readonly_fields = [
         "created_at", "updated_at",
@@ -118,190 +125,34 @@ class MedicalRecordAdmin(admin.ModelAdmin):
         return format_html_join("\n", "<div>• {}</div>", items) if items else "لا يوجد"
     patient_allergies_list.short_description = "حساسيات الأدوية"
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("patient")
+
+    # --- لوحات السجل الثلاث من محمّل واحد وHTML مخزّن في الكاش (medicalrecord/history.py)
+    def _history(self, obj):
+        if not hasattr(obj, "_history"):
+            obj._history = history_fragments(obj.patient_id)
+        return obj._history
+
     # --- سجل المواعيد والفحوصات
     def appointment_history(self, obj):
         if not obj or not obj.patient:
             return "لا يوجد مريض مرتبط"
-        appointments = (
-            Appointment.objects
-            .filter(patient=obj.patient)
-            .select_related("doctor__user")
-            .order_by("-date", "-time")
-        )
-        if not appointments.exists():
-            return "لا توجد مواعيد"
-
-        rows = []
-        for appt in appointments:
-            doctor_name = (
-                appt.doctor.user.get_full_name()
-                if getattr(appt, "doctor", None) and getattr(appt.doctor, "user", None)
-                else "—"
-            )
-            status_display = appt.get_status_display() if hasattr(appt, "get_status_display") else (appt.status or "—")
-
-            row = f"<b>📅 التاريخ:</b> {getattr(appt, 'date', '—')} - <b>🕒 الوقت:</b> {getattr(appt, 'time', '—')}<br>"
-            row += f"<b>👨‍⚕️ الطبيب:</b> {doctor_name}<br>"
-            row += f"<b>📌 الحالة:</b> {status_display}<br>"
-
-            exam = getattr(appt, "clinical_exam", None)
-            if exam:
-                row += "<i>🔍 فحص سريري:</i><br>"
-                row += f"&nbsp;&nbsp;- الشكوى: {getattr(exam, 'complaint', None) or '-'}<br>"
-                row += f"&nbsp;&nbsp;- النصيحة: {getattr(exam, 'medical_advice', None) or '-'}<br>"
-                row += f"&nbsp;&nbsp;- الإجراءات: {getattr(exam, 'planned_procedures', None) or '-'}<br>"
-            else:
-                row += "<i>⚠ لا يوجد فحص سريري لهذا الموعد</i><br>"
-
-            rows.append(row)
-        return format_html("<hr>".join(rows))
+        return mark_safe(self._history(obj)["appointments"])
     appointment_history.short_description = "سجل المواعيد والفحوصات"
 
     # --- الإجراءات المنفّذة على أسنان المريض
     def procedures_history(self, obj):
         if not obj or not obj.patient:
             return "لا يوجد مريض مرتبط"
-
-        qs = (
-            Procedure.objects
-            .filter(clinical_exam__patient=obj.patient)
-            .select_related("clinical_exam__appointment", "definition", "clinical_exam__doctor__user")
-            .order_by("-created_at")
-        )
-
-        if not qs.exists():
-            return "لا توجد إجراءات مسجّلة"
-
-        rows = []
-        for proc in qs:
-            # اسم الإجراء التعريفي
-            proc_name = (
-                getattr(getattr(proc, "dental_procedure", None), "name", None)
-                or getattr(getattr(proc, "procedure", None), "name", None)
-                or getattr(proc, "procedure_name", None)
-                or "إجراء غير محدد"
-            )
-
-            # الأسنان المرتبطة
-            teeth_parts = []
-            try:
-                tqs = (
-                    ProcedureToothcode.objects
-                    .filter(procedure=proc)
-                    .select_related("toothcode")
-                )
-                for t in tqs:
-                    tc = getattr(t, "toothcode", None)
-                    code = (
-                        getattr(tc, "code", None)
-                        or getattr(tc, "number", None)
-                        or getattr(tc, "name", None)
-                    )
-                    if code:
-                        teeth_parts.append(str(code))
-            except Exception:
-                pass
-
-            # fallback: علاقة مباشرة M2M إن وُجدت
-            if not teeth_parts:
-                rel = getattr(proc, "teeth", None)
-                if rel is not None:
-                    try:
-                        for tc in rel.all():
-                            code = (
-                                getattr(tc, "code", None)
-                                or getattr(tc, "number", None)
-                                or getattr(tc, "name", None)
-                            )
-                            if code:
-                                teeth_parts.append(str(code))
-                    except Exception:
-                        pass
-
-            teeth_txt = ", ".join(teeth_parts) if teeth_parts else "—"
-
-            # الطبيب
-            performed_by = getattr(proc, "performed_by", None)
-            doctor_name = (
-                getattr(getattr(performed_by, "user", None), "get_full_name", lambda: None)()  # type: ignore
-                if performed_by else None
-            ) or "—"
-
-            # الموعد
-            appt = getattr(getattr(proc, "clinical_exam", None), "appointment", None)
-            appt_date = getattr(appt, "date", None) or "—"
-            appt_time = getattr(appt, "time", None) or "—"
-
-            notes = getattr(proc, "notes", None) or "—"
-            created_at = getattr(proc, "created_at", None) or "—"
-
-            row = (
-                f"<b>🧾 الإجراء:</b> {proc_name}<br>"
-                f"<b>🦷 الأسنان:</b> {teeth_txt}<br>"
-                f"<b>👨‍⚕️ الطبيب:</b> {doctor_name}<br>"
-                f"<b>📅 الموعد:</b> {appt_date} — {appt_time}<br>"
-                f"<b>📝 ملاحظات:</b> {notes}<br>"
-                f"<b>⏱️ أُنشئ في:</b> {created_at}"
-            )
-            rows.append(row)
-
-        return format_html("<hr>".join(rows))
-
+        return mark_safe(self._history(obj)["procedures"])
     procedures_history.short_description = "الإجراءات المنفّذة"
 
     # --- الوصفات الطبية المصروفة (أدوية مفردة لكل فحص)
     def prescriptions_history(self, obj):
         if not obj or not obj.patient:
             return "لا يوجد مريض مرتبط"
-
-        qs = (
-            PrescribedMedication.objects
-            .filter(clinical_exam__patient=obj.patient)
-            .select_related(
-                "medication",
-                "prescribed_by__user",
-                "clinical_exam__appointment",
-            )
-            .order_by("-prescribed_at")
-        )
-
-        if not qs.exists():
-            return "لا توجد وصفات مصروفة"
-
-        rows = []
-        for pm in qs:
-            med_name = getattr(getattr(pm, "medication", None), "name", None) or "—"
-            times_per_day = getattr(pm, "times_per_day", None)
-            dose_unit = getattr(pm, "dose_unit", None) or "—"
-            number_of_days = getattr(pm, "number_of_days", None)
-            notes = getattr(pm, "notes", None) or "—"
-
-            prescriber = getattr(pm, "prescribed_by", None)
-            prescriber_name = (
-                getattr(getattr(prescriber, "user", None), "get_full_name", lambda: None)()  # type: ignore
-                if prescriber else None
-            ) or "—"
-
-            prescribed_at = getattr(pm, "prescribed_at", None) or "—"
-
-            appt = getattr(getattr(pm, "clinical_exam", None), "appointment", None)
-            appt_date = getattr(appt, "date", None) or "—"
-            appt_time = getattr(appt, "time", None) or "—"
-
-            row = (
-                f"<b>💊 الدواء:</b> {med_name}<br>"
-                f"<b>⏰ الجرعات/اليوم:</b> {times_per_day if times_per_day is not None else '—'}<br>"
-                f"<b>🧪 وحدة الجرعة:</b> {dose_unit}<br>"
-                f"<b>📆 عدد الأيام:</b> {number_of_days if number_of_days is not None else '—'}<br>"
-                f"<b>📝 ملاحظات:</b> {notes}<br>"
-                f"<b>👨‍⚕️ الموصي:</b> {prescriber_name}<br>"
-                f"<b>🕒 وقت الصرف:</b> {prescribed_at}<br>"
-                f"<b>📅 الموعد:</b> {appt_date} — {appt_time}"
-            )
-            rows.append(row)
-
-        return format_html("<hr>".join(rows))
-
+        return mark_safe(self._history(obj)["prescriptions"])
     prescriptions_history.short_description = "الوصفات الطبية المصروفة"
 
 
@@ -309,8 +160,9 @@ class MedicalRecordAdmin(admin.ModelAdmin):
 # Attachment
 # ===========================
 @admin.register(Attachment)
-class AttachmentAdmin(admin.ModelAdmin):
+class AttachmentAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["type", "medical_record", "uploaded_at"]
+    list_select_related = ["medical_record__patient"]
     search_fields = ["medical_record__patient__first_name", "medical_record__patient__last_name"]
     list_filter = ["type", "uploaded_at"]
     raw_id_fields = ["medical_record"]
@@ -320,8 +172,8 @@ class AttachmentAdmin(admin.ModelAdmin):
 # Medication
 # ===========================
 @admin.register(Medication)
-class MedicationAdmin(admin.ModelAdmin):
-    list_display = ["name", "default_dose_unit", "is_active"]
+class MedicationAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["name", "default_dose_unit", "is_active", "created_at"]
     search_fields = ["name"]
     list_filter = ["is_active"]
 
@@ -330,7 +182,7 @@ class MedicationAdmin(admin.ModelAdmin):
 # PrescribedMedication
 # ===========================
 @admin.register(PrescribedMedication)
-class PrescribedMedicationAdmin(admin.ModelAdmin):
+class PrescribedMedicationAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = [
         "medication", "clinical_exam",
         "times_per_day", "dose_unit", "number_of_days",
@@ -343,6 +195,35 @@ class PrescribedMedicationAdmin(admin.ModelAdmin):
     ]
     list_filter = ["prescribed_by", "prescribed_at"]
     raw_id_fields = ["clinical_exam", "medication", "prescribed_by"]
+    list_select_related = ["medication", "clinical_exam__patient", "prescribed_by__user"]
+
+    # الحفظ والحذف من الأدمن يمرّان بإشارة الواجهات (prescriptions_changed): سجل المريض، الإحصاءات،
+    # change feed والتدقيق؛ لا مستقبلات post_save/post_delete لكل صف على الوصفات
+    def save_model(self, request, obj, form, change):
+        before = PrescribedMedication.objects.select_related("clinical_exam").get(pk=obj.pk) if change else None
+        super().save_model(request, obj, form, change)
+        if before is not None and before.clinical_exam_id != obj.clinical_exam_id:
+            prescriptions_changed.send(
+                sender=PrescribedMedication, exam_id=before.clinical_exam_id, added=[], removed=[before],
+            )
+            before = None
+        prescriptions_changed.send(
+            sender=PrescribedMedication, exam_id=obj.clinical_exam_id,
+            added=[obj], removed=[before] if before is not None else [],
+        )
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, PrescribedMedication.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        rows = list(queryset.select_related("clinical_exam"))
+        super().delete_queryset(request, queryset)
+        by_exam = {}
+        for row in rows:
+            by_exam.setdefault(row.clinical_exam_id, []).append(row)
+        for exam_id, removed in by_exam.items():
+            prescriptions_changed.send(sender=PrescribedMedication, exam_id=exam_id, added=[], removed=removed)
+
     # def has_module_permission(self, request):
     #     # يمنع ظهور التطبيق في فهرس الأدمن
     #     return False
@@ -351,23 +232,27 @@ class PrescribedMedicationAdmin(admin.ModelAdmin):
 # MedicationPackage (+ items)
 # ===========================
 @admin.register(MedicationPackage)
-class MedicationPackageAdmin(admin.ModelAdmin):
+class MedicationPackageAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["name", "disease", "is_active", "created_at", "items_count"]
     search_fields = ["name", "disease__name"]
     list_filter = ["is_active", "disease"]
     inlines = [MedicationPackageItemInline]
+    list_select_related = ["disease"]
+    list_annotations = {"_items_count": Count("items", distinct=True)}
 
     def items_count(self, obj):
-        return obj.items.count()
+        return obj._items_count
     items_count.short_description = "عدد الأدوية"
+    items_count.admin_order_field = "_items_count"
 
 
 # ===========================
 # AppliedMedicationPackage
 # ===========================
 @admin.register(AppliedMedicationPackage)
-class AppliedMedicationPackageAdmin(admin.ModelAdmin):
+class AppliedMedicationPackageAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["package", "clinical_exam", "prescribed_by", "mode", "prescribed_at"]
+    list_select_related = ["package__disease", "clinical_exam__patient", "prescribed_by__user"]
     list_filter = ["mode", "prescribed_by", "prescribed_at", "package__disease"]
     search_fields = [
         "package__name",
@@ -378,6 +263,27 @@ class AppliedMedicationPackageAdmin(admin.ModelAdmin):
     raw_id_fields = ["clinical_exam", "package", "prescribed_by"]
 
 
+# ===========================
+# Safety rules (medicalrecord/safety.py)
+# ===========================
+@admin.register(DiseaseContraindication)
+class DiseaseContraindicationAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["disease", "medication", "severity"]
+    list_filter = ["severity"]
+    search_fields = ["disease__name", "medication__name"]
+    list_select_related = ["disease", "medication"]
+    autocomplete_fields = ["disease", "medication"]
+
+
+@admin.register(MedicationInteraction)
+class MedicationInteractionAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["medication_a", "medication_b", "severity"]
+    list_filter = ["severity"]
+    search_fields = ["medication_a__name", "medication_b__name"]
+    list_select_related = ["medication_a", "medication_b"]
+    autocomplete_fields = ["medication_a", "medication_b"]
+
+
 class PrescribedMedicationInline(admin.TabularInline):
     model = PrescribedMedication
     extra = 1
@@ -391,23 +297,24 @@ class PrescribedMedicationInline(admin.TabularInline):
 # #     search_fields = ["patient__first_name", "patient__last_name", "doctor__user__first_name", "doctor__user__last_name"]
 # #     inlines = [PrescribedMedicationInline]
 @admin.register(PatientPrescriptionReport)
-class PatientPrescriptionReportAdmin(admin.ModelAdmin):
+class PatientPrescriptionReportAdmin(ClinicAdminMixin, admin.ModelAdmin):
     # عرض اسم المريض، عدد الأدوية المصروفة، آخر تاريخ صرف، وقائمة الأدوية
     list_display = ["patient_name", "total_prescriptions", "last_prescribed_at", "medications_summary"]
     search_fields = ["first_name", "last_name", "email", "phone", "address"]
     list_per_page = 20
 
     def get_queryset(self, request):
-        """
-        نحسّن الاستعلام بضم إحصاءات: العدد وآخر تاريخ،
-        ونقلل الاستعلامات لاحقًا.
-        """
-        qs = super().get_queryset(request)
-        # ضم aggregate على جدول PrescribedMedication عبر clinical_exam__patient
-        return qs.annotate(
-            _total=Count("clinical_exams__prescribed_medications", distinct=False),
-            _last=Max("clinical_exams__prescribed_medications__prescribed_at"),
-        )
+        # العدد وآخر صرف من subquery لكل مريض (medicalrecord/reports.py)
+        return prescription_report_queryset(super().get_queryset(request))
+
+    def get_changelist_instance(self, request):
+        # ملخص أدوية الصفحة كلها باستعلام واحد بدل استعلام لكل صف
+        cl = super().get_changelist_instance(request)
+        patients = list(cl.result_list)
+        summaries = medication_summaries([p.pk for p in patients])
+        for p in patients:
+            p._med_summary = summaries[p.pk]
+        return cl
 
     def patient_name(self, obj):
         return f"{obj.first_name or ''} {obj.last_name or ''}".strip() or "—"
@@ -415,43 +322,34 @@ class PatientPrescriptionReportAdmin(admin.ModelAdmin):
 
     def total_prescriptions(self, obj):
         # قِيمة من الـ annotate
-        return getattr(obj, "_total", 0)
+        return getattr(obj, "total_prescriptions", 0)
     total_prescriptions.short_description = "عدد الأدوية المصروفة"
+    total_prescriptions.admin_order_field = "total_prescriptions"
 
     def last_prescribed_at(self, obj):
-        val = getattr(obj, "_last", None)
+        val = getattr(obj, "last_prescribed_at", None)
         return val or "—"
     last_prescribed_at.short_description = "آخر صرف"
+    last_prescribed_at.admin_order_field = "last_prescribed_at"
 
     def medications_summary(self, obj):
-        items = (
-            PrescribedMedication.objects
-            .filter(clinical_exam__patient=obj)
-            .select_related("medication")
-            .order_by("-prescribed_at")
-        )
-        if not items.exists():
+        summary = getattr(obj, "_med_summary", None)
+        if summary is None:
+            summary = medication_summaries([obj.pk])[obj.pk]
+        if not summary:
             return "لا توجد أدوية مصروفة"
 
-        grouped = {}
-        for pm in items:
-            name = getattr(getattr(pm, "medication", None), "name", None) or "—"
-            entry = grouped.setdefault(name, {"count": 0, "lines": []})
-            entry["count"] += 1
-            entry["lines"].append(
-                f"{getattr(pm, 'times_per_day', '—')}×/اليوم، "
-                f"{getattr(pm, 'number_of_days', '—')} يوم، "
-                f"{getattr(pm, 'dose_unit', '—')}"
-            )
-
         rows = []
-        for name, data in grouped.items():
-            preview = " | ".join(data["lines"][:2])
-            more = f" …(+{len(data['lines'])-2})" if len(data["lines"]) > 2 else ""
+        for entry in summary:
+            preview = " | ".join(
+                f"{line['times_per_day'] or '—'}×/اليوم، {line['number_of_days'] or '—'} يوم، {line['dose_unit'] or '—'}"
+                for line in entry["recent"]
+            )
+            more = f" …(+{entry['count'] - len(entry['recent'])})" if entry["count"] > len(entry["recent"]) else ""
             rows.append(
                 format_html(
                     "💊 <b>{}</b> <small>(x{})</small><br><span>{}{}</span>",
-                    name, data["count"], preview, more
+                    entry["medication"], entry["count"], preview, more
                 )
             )
         return format_html_join("\n", "<div style='margin-bottom:6px;'>• {}</div>", ((row,) for row in rows))
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MedicalrecordConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'medicalrecord'
+
+    def ready(self):
+        from . import receivers  # noqa: F401
@@ -0,0 +1,102 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from core.text import normalize_name
+from core.versioning import bump_version, get_version
+
+from .models import Medication
+
+
+# =====================================================================
+# قاموس الأدوية: تحويل (معرّف أو اسم) → دواء
+# المطابقة على name_key (فهرس unique) بدل name__iexact، والنتائج في الكاش:
+#   medicalrecord:catalogue:{version}:id:{pk}  و  medicalrecord:catalogue:{version}:key:{sha1(name_key)}
+# الأسماء غير الموجودة لا تُخزن (إنشاؤها لاحقًا لا يحتاج إبطالًا)؛ تعديل/حذف دواء يرفع النسخة
+# (medicalrecord/receivers.py). دفعة من القيم تكلف get_many + استعلامًا واحدًا للمفقود.
+# =====================================================================
+CATALOGUE_TTL = 6 * 60 * 60
+CATALOGUE_VERSION_KEY = "medicalrecord:catalogue:v"
+CACHED_FIELDS = ("id", "name", "name_key", "default_dose_unit", "is_active")
+
+
+def medication_key(name):
+    return normalize_name(name)
+
+
+def invalidate_catalogue():
+    bump_version(CATALOGUE_VERSION_KEY)
+
+
+def _key_suffix(key):
+    # الاسم قد يحوي مسافات/حروفًا عربية لا تقبلها بعض خوادم الكاش (memcached)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _is_id(value):
+    return isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit())
+
+
+def medication_lookup_value(data):
+    """القيمة القابلة للتحويل من مدخل FlexibleMedicationField: رقم/نص أو {"id"}/{"name"}."""
+    if isinstance(data, dict):
+        return data.get("id") or data.get("name")
+    return data
+
+
+def resolve_medications(values):
+    """{القيمة كما أُرسلت: Medication} للقيم الموجودة فقط (معرّفات أو أسماء)."""
+    prefix = f"medicalrecord:catalogue:{get_version(CATALOGUE_VERSION_KEY)}"
+    wanted = {}
+    for value in values:
+        if value is None or isinstance(value, bool):
+            continue
+        if _is_id(value):
+            wanted[f"{prefix}:id:{int(value)}"] = value
+        else:
+            key = medication_key(value)
+            if key:
+                wanted[f"{prefix}:key:{_key_suffix(key)}"] = value
+
+    found = cache.get_many(list(wanted)) if wanted else {}
+    missing = [k for k in wanted if k not in found]
+    if missing:
+        ids = {int(wanted[k]) for k in missing if ":id:" in k}
+        keys = {medication_key(wanted[k]) for k in missing if ":key:" in k}
+        fresh = {}
+        for row in Medication.objects.filter(Q(pk__in=ids) | Q(name_key__in=keys)).values(*CACHED_FIELDS):
+            fresh[f"{prefix}:id:{row['id']}"] = row
+            fresh[f"{prefix}:key:{_key_suffix(row['name_key'])}"] = row
+        if fresh:
+            cache.set_many(fresh, CATALOGUE_TTL)
+        found.update({k: fresh[k] for k in missing if k in fresh})
+
+    return {wanted[k]: Medication(**row) for k, row in found.items()}
+
+
+def resolve_medication(value):
+    return resolve_medications([value]).get(value)
+
+
+def get_or_create_medications(names, defaults=None):
+    """
+    {الاسم: Medication} مع إنشاء الناقص دفعة واحدة.
+    ON CONFLICT (name_key) يحمي من إنشاء نفس الدواء بطلبين متزامنين ويُرجع الـ id في الحالتين.
+    """
+    names = [name.strip() for name in names if name and name.strip()]
+    result = resolve_medications(names)
+    new = {}
+    for name in names:
+        if name not in result:
+            new.setdefault(medication_key(name), Medication(
+                name=name, name_key=medication_key(name), is_active=True, **(defaults or {}).get(name, {}),
+            ))
+    if new:
+        Medication.objects.bulk_create(
+            list(new.values()), update_conflicts=True, unique_fields=["name_key"], update_fields=["is_active"],
+        )
+        for name in names:
+            if name not in result:
+                result[name] = new[medication_key(name)]
+    return result
@@ -0,0 +1,189 @@
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Prefetch, prefetch_related_objects
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core.utils import clinic_date, clinic_day_bounds
+from procedures.models import ClinicalExam
+
+from .models import PrescribedMedication
+
+try:
+    import weasyprint
+except ImportError:  # PDF اختياري؛ بدونه يُعاد HTML قابل للطباعة من المتصفح
+    weasyprint = None
+
+
+# =====================================================================
+# مستند الوصفة للطباعة (HTML عربي RTL، وPDF إن توفرت WeasyPrint)
+#   - القوالب تُترجم مرة واحدة لكل عملية (_template) بدل قراءة/تحليل الملف في كل طلب
+#   - صفحة كل فحص تُخزن في الكاش بمفتاح هو بصمة بياناتها المعروضة (document_context):
+#     أي تغيير في الدواء أو الجرعة أو المريض أو الطبيب يغيّر المفتاح في كل العمليات دون إبطال،
+#     فلا تُطبع من عامل آخر وصفة قديمة. الثمن استعلام عناصر الوصفة في كل طلب؛ التصيير وPDF من الكاش
+#   - الطباعة المجمعة: البيانات تُحمّل في الخيط الرئيسي بعدد ثابت من الاستعلامات،
+#     والتصيير فقط (بلا قاعدة بيانات) في مجمع خيوط، ثم تُدمج الصفحات في ملف واحد
+# =====================================================================
+DOCUMENT_TTL = 24 * 60 * 60
+HTML = "html"
+PDF = "pdf"
+FORMATS = (HTML, PDF)
+CONTENT_TYPES = {HTML: "text/html; charset=utf-8", PDF: "application/pdf"}
+
+PAGE_TEMPLATE = "medicalrecord/prescription_page.html"
+DOCUMENT_TEMPLATE = "medicalrecord/prescription_document.html"
+
+
+def pdf_available():
+    return weasyprint is not None
+
+
+@lru_cache(maxsize=None)
+def _template(name):
+    return get_template(name)
+
+
+def render_workers():
+    return getattr(settings, "PRESCRIPTION_RENDER_WORKERS", 4)
+
+
+def batch_limit():
+    return getattr(settings, "PRESCRIPTION_BATCH_LIMIT", 200)
+
+
+# ---------------------------------------------------------------------
+# تحميل البيانات
+# ---------------------------------------------------------------------
+def document_queryset():
+    # عناصر الوصفة تُحمّل دفعة واحدة عند حساب البصمة (_contexts)
+    return ClinicalExam.objects.select_related("patient", "doctor__user")
+
+
+def _load_items(exams):
+    prefetch_related_objects(exams, Prefetch(
+        "prescribed_medications",
+        queryset=PrescribedMedication.objects.select_related("medication").order_by("prescribed_at", "id"),
+    ))
+
+
+def exams_for_day(day, doctor_id=None):
+    """فحوص فيها أدوية صُرفت في يوم العيادة day (نطاق prescribed_at يستخدم الفهرس)."""
+    start, end = clinic_day_bounds(day)
+    prescribed = PrescribedMedication.objects.filter(
+        clinical_exam=OuterRef("pk"), prescribed_at__gte=start, prescribed_at__lt=end,
+    )
+    qs = document_queryset().filter(Exists(prescribed))
+    if doctor_id:
+        qs = qs.filter(doctor_id=doctor_id)
+    return qs.order_by("doctor_id", "created_at", "id")
+
+
+def _age(birth, on):
+    if not birth or not on:
+        return None
+    return on.year - birth.year - ((on.month, on.day) < (birth.month, birth.day))
+
+
+def document_context(exam):
+    """قيم جاهزة فقط (لا كائنات ORM) حتى يُصيَّر القالب في أي خيط دون استعلامات."""
+    patient = exam.patient
+    day = clinic_date(exam.created_at)
+    doctor = exam.doctor
+    return {
+        "clinic_name": getattr(settings, "CLINIC_NAME", "DentPro"),
+        "exam_id": exam.pk,
+        "date": day,
+        "patient_name": f"{patient.first_name} {patient.last_name}".strip(),
+        "patient_age": _age(patient.date_of_birth, day),
+        "doctor_name": doctor.user.get_full_name() if doctor is not None else None,
+        "notes": exam.prescription_notes or "",
+        "items": [
+            {
+                "medication": pm.medication.name,
+                "times_per_day": pm.times_per_day,
+                "dose_unit": pm.dose_unit,
+                "number_of_days": pm.number_of_days,
+                "notes": pm.notes,
+            }
+            for pm in exam.prescribed_medications.all()
+        ],
+    }
+
+
+# ---------------------------------------------------------------------
+# التصيير
+# ---------------------------------------------------------------------
+def _contexts(exams):
+    """document_context لكل فحص (عناصر الوصفة باستعلام واحد للفحوص التي لم تُحمّل بعد)."""
+    pending = [exam for exam in exams if not hasattr(exam, "_document_context")]
+    if pending:
+        _load_items(pending)
+        for exam in pending:
+            exam._document_context = document_context(exam)
+    return [exam._document_context for exam in exams]
+
+
+def _page_key(context):
+    digest = hashlib.sha256(json.dumps(context, sort_keys=True, default=str).encode()).hexdigest()
+    return f"medicalrecord:rx-doc:{context['exam_id']}:{digest}"
+
+
+def render_page(context):
+    return _template(PAGE_TEMPLATE).render(context)
+
+
+def wrap_pages(pages, title):
+    return _template(DOCUMENT_TEMPLATE).render({"title": title, "pages": mark_safe("\n".join(pages))})
+
+
+def _pdf(html):
+    return weasyprint.HTML(string=html, base_url=str(settings.BASE_DIR)).render()
+
+
+def _pages(exams, pool=None):
+    """صفحة HTML لكل فحص بالترتيب؛ الموجود من الكاش (get_many) والباقي يُصيَّر (في المجمع إن وُجد)."""
+    contexts = _contexts(exams)
+    keys = [_page_key(context) for context in contexts]
+    found = cache.get_many(keys)
+    missing = [(key, context) for key, context in zip(keys, contexts) if key not in found]
+    if missing:
+        pending = [context for _, context in missing]
+        rendered = pool.map(render_page, pending) if pool else map(render_page, pending)
+        fresh = dict(zip((key for key, _ in missing), rendered))
+        cache.set_many(fresh, DOCUMENT_TTL)
+        found.update(fresh)
+    return [found[key] for key in keys]
+
+
+def document_etag(exam, fmt):
+    return hashlib.md5(f"{_page_key(_contexts([exam])[0])}:{fmt}".encode()).hexdigest()
+
+
+def prescription_document(exam, fmt=HTML):
+    """bytes المستند لفحص واحد (exam من document_queryset)؛ الـ PDF نفسه يُخزن أيضًا."""
+    if fmt == HTML:
+        return wrap_pages(_pages([exam]), f"وصفة {exam.pk}").encode()
+    key = f"{_page_key(_contexts([exam])[0])}:pdf"
+    pdf = cache.get(key)
+    if pdf is None:
+        pdf = _pdf(wrap_pages(_pages([exam]), f"وصفة {exam.pk}")).write_pdf()
+        cache.set(key, pdf, DOCUMENT_TTL)
+    return pdf
+
+
+def batch_document(exams, fmt=HTML, title=""):
+    """ملف واحد لعدة فحوص (صفحة لكل فحص)؛ التصيير الناقص و PDF كل صفحة في مجمع خيوط."""
+    exams = list(exams)
+    with ThreadPoolExecutor(max_workers=render_workers()) as pool:
+        pages = _pages(exams, pool)
+        if fmt == HTML:
+            return wrap_pages(pages, title).encode()
+        documents = list(pool.map(_pdf, (wrap_pages([page], title) for page in pages)))
+    if not documents:
+        return _pdf(wrap_pages([], title)).write_pdf()
+    return documents[0].copy([page for document in documents for page in document.pages]).write_pdf()
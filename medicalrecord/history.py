@@ -0,0 +1,158 @@
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils.html import format_html, format_html_join
+
+from appointment.models import Appointment
+from core.versioning import bump_version, get_version
+from procedures.models import ClinicalExamItem, Procedure, ProcedureToothcode
+
+from .models import PrescribedMedication
+
+
+# =====================================================================
+# سجل المريض في صفحة السجل الطبي (الأدمن)
+# محمّل واحد بعدد ثابت من الاستعلامات (select_related + prefetch) تتشاركه اللوحات الثلاث،
+# وHTML الناتج يُخزن في الكاش لكل مريض بمفتاح نسخة تُرفع عند أي تغيير في سجله
+# (medicalrecord/receivers.py + upsert الفحص في procedures/services.py).
+# =====================================================================
+HISTORY_TTL = 24 * 60 * 60
+
+
+def history_version_key(patient_id):
+    return f"medicalrecord:history:v:{patient_id}"
+
+
+def invalidate_history(patient_id):
+    if patient_id is not None:
+        bump_version(history_version_key(patient_id))
+
+
+def load_history(patient_id):
+    appointments = list(
+        Appointment.objects.filter(patient_id=patient_id)
+        .select_related("doctor__user", "clinical_exam")
+        .prefetch_related(Prefetch(
+            "clinical_exam__items",
+            queryset=ClinicalExamItem.objects.select_related("procedure", "toothcode").order_by("created_at", "id"),
+        ))
+        .order_by("-date", "-time")
+    )
+    procedures = list(
+        Procedure.objects.filter(clinical_exam__patient_id=patient_id)
+        .select_related("definition", "clinical_exam__appointment", "clinical_exam__doctor__user")
+        .prefetch_related(Prefetch(
+            "tooth_links",
+            queryset=ProcedureToothcode.objects.select_related("toothcode", "performed_by__user"),
+        ))
+        .order_by("-created_at")
+    )
+    prescriptions = list(
+        PrescribedMedication.objects.filter(clinical_exam__patient_id=patient_id)
+        .select_related("medication", "prescribed_by__user", "clinical_exam__appointment")
+        .order_by("-prescribed_at")
+    )
+    return {"appointments": appointments, "procedures": procedures, "prescriptions": prescriptions}
+
+
+# ---------------------------------------------------------------------
+# العرض (كل القيم تمر عبر format_html فتُهرَّب)
+# ---------------------------------------------------------------------
+def _doctor_name(doctor):
+    return doctor.user.get_full_name() if doctor is not None else "—"
+
+
+def _join(rows, empty):
+    return format_html_join("<hr>", "{}", ((row,) for row in rows)) if rows else empty
+
+
+def render_appointments(appointments):
+    rows = []
+    for appt in appointments:
+        row = format_html(
+            "<b>📅 التاريخ:</b> {} - <b>🕒 الوقت:</b> {}<br>"
+            "<b>👨‍⚕️ الطبيب:</b> {}<br>"
+            "<b>📌 الحالة:</b> {}<br>",
+            appt.date, appt.time, _doctor_name(appt.doctor), appt.get_status_display(),
+        )
+        exam = getattr(appt, "clinical_exam", None)
+        if exam:
+            items = ", ".join(
+                f"{it.procedure.name}" + (f" ({it.toothcode.tooth_number})" if it.toothcode else "")
+                for it in exam.items.all()
+            )
+            row += format_html(
+                "<i>🔍 فحص سريري:</i><br>"
+                "&nbsp;&nbsp;- الشكوى: {}<br>"
+                "&nbsp;&nbsp;- النصيحة: {}<br>"
+                "&nbsp;&nbsp;- الإجراءات: {}<br>",
+                exam.complaint or "-", exam.medical_advice or "-", items or "-",
+            )
+        else:
+            row += format_html("<i>⚠ لا يوجد فحص سريري لهذا الموعد</i><br>")
+        rows.append(row)
+    return _join(rows, "لا توجد مواعيد")
+
+
+def render_procedures(procedures):
+    rows = []
+    for proc in procedures:
+        links = list(proc.tooth_links.all())
+        teeth = ", ".join(link.toothcode.tooth_number for link in links) or "—"
+        performer = next((link.performed_by for link in links if link.performed_by_id), None)
+        exam = proc.clinical_exam
+        appt = exam.appointment
+        rows.append(format_html(
+            "<b>🧾 الإجراء:</b> {}<br>"
+            "<b>🦷 الأسنان:</b> {}<br>"
+            "<b>👨‍⚕️ الطبيب:</b> {}<br>"
+            "<b>📅 الموعد:</b> {} — {}<br>"
+            "<b>📝 ملاحظات:</b> {}<br>"
+            "<b>⏱️ أُنشئ في:</b> {}",
+            proc.name or getattr(proc.definition, "name", None) or "إجراء غير محدد",
+            teeth,
+            _doctor_name(performer or exam.doctor),
+            getattr(appt, "date", None) or "—", getattr(appt, "time", None) or "—",
+            proc.description or "—",
+            proc.created_at,
+        ))
+    return _join(rows, "لا توجد إجراءات مسجّلة")
+
+
+def render_prescriptions(prescriptions):
+    rows = []
+    for pm in prescriptions:
+        appt = pm.clinical_exam.appointment
+        rows.append(format_html(
+            "<b>💊 الدواء:</b> {}<br>"
+            "<b>⏰ الجرعات/اليوم:</b> {}<br>"
+            "<b>🧪 وحدة الجرعة:</b> {}<br>"
+            "<b>📆 عدد الأيام:</b> {}<br>"
+            "<b>📝 ملاحظات:</b> {}<br>"
+            "<b>👨‍⚕️ الموصي:</b> {}<br>"
+            "<b>🕒 وقت الصرف:</b> {}<br>"
+            "<b>📅 الموعد:</b> {} — {}",
+            pm.medication.name,
+            pm.times_per_day if pm.times_per_day is not None else "—",
+            pm.dose_unit or "—",
+            pm.number_of_days if pm.number_of_days is not None else "—",
+            pm.notes or "—",
+            _doctor_name(pm.prescribed_by),
+            pm.prescribed_at,
+            getattr(appt, "date", None) or "—", getattr(appt, "time", None) or "—",
+        ))
+    return _join(rows, "لا توجد وصفات مصروفة")
+
+
+def history_fragments(patient_id):
+    """{"appointments", "procedures", "prescriptions"}: HTML جاهز؛ من الكاش إن لم يتغير السجل."""
+    key = f"medicalrecord:history:{patient_id}:{get_version(history_version_key(patient_id))}"
+    fragments = cache.get(key)
+    if fragments is None:
+        history = load_history(patient_id)
+        fragments = {
+            "appointments": str(render_appointments(history["appointments"])),
+            "procedures": str(render_procedures(history["procedures"])),
+            "prescriptions": str(render_prescriptions(history["prescriptions"])),
+        }
+        cache.set(key, fragments, HISTORY_TTL)
+    return fragments
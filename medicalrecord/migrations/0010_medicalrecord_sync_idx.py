@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicalrecord', '0009_patientprescriptionreport'),
+        ('patients', '0009_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['updated_at', 'id'], name='medicalrecord_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:10
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicalrecord', '0010_medicalrecord_sync_idx'),
+        ('patients', '0011_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medication',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='rx_med_search_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicationpackage',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='medpkg_search_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicalrecord', '0011_search_trgm_indexes'),
+        ('patients', '0011_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiseaseContraindication',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('severity', models.CharField(choices=[('caution', 'caution'), ('avoid', 'avoid')], default='avoid', max_length=10, verbose_name='Severity')),
+                ('note', models.TextField(blank=True, null=True, verbose_name='Note')),
+                ('disease', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contraindications', to='patients.disease', verbose_name='Disease')),
+                ('medication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disease_contraindications', to='patients.medication', verbose_name='Medication')),
+            ],
+            options={
+                'verbose_name': 'Disease Contraindication',
+                'verbose_name_plural': 'Disease Contraindications',
+                'constraints': [models.UniqueConstraint(fields=('disease', 'medication'), name='uniq_disease_contraindication')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MedicationInteraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('severity', models.CharField(choices=[('minor', 'minor'), ('moderate', 'moderate'), ('major', 'major')], default='moderate', max_length=10, verbose_name='Severity')),
+                ('note', models.TextField(blank=True, null=True, verbose_name='Note')),
+                ('medication_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='patients.medication', verbose_name='Medication A')),
+                ('medication_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='patients.medication', verbose_name='Medication B')),
+            ],
+            options={
+                'verbose_name': 'Medication Interaction',
+                'verbose_name_plural': 'Medication Interactions',
+                'constraints': [models.UniqueConstraint(fields=('medication_a', 'medication_b'), name='uniq_medication_interaction'), models.CheckConstraint(condition=models.Q(('medication_a', models.F('medication_b')), _negated=True), name='interaction_distinct_pair')],
+            },
+        ),
+    ]
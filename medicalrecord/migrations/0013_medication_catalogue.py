@@ -0,0 +1,67 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    المرحلة 1 من توحيد قاموس الأدوية: أعمدة القاموس الجديدة (name_key بلا unique حتى يُملأ
+    وتُدمج المكررات في 0014)، وفك قيد FK لقواعد السلامة مؤقتًا لأن أعمدتها ستُعاد كتابتها
+    من معرّفات patients.Medication إلى معرّفات هذا القاموس.
+    """
+
+    dependencies = [
+        ('medicalrecord', '0012_safety_rules'),
+        ('patients', '0011_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medication',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='dental_impact',
+            field=models.TextField(blank=True, null=True, verbose_name='Dental Impact'),
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Created At'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='medication',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Updated At'),
+        ),
+        migrations.AlterField(
+            model_name='medication',
+            name='name',
+            field=models.CharField(max_length=255, verbose_name='Medication Name'),
+        ),
+        migrations.AddIndex(
+            model_name='medication',
+            index=models.Index(fields=['is_active'], name='medication_active_idx'),
+        ),
+        migrations.AlterField(
+            model_name='diseasecontraindication',
+            name='medication',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='disease_contraindications', to='patients.medication', verbose_name='Medication'),
+        ),
+        migrations.AlterField(
+            model_name='medicationinteraction',
+            name='medication_a',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='patients.medication', verbose_name='Medication A'),
+        ),
+        migrations.AlterField(
+            model_name='medicationinteraction',
+            name='medication_b',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='patients.medication', verbose_name='Medication B'),
+        ),
+    ]
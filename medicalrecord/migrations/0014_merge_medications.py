@@ -0,0 +1,156 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:05
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Max
+
+from core.text import normalize_name
+
+
+def _move(model, field, pks_by_target):
+    """نقل صفوف إلى معرّفاتها الجديدة عبر قيم مؤقتة (offset) حتى لا يتصادم قيد unique أثناء النقل."""
+    pks = [pk for group in pks_by_target.values() for pk in group]
+    if not pks:
+        return
+    offset = max((model.objects.aggregate(top=Max(field))["top"] or 0), *pks_by_target) + 1
+    model.objects.filter(pk__in=pks).update(**{field: F(field) + offset})
+    for target, group in pks_by_target.items():
+        model.objects.filter(pk__in=group).update(**{field: target})
+
+
+def _rewrite(model, field, mapping, scope):
+    """
+    field: عمود الدواء؛ scope: العمود الذي يشاركه قيد unique (المريض/المرض/الحزمة...).
+    الصفوف التي تصير مكررة بعد التحويل تُحذف (يبقى الأقدم).
+    """
+    keep, drop, moves = set(), [], defaultdict(list)
+    for pk, other, old in model.objects.order_by("id").values_list("id", scope, field):
+        new = mapping.get(old, old)
+        if (other, new) in keep:
+            drop.append(pk)
+            continue
+        keep.add((other, new))
+        if new != old:
+            moves[new].append(pk)
+    model.objects.filter(pk__in=drop).delete()
+    _move(model, field, moves)
+
+
+def merge_medications(apps, schema_editor):
+    Catalogue = apps.get_model("medicalrecord", "Medication")
+    Legacy = apps.get_model("patients", "Medication")
+    PrescribedMedication = apps.get_model("medicalrecord", "PrescribedMedication")
+    MedicationPackageItem = apps.get_model("medicalrecord", "MedicationPackageItem")
+    DiseaseContraindication = apps.get_model("medicalrecord", "DiseaseContraindication")
+    MedicationInteraction = apps.get_model("medicalrecord", "MedicationInteraction")
+    DailyPrescriptionStat = apps.get_model("core", "DailyPrescriptionStat")
+    PatientAllergy = apps.get_model("patients", "PatientAllergy")
+
+    # 1) مفتاح كل دواء في القاموس؛ المكررات (نفس المفتاح) تُدمج في الأقدم
+    canonical, duplicates, batch = {}, {}, []
+    for med in Catalogue.objects.order_by("id").only("id", "name"):
+        key = normalize_name(med.name) or f"#{med.id}"
+        if key in canonical:
+            duplicates[med.id] = canonical[key].id
+            continue
+        med.name = (med.name or "").strip()
+        med.name_key = key
+        canonical[key] = med
+        batch.append(med)
+    Catalogue.objects.bulk_update(batch, ["name", "name_key"], batch_size=1000)
+
+    if duplicates:
+        for old, new in duplicates.items():
+            PrescribedMedication.objects.filter(medication_id=old).update(medication_id=new)
+        _rewrite(MedicationPackageItem, "medication_id", duplicates, "package_id")
+        # الإحصاءات اليومية: جمع العدّادات بدل حذف المكرر
+        for stat in DailyPrescriptionStat.objects.filter(medication_id__in=duplicates):
+            target = duplicates[stat.medication_id]
+            merged = DailyPrescriptionStat.objects.filter(day=stat.day, medication_id=target).update(
+                count=F("count") + stat.count
+            )
+            if merged:
+                stat.delete()
+            else:
+                stat.medication_id = target
+                stat.save(update_fields=["medication"])
+        Catalogue.objects.filter(pk__in=duplicates).delete()
+
+    # 2) قاموس patients.Medication → القاموس الموحّد (إنشاء الناقص ونقل dental_impact)
+    legacy = {}
+    for med in Legacy.objects.order_by("id"):
+        key = normalize_name(med.name) or f"#legacy{med.id}"
+        target = canonical.get(key)
+        if target is None:
+            target = canonical[key] = Catalogue.objects.create(
+                name=med.name.strip(), name_key=key, dental_impact=med.dental_impact, is_active=med.is_active,
+            )
+        elif med.dental_impact and not target.dental_impact:
+            target.dental_impact = med.dental_impact
+            Catalogue.objects.filter(pk=target.pk).update(dental_impact=med.dental_impact)
+        legacy[med.id] = target.id
+
+    # 3) الجداول التي كانت تشير إلى patients.Medication (قيود FK مفكوكة منذ 0013)
+    _rewrite(PatientAllergy, "medication_id", legacy, "patient_id")
+    _rewrite(DiseaseContraindication, "medication_id", legacy, "disease_id")
+
+    pairs, drop, moves = set(), [], []
+    for pk, a, b in MedicationInteraction.objects.order_by("id").values_list("id", "medication_a_id", "medication_b_id"):
+        pair = tuple(sorted((legacy.get(a, a), legacy.get(b, b))))
+        if pair[0] == pair[1] or pair in pairs:
+            drop.append(pk)
+            continue
+        pairs.add(pair)
+        moves.append((pk, pair))
+    MedicationInteraction.objects.filter(pk__in=drop).delete()
+    if moves:
+        offset = max(max(a, b) for _, (a, b) in moves) + max(
+            MedicationInteraction.objects.aggregate(top=Max("medication_a_id"))["top"] or 0,
+            MedicationInteraction.objects.aggregate(top=Max("medication_b_id"))["top"] or 0,
+        ) + 1
+        MedicationInteraction.objects.update(
+            medication_a_id=F("medication_a_id") + offset, medication_b_id=F("medication_b_id") + offset
+        )
+        for pk, (a, b) in moves:
+            MedicationInteraction.objects.filter(pk=pk).update(medication_a_id=a, medication_b_id=b)
+
+
+class Migration(migrations.Migration):
+    """
+    المرحلة 2: دمج مكررات القاموس (نفس name_key) وإعادة كتابة الوصفات/الحزم/الإحصاءات إليها،
+    ثم تحويل الحساسية وقواعد السلامة من patients.Medication إلى القاموس الموحّد وإعادة قيود FK.
+    غير قابلة للعكس (الدمج يفقد التمييز بين الأسماء المكررة).
+    """
+
+    dependencies = [
+        ('medicalrecord', '0013_medication_catalogue'),
+        ('patients', '0012_allergy_medication_unconstrained'),
+        ('core', '0003_tombstone'),
+    ]
+
+    operations = [
+        # بلا reverse_code: التراجع يرفع IrreversibleError بدل تراجع صامت يترك بيانات مدموجة
+        migrations.RunPython(merge_medications),
+        migrations.AlterField(
+            model_name='medication',
+            name='name_key',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='diseasecontraindication',
+            name='medication',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disease_contraindications', to='medicalrecord.medication', verbose_name='Medication'),
+        ),
+        migrations.AlterField(
+            model_name='medicationinteraction',
+            name='medication_a',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='medicalrecord.medication', verbose_name='Medication A'),
+        ),
+        migrations.AlterField(
+            model_name='medicationinteraction',
+            name='medication_b',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='medicalrecord.medication', verbose_name='Medication B'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_search_trgm_indexes'),
+        ('medicalrecord', '0014_merge_medications'),
+        ('procedures', '0018_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prescribedmedication',
+            index=models.Index(fields=['prescribed_at'], name='rx_prescribed_at_idx'),
+        ),
+    ]
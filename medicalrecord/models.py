@@ -3,6 +3,9 @@ from django.utils.translation import gettext_lazy as _
 from patients.models import Patient, Disease
 from accounts.models import Doctor
 from appointment.models import Appointment
+from core.indexes import search_trgm_index
+from core.text import normalize_name
+from core.tracking import LoadedValuesMixin
 # Create your models here.
 
 class MedicalRecord(models.Model):
@@ -15,6 +18,7 @@ class MedicalRecord(models.Model):
     class Meta:
         verbose_name = _("Medical Record")
         verbose_name_plural = _("Medical Records")
+        indexes = [models.Index(fields=["updated_at", "id"], name="medicalrecord_sync_idx")]
 
     def __str__(self):
         return f"Medical Record - {self.patient}"
@@ -23,7 +27,7 @@ class MedicalRecord(models.Model):
 
 
 
-class Attachment(models.Model):
+class Attachment(LoadedValuesMixin, models.Model):
     """المرفقات المرتبطة بالسجل الطبي أو الفحوصات"""
     class AttachmentType(models.TextChoices):
         XRAY = "xray", _("X-Ray")
@@ -46,22 +50,44 @@ class Attachment(models.Model):
         return f"{self.get_type_display()} - {self.medical_record.patient}"
 
 class Medication(models.Model):
-    """تعريف دواء متاح في النظام"""
-    name = models.CharField(max_length=255, unique=True, verbose_name=_("Medication Name"))
+    """
+    قاموس الأدوية الموحّد: الوصفات والحزم والحساسية وقواعد السلامة تشير كلها إليه.
+    التفرد على name_key (الاسم بعد normalize_name) لا على name، فـ "Amoxicillin" و "amoxicillin "
+    دواء واحد؛ تحويل الاسم إلى معرّف عبر medicalrecord/catalogue.py.
+    """
+    name = models.CharField(max_length=255, verbose_name=_("Medication Name"))
+    name_key = models.CharField(max_length=255, unique=True, editable=False)
     description = models.TextField(blank=True, null=True)
+    dental_impact = models.TextField(blank=True, null=True, verbose_name=_("Dental Impact"))
     default_dose_unit = models.CharField(max_length=50, blank=True, null=True, verbose_name=_("Default Dose Unit"))  # مثال: حبة، كبسولة
     is_active = models.BooleanField(default=True, verbose_name=_("Is Active"))
 
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
     class Meta:
         verbose_name = _("Medication")
         verbose_name_plural = _("Medications")
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["is_active"], name="medication_active_idx"),
+            search_trgm_index("name", name="rx_med_search_trgm_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.name = (self.name or "").strip()
+        self.name_key = normalize_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "name_key"}
+        super().save(*args, **kwargs)
 
 
-class PrescribedMedication(models.Model):
+
+class PrescribedMedication(LoadedValuesMixin, models.Model):
     """
     وصفة طبية مرتبطة بدواء ,الفحص السريري 
     """
@@ -88,7 +114,9 @@ class PrescribedMedication(models.Model):
         verbose_name = _("Prescribed Medication")
         verbose_name_plural = _("Prescribed Medications")
         ordering = ["-prescribed_at"]
-        
+        # طباعة وصفات يوم (documents.exams_for_day) تُرشّح بنطاق prescribed_at
+        indexes = [models.Index(fields=["prescribed_at"], name="rx_prescribed_at_idx")]
+
 
     def __str__(self):
         return f"{self.medication.name} for {self.clinical_exam.patient}"
@@ -117,6 +145,7 @@ class MedicationPackage(models.Model):
         indexes = [
             models.Index(fields=["is_active"]),
             models.Index(fields=["disease"]),
+            search_trgm_index("name", name="medpkg_search_trgm_idx"),
         ]
 
     def __str__(self):
@@ -194,4 +223,73 @@ class PatientPrescriptionReport(Patient):
     class Meta:
         proxy = True
         verbose_name = "تقرير وصفات المريض"
-        verbose_name_plural = "تقارير وصفات المرضى"
\ No newline at end of file
+        verbose_name_plural = "تقارير وصفات المرضى"
+
+# -------------------------------------------------
+# 6) قواعد سلامة الوصف (medicalrecord/safety.py)
+# -------------------------------------------------
+class DiseaseContraindication(models.Model):
+    """دواء يُتجنب (أو يُحذر منه) لمرضى مرض مزمن معيّن."""
+    SEVERITY_CAUTION = "caution"
+    SEVERITY_AVOID = "avoid"
+    SEVERITY_CHOICES = (
+        (SEVERITY_CAUTION, "caution"),
+        (SEVERITY_AVOID, "avoid"),
+    )
+
+    disease = models.ForeignKey(
+        Disease, on_delete=models.CASCADE, related_name="contraindications", verbose_name=_("Disease")
+    )
+    medication = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, related_name="disease_contraindications",
+        verbose_name=_("Medication"),
+    )
+    severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, default=SEVERITY_AVOID, verbose_name=_("Severity"))
+    note = models.TextField(blank=True, null=True, verbose_name=_("Note"))
+
+    class Meta:
+        verbose_name = _("Disease Contraindication")
+        verbose_name_plural = _("Disease Contraindications")
+        constraints = [
+            models.UniqueConstraint(fields=("disease", "medication"), name="uniq_disease_contraindication"),
+        ]
+
+    def __str__(self):
+        return f"{self.disease} ✗ {self.medication} ({self.severity})"
+
+
+class MedicationInteraction(models.Model):
+    """تداخل بين دواءين؛ الزوج يُخزن مرتبًا (medication_a_id < medication_b_id) فلا يتكرر معكوسًا."""
+    SEVERITY_MINOR = "minor"
+    SEVERITY_MODERATE = "moderate"
+    SEVERITY_MAJOR = "major"
+    SEVERITY_CHOICES = (
+        (SEVERITY_MINOR, "minor"),
+        (SEVERITY_MODERATE, "moderate"),
+        (SEVERITY_MAJOR, "major"),
+    )
+
+    medication_a = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, related_name="+", verbose_name=_("Medication A")
+    )
+    medication_b = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, related_name="+", verbose_name=_("Medication B")
+    )
+    severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, default=SEVERITY_MODERATE, verbose_name=_("Severity"))
+    note = models.TextField(blank=True, null=True, verbose_name=_("Note"))
+
+    class Meta:
+        verbose_name = _("Medication Interaction")
+        verbose_name_plural = _("Medication Interactions")
+        constraints = [
+            models.UniqueConstraint(fields=("medication_a", "medication_b"), name="uniq_medication_interaction"),
+            models.CheckConstraint(check=~models.Q(medication_a=models.F("medication_b")), name="interaction_distinct_pair"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.medication_a_id and self.medication_b_id and self.medication_a_id > self.medication_b_id:
+            self.medication_a_id, self.medication_b_id = self.medication_b_id, self.medication_a_id
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.medication_a} ↔ {self.medication_b} ({self.severity})"
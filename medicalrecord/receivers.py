@@ -0,0 +1,70 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from appointment.models import Appointment
+from procedures.models import ClinicalExam, Procedure, ProcedureToothcode
+from procedures.signals import exam_items_changed
+
+from .catalogue import invalidate_catalogue
+from .history import invalidate_history
+from .models import Medication
+from .signals import prescriptions_changed
+
+
+# =====================================================================
+# إبطال HTML سجل المريض (history.py) عند أي تغيير في مواعيده/فحوصاته/إجراءاته/وصفاته
+# =====================================================================
+def _exam_patient(exam_id):
+    return ClinicalExam.objects.filter(pk=exam_id).values_list("patient_id", flat=True).first()
+
+
+def _cached_exam_patient(objs):
+    # الكتّاب يمرّرون غالبًا كائنات محمّلة الفحص (select_related أو exam من الواجهة) فلا استعلام
+    for obj in objs:
+        if obj.__class__.clinical_exam.is_cached(obj):
+            return obj.clinical_exam.patient_id
+    return None
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+@receiver([post_save, post_delete], sender=ClinicalExam)
+def history_row_changed(sender, instance, **kwargs):
+    invalidate_history(instance.patient_id)
+
+
+@receiver([post_save, post_delete], sender=Procedure)
+def history_procedure_changed(sender, instance, **kwargs):
+    invalidate_history(_cached_exam_patient([instance]) or _exam_patient(instance.clinical_exam_id))
+
+
+@receiver([post_save, post_delete], sender=ProcedureToothcode)
+def history_procedure_tooth_changed(sender, instance, **kwargs):
+    # سطر الأدمن المضمَّن يحمل الإجراء الأب؛ وإلا فاستعلام join واحد بدل استعلامين
+    if ProcedureToothcode.procedure.is_cached(instance):
+        patient_id = _cached_exam_patient([instance.procedure]) or _exam_patient(instance.procedure.clinical_exam_id)
+    else:
+        patient_id = (Procedure.objects.filter(pk=instance.procedure_id)
+                      .values_list("clinical_exam__patient_id", flat=True).first())
+    invalidate_history(patient_id)
+
+
+# العناصر والوصفات لا مستقبلات post_save/post_delete لها (تبقى fast delete)؛ كل كتّابها،
+# ومنهم الأدمن، يرسلون هاتين الإشارتين مرة لكل فحص
+@receiver(exam_items_changed)
+def history_exam_items_changed(sender, exam_id, patient_id=None, **kwargs):
+    invalidate_history(patient_id or _exam_patient(exam_id))
+
+
+@receiver(prescriptions_changed)
+def history_prescriptions_changed(sender, exam_id, added=(), removed=(), **kwargs):
+    patient_id = _cached_exam_patient([*added, *removed])
+    invalidate_history(patient_id or _exam_patient(exam_id))
+
+
+# =====================================================================
+# كاش قاموس الأدوية (catalogue.py): التعديل/الحذف يرفع النسخة؛ الإنشاء لا يحتاج
+# =====================================================================
+@receiver([post_save, post_delete], sender=Medication)
+def catalogue_changed(sender, created=False, **kwargs):
+    if not created:
+        invalidate_catalogue()
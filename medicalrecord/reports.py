@@ -0,0 +1,80 @@
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from patients.models import Patient
+
+from .models import PrescribedMedication
+
+
+# =====================================================================
+# تقرير وصفات المرضى (الأدمن + API)
+#   - العدد وآخر صرف: subquery مرتبط بالمريض (بدل JOIN على كل جدول المرضى ثم GROUP BY)
+#   - ملخص الأدوية لصفحة كاملة: استعلام واحد مجمّع لكل (مريض، دواء) بدوال نافذة
+#     (العدد الكلي + آخر PREVIEW_LINES صرفات) بدل استعلام لكل صف
+# =====================================================================
+PREVIEW_LINES = 2
+
+
+def _per_patient(annotation):
+    return Subquery(
+        PrescribedMedication.objects
+        .filter(clinical_exam__patient=OuterRef("pk"))
+        .order_by()
+        .values("clinical_exam__patient")
+        .annotate(v=annotation)
+        .values("v")
+    )
+
+
+def prescription_report_queryset(queryset=None):
+    """المرضى مع total_prescriptions و last_prescribed_at محسوبين في قاعدة البيانات."""
+    queryset = Patient.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        total_prescriptions=Coalesce(
+            _per_patient(Count("id")), Value(0), output_field=IntegerField()
+        ),
+        last_prescribed_at=_per_patient(Max("prescribed_at")),
+    )
+
+
+def medication_summaries(patient_ids, preview=PREVIEW_LINES):
+    """
+    {patient_id: [{medication, count, last_prescribed_at, recent: [...]}, ...]}
+    الأدوية مرتبة بالأحدث صرفًا، و recent آخر preview صرفات لكل دواء.
+    """
+    partition = [F("clinical_exam__patient_id"), F("medication_id")]
+    rows = (
+        PrescribedMedication.objects
+        .filter(clinical_exam__patient_id__in=patient_ids)
+        .annotate(
+            rank=Window(RowNumber(), partition_by=partition, order_by=[F("prescribed_at").desc(), F("id").desc()]),
+            med_count=Window(Count("id"), partition_by=partition),
+        )
+        .filter(rank__lte=preview)
+        .values(
+            "clinical_exam__patient_id", "medication_id", "medication__name", "med_count",
+            "prescribed_at", "times_per_day", "number_of_days", "dose_unit",
+        )
+        .order_by("-prescribed_at", "-id")
+    )
+
+    summaries = {pid: [] for pid in patient_ids}
+    entries = {}
+    for row in rows:
+        key = (row["clinical_exam__patient_id"], row["medication_id"])
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = {
+                "medication": row["medication__name"],
+                "count": row["med_count"],
+                "last_prescribed_at": row["prescribed_at"],
+                "recent": [],
+            }
+            summaries[key[0]].append(entry)
+        entry["recent"].append({
+            "times_per_day": row["times_per_day"],
+            "number_of_days": row["number_of_days"],
+            "dose_unit": row["dose_unit"],
+            "prescribed_at": row["prescribed_at"],
+        })
+    return summaries
@@ -0,0 +1,114 @@
+from patients.models import PatientAllergy
+
+from .catalogue import medication_key
+from .models import DiseaseContraindication, MedicationInteraction, PrescribedMedication
+
+
+# =====================================================================
+# فحص سلامة الوصفة: حساسية المريض، موانع أمراضه المزمنة، التداخلات، والتكرار
+#
+# المطابقة على name_key لقاموس الأدوية الموحّد (يشمل أسماء أدوية جديدة لم تُحفظ بعد).
+# الموانع والتداخلات تُقرأ من قاعدة البيانات في كل فحص (ثلاثة استعلامات مفهرسة) ولا تُخزن
+# بين الطلبات: كاش كل عملية (LocMemCache) لا يرى إبطال العمليات الأخرى، وحساسية سُجلت للتو
+# يجب أن تظهر في الوصفة التالية من أي عامل. الفحص نفسه لا يستعلم لكل عنصر.
+# =====================================================================
+ALLERGY = "allergy"
+DISEASE = "disease"
+INTERACTION = "interaction"
+DUPLICATE = "duplicate"
+
+
+def _build_contraindications(patient_id):
+    found = {}
+    allergies = (
+        PatientAllergy.objects.filter(patient_id=patient_id)
+        .values_list("medication__name_key", "allergic_reaction")
+    )
+    for key, reaction in allergies:
+        found.setdefault(key, []).append({
+            "type": ALLERGY,
+            "severity": "high",
+            "detail": "المريض لديه حساسية مسجلة من هذا الدواء.",
+            "reaction": reaction or None,
+        })
+    rules = (
+        DiseaseContraindication.objects
+        .filter(disease__patient_disease_links__patient_id=patient_id)
+        .values_list("medication__name_key", "disease__name", "severity", "note")
+    )
+    for key, disease, severity, note in rules:
+        found.setdefault(key, []).append({
+            "type": DISEASE,
+            "severity": severity,
+            "detail": note or f"يُحذر منه لمرضى {disease}.",
+            "disease": disease,
+        })
+    return found
+
+
+def patient_contraindications(patient_id):
+    """{مفتاح الدواء: [تحذيرات]} للمريض (حساسياته وموانع أمراضه)."""
+    return _build_contraindications(patient_id)
+
+
+def interaction_rules():
+    """{(مفتاح، مفتاح) مرتب: (الشدة، الملاحظة)} لكل التداخلات المعرّفة."""
+    rules = {}
+    rows = MedicationInteraction.objects.values_list(
+        "medication_a__name_key", "medication_b__name_key", "severity", "note"
+    )
+    for a, b, severity, note in rows:
+        rules[tuple(sorted((a, b)))] = (severity, note)
+    return rules
+
+
+def existing_medication_names(exam_id):
+    """أسماء الأدوية الموصوفة حاليًا في الفحص (استعلام واحد)."""
+    return list(
+        PrescribedMedication.objects.filter(clinical_exam_id=exam_id).values_list("medication__name", flat=True)
+    )
+
+
+def check_prescription(patient_id, names, existing=()):
+    """
+    names: أسماء الأدوية الجديدة؛ existing: أسماء الأدوية الموجودة في الوصفة نفسها.
+    يعيد قائمة تحذيرات: {type, severity, medication, detail, ...}
+    """
+    contraindications = patient_contraindications(patient_id)
+    interactions = interaction_rules()
+    warnings = []
+
+    new = [(medication_key(name), name) for name in names if name]
+    old = [(medication_key(name), name) for name in existing if name]
+    seen_keys = {key for key, _ in old}
+
+    for key, name in new:
+        for found in contraindications.get(key, ()):
+            warnings.append({**found, "medication": name})
+        if key in seen_keys:
+            warnings.append({
+                "type": DUPLICATE,
+                "severity": "caution",
+                "medication": name,
+                "detail": "الدواء مكرر في هذه الوصفة.",
+            })
+        seen_keys.add(key)
+
+    # كل زوج (جديد، جديد أو موجود) مرة واحدة
+    seen = set()
+    pool = old + new
+    for i, (key, name) in enumerate(new, start=len(old)):
+        for other_key, other_name in pool[:i]:
+            pair = tuple(sorted((key, other_key)))
+            if pair in seen or pair not in interactions:
+                continue
+            seen.add(pair)
+            severity, note = interactions[pair]
+            warnings.append({
+                "type": INTERACTION,
+                "severity": severity,
+                "medication": name,
+                "with": other_name,
+                "detail": note or "تداخل دوائي معروف بين الدواءين.",
+            })
+    return warnings
@@ -10,11 +10,15 @@ from .models import (
     MedicationPackageItem,
     AppliedMedicationPackage,
 )
+
 from django.db import transaction
 from procedures.models import ClinicalExam
 from accounts.models import Doctor
 from patients.models import Patient, PatientAllergy, PatientDisease
 from appointment.models import Appointment
+from .catalogue import get_or_create_medications, medication_lookup_value, resolve_medication, resolve_medications
+from .safety import check_prescription, existing_medication_names
+from .signals import prescriptions_changed
 
 
 # -------------------------------------------------
@@ -47,9 +51,21 @@ class DoctorBasicSerializer(serializers.ModelSerializer):
 class MedicationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Medication
-        fields = ["id", "name", "description", "default_dose_unit", "is_active"]
+        fields = ["id", "name", "description", "dental_impact", "default_dose_unit", "is_active"]
         read_only_fields = ["id"]
 
+    def validate_name(self, value):
+        return validate_unique_medication_name(value, self.instance)
+
+
+def validate_unique_medication_name(value, instance=None):
+    """التفرد على الاسم الموحّد (name_key) كما في قيد قاعدة البيانات."""
+    value = value.strip()
+    existing = resolve_medication(value)
+    if existing is not None and (instance is None or existing.pk != instance.pk):
+        raise serializers.ValidationError("اسم الدواء موجود مسبقًا.")
+    return value
+
 
 # -------------------------------------------------
 # Prescribed Medication (read / nested)
@@ -77,38 +93,21 @@ class FlexibleMedicationField(serializers.Field):
     ويُرجع كائن Medication.
     """
     def to_internal_value(self, data):
-        # 1) {"id": ..} أو {"name": ..}
-        if isinstance(data, dict):
-            if "id" in data and data["id"]:
-                med = Medication.objects.filter(pk=data["id"]).first()
-                if not med:
-                    raise serializers.ValidationError("Medication with this id does not exist.")
-                return med
-            if "name" in data and data["name"]:
-                name = str(data["name"]).strip()
-                # ابحث بدون حساسية حالة الأحرف، أو أنشئ
-                med = Medication.objects.filter(name__iexact=name).first()
-                if med:
-                    return med
-                # أنشئ دواء جديدًا باسم فقط؛ عدّل الحقول الافتراضية حسب موديلك
-                return Medication(name=name)
+        # التحويل عبر قاموس الأدوية (medicalrecord/catalogue.py): من الكاش غالبًا
+        value = medication_lookup_value(data)
+        if isinstance(data, dict) and value in (None, ""):
             raise serializers.ValidationError("Provide either 'id' or 'name' for medication.")
-
-        # 2) رقم (id) مباشرة
-        if isinstance(data, int) or (isinstance(data, str) and data.isdigit()):
-            med = Medication.objects.filter(pk=int(data)).first()
+        if isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+            med = resolve_medication(value)
             if not med:
                 raise serializers.ValidationError("Medication with this id does not exist.")
             return med
-
-        # 3) نص اسم الدواء
-        if isinstance(data, str):
-            name = data.strip()
+        if isinstance(value, str):
+            name = value.strip()
             if not name:
                 raise serializers.ValidationError("Medication name is empty.")
-            med = Medication.objects.filter(name__iexact=name).first()
-            return med if med else Medication(name=name)
-
+            # دواء جديد يُرجع غير محفوظ؛ الحفظ عند الإنشاء
+            return resolve_medication(name) or Medication(name=name)
         raise serializers.ValidationError("Invalid medication value.")
 
     def to_representation(self, value):
@@ -145,9 +144,7 @@ class PrescribedMedicationSerializer(serializers.ModelSerializer):
         med = validated_data.pop("medication")
         # لو المد رجع *كائن غير محفوظ* (أنشأناه للتو)، خزّنه أولاً
         if med.pk is None:
-            # لو عندك حقول إلزامية أخرى في Medication (مثلاً default_dose_unit)
-            # عيّن قيمًا افتراضية قبل الحفظ إذا لزم
-            med.save()
+            med = get_or_create_medications([med.name])[med.name]
         validated_data["medication"] = med
         return super().create(validated_data)
 
@@ -156,7 +153,7 @@ class PrescribedMedicationSerializer(serializers.ModelSerializer):
         med = validated_data.pop("medication", None)
         if med is not None:
             if med.pk is None:
-                med.save()
+                med = get_or_create_medications([med.name])[med.name]
             instance.medication = med
         # حدث بقية الحقول
         for f, v in validated_data.items():
@@ -301,6 +298,9 @@ class MedicationPackageSerializer(serializers.ModelSerializer):
     disease_name = serializers.CharField(source="disease.name", read_only=True)
     items = MedicationPackageItemSerializer(many=True)
 
+    # الحقول القابلة للتعديل في عنصر الحزمة (تُستخدم في المقارنة عند التعديل)
+    ITEM_FIELDS = ("times_per_day", "dose_unit", "number_of_days", "notes")
+
     class Meta:
         model = MedicationPackage
         fields = [
@@ -309,22 +309,74 @@ class MedicationPackageSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "disease_name", "created_at"]
 
+    def validate_items(self, value):
+        # (package, medication) فريد؛ نرفض التكرار قبل الوصول لقاعدة البيانات
+        seen = set()
+        for item in value:
+            med_id = item["medication"].pk
+            if med_id in seen:
+                raise serializers.ValidationError(f"الدواء ({item['medication']}) مكرر داخل الحزمة.")
+            seen.add(med_id)
+        return value
+
+    def _cache_items(self, pkg, items):
+        # نضع العناصر في كاش الـ prefetch حتى يُبنى التمثيل بدون إعادة قراءة
+        if not hasattr(pkg, "_prefetched_objects_cache"):
+            pkg._prefetched_objects_cache = {}
+        pkg._prefetched_objects_cache["items"] = items
+
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop("items", [])
         pkg = MedicationPackage.objects.create(**validated_data)
-        for item in items_data:
-            MedicationPackageItem.objects.create(package=pkg, **item)
+        items = MedicationPackageItem.objects.bulk_create(
+            [MedicationPackageItem(package=pkg, **item) for item in items_data]
+        )
+        self._cache_items(pkg, items)
         return pkg
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         items_data = validated_data.pop("items", None)
         for attr, val in validated_data.items():
             setattr(instance, attr, val)
         instance.save()
-        if items_data is not None:
-            instance.items.all().delete()
-            for item in items_data:
-                MedicationPackageItem.objects.create(package=instance, **item)
+        if items_data is None:
+            return instance
+
+        # مقارنة العناصر الحالية بالمرسلة حسب الدواء: حذف/تعديل/إضافة الفرق فقط
+        existing = {it.medication_id: it for it in instance.items.all()}
+        to_create, to_update, final_items = [], [], []
+        for item in items_data:
+            med = item["medication"]
+            current = existing.pop(med.pk, None)
+            if current is None:
+                obj = MedicationPackageItem(package=instance, **item)
+                to_create.append(obj)
+                final_items.append(obj)
+                continue
+            changed = False
+            # المفاتيح الغائبة عن العنصر المرسل تبقى كما هي (لا تُصفَّر إلى None)
+            for attr in self.ITEM_FIELDS:
+                if attr not in item:
+                    continue
+                val = item[attr]
+                if getattr(current, attr) != val:
+                    setattr(current, attr, val)
+                    changed = True
+            current.medication = med
+            if changed:
+                to_update.append(current)
+            final_items.append(current)
+
+        if existing:
+            MedicationPackageItem.objects.filter(pk__in=[it.pk for it in existing.values()]).delete()
+        if to_update:
+            MedicationPackageItem.objects.bulk_update(to_update, self.ITEM_FIELDS)
+        if to_create:
+            MedicationPackageItem.objects.bulk_create(to_create)
+
+        self._cache_items(instance, final_items)
         return instance
 
 
@@ -345,34 +397,55 @@ class ApplyMedicationPackageSerializer(serializers.Serializer):
             raise serializers.ValidationError("الفحص السريري غير موجود.")
         attrs["exam"] = exam
         attrs["doctor"] = getattr(getattr(self.context.get("request"), "user", None), "doctor", None)
+        # فحص السلامة للحزمة كاملة (العناصر وأدويتها محمّلة مسبقًا من الـ view)
+        attrs["warnings"] = check_prescription(
+            exam.patient_id,
+            [item.medication.name for item in pkg.items.all()],
+            existing=[] if attrs["mode"] == "replace" else existing_medication_names(exam.pk),
+        )
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         pkg: MedicationPackage = self.context["package"]
         exam = validated_data["exam"]
         doctor = validated_data.get("doctor")
         mode = validated_data["mode"]
 
+        removed = []
         if mode == "replace":
-            PrescribedMedication.objects.filter(clinical_exam=exam).delete()
+            removed = list(
+                PrescribedMedication.objects
+                .filter(clinical_exam=exam)
+                .only("id", "clinical_exam_id", "medication_id", "prescribed_at")
+            )
+            PrescribedMedication.objects.filter(pk__in=[pm.pk for pm in removed]).delete()
 
-        created_ids = []
-        for item in pkg.items.all():
-            pm = PrescribedMedication.objects.create(
+        # عناصر الحزمة مُحمّلة مسبقًا (prefetch) من الـ view؛ إدخال واحد لكل الأدوية
+        created = PrescribedMedication.objects.bulk_create([
+            PrescribedMedication(
                 clinical_exam=exam,
-                medication=item.medication,
+                medication_id=item.medication_id,
                 times_per_day=item.times_per_day,
                 dose_unit=item.dose_unit,
                 number_of_days=item.number_of_days,
                 notes=item.notes,
                 prescribed_by=doctor,
             )
-            created_ids.append(pm.id)
+            for item in pkg.items.all()
+        ])
+        created_ids = [pm.id for pm in created]
+        prescriptions_changed.send(
+            sender=PrescribedMedication, exam_id=exam.pk, added=created, removed=removed,
+        )
 
         AppliedMedicationPackage.objects.create(
             clinical_exam=exam, package=pkg, prescribed_by=doctor, mode=mode
         )
-        return {"created_ids": created_ids, "count": len(created_ids), "mode": mode, "package_id": pkg.id}
+        return {
+            "created_ids": created_ids, "count": len(created_ids), "mode": mode, "package_id": pkg.id,
+            "warnings": validated_data["warnings"],
+        }
 
 
 # =================================================
@@ -390,9 +463,24 @@ class PrescriptionUpsertSerializer(serializers.Serializer):
     general_notes = serializers.CharField(allow_blank=True, required=False)
     items = PrescriptionItemInputSerializer(many=True)
 
+    def to_internal_value(self, data):
+        # كل أدوية الوصفة من القاموس دفعة واحدة قبل تحقق العناصر واحدًا واحدًا
+        items = data.get("items") if hasattr(data, "get") else None
+        if isinstance(items, list):
+            resolve_medications([
+                medication_lookup_value(it.get("medication")) for it in items if isinstance(it, dict)
+            ])
+        return super().to_internal_value(data)
+
     def validate(self, attrs):
         if not attrs.get("items"):
             raise serializers.ValidationError("يجب إضافة دواء واحد على الأقل.")
+        exam = attrs["clinical_exam"]
+        attrs["warnings"] = check_prescription(
+            exam.patient_id,
+            [it["medication"].name for it in attrs["items"]],
+            existing=existing_medication_names(exam.pk),
+        )
         return attrs
 
     @transaction.atomic
@@ -404,40 +492,46 @@ class PrescriptionUpsertSerializer(serializers.Serializer):
 
         request = self.context.get("request")
         prescribed_by = getattr(getattr(request, "user", None), "doctor", None)
+        items = validated_data["items"]
+
+        # (1) الأدوية الجديدة (غير المحفوظة) تُنشأ دفعة واحدة مع إزالة التكرار بالاسم الموحّد
+        new_items = [it for it in items if it["medication"].pk is None]
+        if new_items:
+            created_meds = get_or_create_medications(
+                [it["medication"].name for it in new_items],
+                defaults={it["medication"].name: {"default_dose_unit": it.get("dose_unit") or ""} for it in new_items},
+            )
+            for it in new_items:
+                it["medication"] = created_meds[it["medication"].name]
 
-        created = []
-        for it in validated_data["items"]:
-            med = it["medication"]   # FlexibleMedicationField يرجّع كائن Medication
-            if getattr(med, "pk", None) is None:
-                # ضع قيماً افتراضية إن لزم حسب الموديل
-                if not getattr(med, "default_dose_unit", None):
-                    med.default_dose_unit = it.get("dose_unit") or ""
-                med.is_active = True
-                med.save()   # <-- مهم جداً
-
-            pm = PrescribedMedication.objects.create(
+        # (2) عناصر الوصفة بإدخال واحد (RETURNING id)
+        created = PrescribedMedication.objects.bulk_create([
+            PrescribedMedication(
                 clinical_exam=exam,
-                medication=med,
+                medication=it["medication"],
                 times_per_day=it["times_per_day"],
                 dose_unit=it["dose_unit"],
                 number_of_days=it["number_of_days"],
                 notes=it.get("notes") or None,
                 prescribed_by=prescribed_by,
             )
-            created.append(pm)
+            for it in items
+        ])
+        prescriptions_changed.send(sender=PrescribedMedication, exam_id=exam.pk, added=created, removed=[])
 
-        # تمثيل الإرجاع
+        # تمثيل الإرجاع من الكائنات الموجودة في الذاكرة (بدون إعادة قراءة الدواء)
         items_repr = []
-        for pm in created:
+        for pm, it in zip(created, items):
+            med = it["medication"]
             items_repr.append({
                 "id": pm.id,
-                "medication": pm.medication.id,
-                "medication_name": pm.medication.name,
+                "medication": med.pk,
+                "medication_name": med.name,
                 "times_per_day": pm.times_per_day,
                 "dose_unit": pm.dose_unit,
                 "number_of_days": pm.number_of_days,
                 "notes": pm.notes,
-                "prescribed_by": getattr(pm.prescribed_by, "id", None),
+                "prescribed_by": pm.prescribed_by_id,
                 "prescribed_at": pm.prescribed_at,
             })
 
@@ -446,4 +540,70 @@ class PrescriptionUpsertSerializer(serializers.Serializer):
             "general_notes": exam.prescription_notes,
             "count": len(created),
             "items": items_repr,
+            "warnings": validated_data["warnings"],
         }
+
+
+class PrescriptionCheckSerializer(serializers.Serializer):
+    """
+    فحص سلامة بدون حفظ. medications: معرّفات أو أسماء أدوية (medicalrecord.Medication).
+    clinical_exam: يحدد المريض ويضيف أدوية الفحص الحالية للمقارنة؛ أو patient وحده.
+    """
+    clinical_exam = serializers.PrimaryKeyRelatedField(queryset=ClinicalExam.objects.all(), required=False)
+    patient = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all(), required=False)
+    medications = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+
+    def validate(self, attrs):
+        exam = attrs.get("clinical_exam")
+        patient = attrs.get("patient")
+        if exam is None and patient is None:
+            raise serializers.ValidationError("حدد الفحص السريري أو المريض.")
+
+        # المعرّفات الرقمية تُحوّل لأسماء عبر القاموس (الكاش ثم استعلام واحد)
+        values = [str(v).strip() for v in attrs["medications"]]
+        resolved = resolve_medications(values)
+        missing = [v for v in values if v.isdigit() and v not in resolved]
+        if missing:
+            raise serializers.ValidationError({"medications": f"أدوية غير موجودة: {missing}"})
+        attrs["names"] = [resolved[v].name if v in resolved else v for v in values]
+
+        attrs["patient_id"] = exam.patient_id if exam is not None else patient.pk
+        attrs["existing"] = existing_medication_names(exam.pk) if exam is not None else []
+        return attrs
+
+    def check(self):
+        data = self.validated_data
+        return check_prescription(data["patient_id"], data["names"], existing=data["existing"])
+
+# =================================================
+# Prescription report (medicalrecord/reports.py)
+# =================================================
+class PrescriptionReportLineSerializer(serializers.Serializer):
+    times_per_day = serializers.CharField(allow_null=True)
+    number_of_days = serializers.CharField(allow_null=True)
+    dose_unit = serializers.CharField(allow_null=True)
+    prescribed_at = serializers.DateTimeField()
+
+
+class PrescriptionReportMedicationSerializer(serializers.Serializer):
+    medication = serializers.CharField()
+    count = serializers.IntegerField()
+    last_prescribed_at = serializers.DateTimeField()
+    recent = PrescriptionReportLineSerializer(many=True)
+
+
+class PrescriptionReportRowSerializer(serializers.Serializer):
+    """مريض من prescription_report_queryset + ملخصه المحمّل للصفحة كاملة (context["summaries"])."""
+    id = serializers.UUIDField()
+    patient_name = serializers.SerializerMethodField()
+    phone = serializers.CharField()
+    total_prescriptions = serializers.IntegerField()
+    last_prescribed_at = serializers.DateTimeField(allow_null=True)
+    medications = serializers.SerializerMethodField()
+
+    def get_patient_name(self, obj):
+        return f"{obj.first_name or ''} {obj.last_name or ''}".strip()
+
+    def get_medications(self, obj):
+        summary = self.context["summaries"].get(obj.pk, [])
+        return PrescriptionReportMedicationSerializer(summary, many=True).data
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+
+# يُرسل بعد أي تعديل على عناصر الوصفة (PrescribedMedication)، بما فيها الإدخال/التعديل الجماعي
+# (bulk_create/bulk_update) الذي لا يُطلق post_save.
+# الوسائط: exam_id, added (قائمة PrescribedMedication), removed (قائمة PrescribedMedication)
+prescriptions_changed = Signal()
@@ -0,0 +1,175 @@
+import base64
+import binascii
+import json
+
+from django.db import connection
+from django.db.models import CharField, DateTimeField, F, Func, IntegerField, Q, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from appointment.models import Appointment
+from core.utils import clinic_date, clinic_now, clinic_tz
+from procedures.models import ClinicalExam, ClinicalExamItem
+
+from .models import AppliedMedicationPackage, Attachment, PrescribedMedication
+
+
+# =====================================================================
+# الخط الزمني للمريض: المواعيد والفحوص وعناصرها والوصفات والحزم والمرفقات
+# في استعلام واحد (UNION ALL) مرتب بالأحدث، مع ترقيم keyset:
+#   المؤشر = (at, key) لآخر حدث في الصفحة، وkey = "<النوع>:<المعرّف>" لكسر التعادل.
+# شرط المؤشر والترتيب والحد تُطبق على كل فرع قبل الدمج (حيث تدعمه قاعدة البيانات)
+# فلا يُقرأ من كل جدول أكثر من صفحة واحدة.
+# =====================================================================
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+CURSOR_VERSION = 1
+
+APPOINTMENT = "appointment"
+EXAM = "exam"
+EXAM_ITEM = "exam_item"
+PRESCRIPTION = "prescription"
+PACKAGE = "package"
+ATTACHMENT = "attachment"
+EVENT_TYPES = (APPOINTMENT, EXAM, EXAM_ITEM, PRESCRIPTION, PACKAGE, ATTACHMENT)
+
+
+class InvalidTimelineCursor(ValueError):
+    pass
+
+
+class AppointmentAt(Func):
+    """date + time للموعد كـ datetime بتوقيت العيادة (التعبير يختلف حسب قاعدة البيانات)."""
+    function = "TIMESTAMP"
+    output_field = DateTimeField()
+
+    def __init__(self, **extra):
+        super().__init__(F("date"), F("time"), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra):
+        sql, params = self.as_sql(compiler, connection, template="(%(expressions)s)", arg_joiner=" + ", **extra)
+        return f"({sql} AT TIME ZONE %s)", (*params, clinic_tz().key)
+
+    def as_sqlite(self, compiler, connection, **extra):
+        # SQLite يخزن UTC؛ إزاحة العيادة الحالية تكفي لبيئة التطوير
+        sql, params = self.as_sql(compiler, connection, template="(%(expressions)s)", arg_joiner=" || ' ' || ", **extra)
+        offset = -clinic_now().utcoffset().total_seconds()
+        return f"datetime({sql}, %s)", (*params, f"{offset:+.0f} seconds")
+
+
+def _text(value):
+    return Coalesce(Cast(value, CharField()), Value(""), output_field=CharField())
+
+
+def _branch(kind, queryset, at, title, detail, exam):
+    # نفس الأعمدة وبنفس الترتيب في كل فرع (شرط UNION)، وبلا ترتيب Meta.ordering الافتراضي
+    return queryset.annotate(
+        ev_at=at,
+        ev_key=Concat(Value(f"{kind}:"), Cast("pk", CharField()), output_field=CharField()),
+        ev_title=_text(title),
+        ev_detail=_text(detail),
+        ev_exam=Cast(exam, IntegerField()),
+    ).values("ev_at", "ev_key", "ev_title", "ev_detail", "ev_exam").order_by()
+
+
+def _branches(patient_id):
+    return {
+        APPOINTMENT: _branch(
+            APPOINTMENT, Appointment.objects.filter(patient_id=patient_id),
+            AppointmentAt(), F("status"), F("reason"), F("clinical_exam__id"),
+        ),
+        EXAM: _branch(
+            EXAM, ClinicalExam.objects.filter(patient_id=patient_id),
+            F("created_at"), F("complaint"), F("medical_advice"), F("pk"),
+        ),
+        EXAM_ITEM: _branch(
+            EXAM_ITEM, ClinicalExamItem.objects.filter(clinical_exam__patient_id=patient_id),
+            F("created_at"), F("procedure__name"), F("toothcode__tooth_number"), F("clinical_exam_id"),
+        ),
+        PRESCRIPTION: _branch(
+            PRESCRIPTION, PrescribedMedication.objects.filter(clinical_exam__patient_id=patient_id),
+            F("prescribed_at"), F("medication__name"),
+            Concat(Coalesce("times_per_day", Value("")), Value(" × "), "dose_unit", output_field=CharField()),
+            F("clinical_exam_id"),
+        ),
+        PACKAGE: _branch(
+            PACKAGE, AppliedMedicationPackage.objects.filter(clinical_exam__patient_id=patient_id),
+            F("prescribed_at"), F("package__name"), F("mode"), F("clinical_exam_id"),
+        ),
+        ATTACHMENT: _branch(
+            ATTACHMENT, Attachment.objects.filter(medical_record__patient_id=patient_id),
+            F("uploaded_at"), F("type"), Coalesce("description", "file", output_field=CharField()), Value(None),
+        ),
+    }
+
+
+# ---------------------------------------------------------------------
+# المؤشر: base64url(JSON) يحمل (at, key) لآخر حدث
+# ---------------------------------------------------------------------
+def encode_cursor(at, key):
+    raw = json.dumps({"v": CURSOR_VERSION, "at": at.isoformat(), "k": key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise InvalidTimelineCursor("مؤشر غير صالح.")
+    if not isinstance(payload, dict) or payload.get("v") != CURSOR_VERSION:
+        raise InvalidTimelineCursor("مؤشر غير صالح.")
+    at = parse_datetime(payload["at"]) if isinstance(payload.get("at"), str) else None
+    key = payload.get("k")
+    if at is None or timezone.is_naive(at) or not isinstance(key, str):
+        raise InvalidTimelineCursor("مؤشر غير صالح.")
+    return at, key
+
+
+# ---------------------------------------------------------------------
+# القراءة
+# ---------------------------------------------------------------------
+def fetch_timeline(patient_id, cursor=None, limit=DEFAULT_LIMIT, types=None):
+    """
+    {"results": [{type, id, at, title, detail, exam}], "next": مؤشر الصفحة التالية أو None}
+    استعلام واحد مهما كان عدد الأنواع.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    queries = []
+    for kind, qs in _branches(patient_id).items():
+        if types and kind not in types:
+            continue
+        if before:
+            qs = qs.filter(Q(ev_at__lt=before[0]) | Q(ev_at=before[0], ev_key__lt=before[1]))
+            if kind == APPOINTMENT:
+                # ev_at محسوب من date+time فلا يحصر الأقسام؛ قيد مكافئ على date نفسه يحصرها
+                qs = qs.filter(date__lte=clinic_date(before[0]))
+        queries.append(qs)
+    if not queries:
+        return {"results": [], "next": None}
+
+    if len(queries) > 1:
+        if connection.features.supports_slicing_ordering_in_compound:
+            queries = [qs.order_by("-ev_at", "-ev_key")[:limit + 1] for qs in queries]
+        union = queries[0].union(*queries[1:], all=True)
+    else:
+        union = queries[0]
+    rows = list(union.order_by("-ev_at", "-ev_key")[:limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    results = []
+    for row in rows:
+        kind, _, pk = row["ev_key"].partition(":")
+        results.append({
+            "type": kind,
+            "id": pk,
+            "at": row["ev_at"],
+            "title": row["ev_title"] or None,
+            "detail": row["ev_detail"] or None,
+            "exam": row["ev_exam"],
+        })
+    return {
+        "results": results,
+        "next": encode_cursor(rows[-1]["ev_at"], rows[-1]["ev_key"]) if has_more else None,
+    }
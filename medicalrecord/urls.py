@@ -8,6 +8,8 @@ urlpatterns = [
 
     # عرض السجل الطبي الكامل حسب المريض
     path('patients/<uuid:patient_id>/medical-record/', views.MedicalRecordByPatientAPIView.as_view(), name='medical-record-by-patient'),
+    # الخط الزمني الموحّد للمريض (مواعيد/فحوص/إجراءات/وصفات/حزم/مرفقات) مرقّم بالمؤشر
+    path('patients/<uuid:patient_id>/timeline/', views.PatientTimelineAPIView.as_view(), name='patient-timeline'),
 
     # المرفقات
     path('attachments/', views.AttachmentListCreateAPIView.as_view(), name='attachment-list-create'),
@@ -28,4 +30,12 @@ urlpatterns = [
 
     # إنشاء/تجهيز وصفة كاملة (ملاحظة عامة + عناصر) دفعة واحدة
     path('prescriptions/', views.PrescriptionUpsertAPIView.as_view(), name='prescription-upsert'),
+    # فحص سلامة الوصفة قبل الحفظ
+    path('prescriptions/check/', views.PrescriptionCheckAPIView.as_view(), name='prescription-check'),
+    # مستند الوصفة للطباعة، وطباعة وصفات يوم كامل في ملف واحد
+    path('prescriptions/<int:exam_id>/document/', views.PrescriptionDocumentAPIView.as_view(), name='prescription-document'),
+    path('prescriptions/print/', views.PrescriptionBatchPrintAPIView.as_view(), name='prescription-batch-print'),
+
+    # تقرير وصفات المرضى (مرقّم)
+    path('prescription-report/', views.PrescriptionReportAPIView.as_view(), name='prescription-report'),
 ]
@@ -1,6 +1,17 @@
-from rest_framework import generics, views, status
+import copy
+import uuid
+
+from django.db.models import F
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
+from rest_framework import filters, generics, views, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
+from core.utils import clinic_today
+
 from .models import (
     MedicalRecord,
     Attachment,
@@ -19,7 +30,15 @@ from .serializers import (
     MedicationPackageSerializer,
     ApplyMedicationPackageSerializer,
     PrescriptionUpsertSerializer,
+    PrescriptionCheckSerializer,
+    PrescriptionReportRowSerializer,
 )
+from . import documents
+from .reports import medication_summaries, prescription_report_queryset
+from .timeline import EVENT_TYPES, InvalidTimelineCursor, fetch_timeline
+from .timeline import DEFAULT_LIMIT as TIMELINE_LIMIT
+from .timeline import MAX_LIMIT as TIMELINE_MAX_LIMIT
+from .signals import prescriptions_changed
 
 # ================================================
 #                السجل الطبي
@@ -54,6 +73,30 @@ class MedicalRecordByPatientAPIView(views.APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class PatientTimelineAPIView(views.APIView):
+    """
+    الخط الزمني الموحّد للمريض (بدل خمس نقاط نهاية تُدمج في الواجهة):
+    GET /api/medical-record/patients/<uuid>/timeline/?limit=50&cursor=<next>&type=prescription&type=exam
+    - الأحداث مرتبة بالأحدث: {type, id, at, title, detail, exam}
+    - next: مؤشر الصفحة التالية (null عند النهاية)
+    """
+    def get(self, request, patient_id):
+        params = request.query_params
+        types = params.getlist("type")
+        unknown = [t for t in types if t not in EVENT_TYPES]
+        if unknown:
+            raise ValidationError({"type": f"أنواع غير معروفة: {', '.join(unknown)}"})
+        try:
+            limit = min(max(int(params.get("limit") or TIMELINE_LIMIT), 1), TIMELINE_MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({"limit": "limit يجب أن يكون رقمًا."})
+        try:
+            result = fetch_timeline(patient_id, params.get("cursor") or None, limit=limit, types=types)
+        except InvalidTimelineCursor as e:
+            raise ValidationError({"cursor": str(e)})
+        return Response(result)
+
+
 # ================================================
 #                    المرفقات
 # ================================================
@@ -97,12 +140,41 @@ class PrescribedMedicationListCreateAPIView(generics.ListCreateAPIView):
             qs = qs.filter(clinical_exam_id=exam_id)
         return qs
 
+    def perform_create(self, serializer):
+        instance = serializer.save()
+        prescriptions_changed.send(
+            sender=PrescribedMedication, exam_id=instance.clinical_exam_id, added=[instance], removed=[],
+        )
+
 
 class PrescribedMedicationRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
     queryset = (PrescribedMedication.objects
                 .select_related('clinical_exam', 'medication', 'prescribed_by'))
     serializer_class = PrescribedMedicationSerializer
 
+    def perform_update(self, serializer):
+        before = copy.copy(serializer.instance)  # save() يعدّل الكائن نفسه
+        instance = serializer.save()
+        if before.clinical_exam_id != instance.clinical_exam_id:
+            # نُقل إلى فحص آخر: الفحص السابق فقد عنصرًا والجديد كسب عنصرًا
+            prescriptions_changed.send(
+                sender=PrescribedMedication, exam_id=before.clinical_exam_id, added=[], removed=[before],
+            )
+            prescriptions_changed.send(
+                sender=PrescribedMedication, exam_id=instance.clinical_exam_id, added=[instance], removed=[],
+            )
+        else:
+            prescriptions_changed.send(
+                sender=PrescribedMedication, exam_id=instance.clinical_exam_id, added=[instance], removed=[before],
+            )
+
+    def perform_destroy(self, instance):
+        removed = copy.copy(instance)  # delete() يصفّر pk على الكائن نفسه
+        instance.delete()
+        prescriptions_changed.send(
+            sender=PrescribedMedication, exam_id=removed.clinical_exam_id, added=[], removed=[removed],
+        )
+
 
 # ================================================
 #        حِزم الأدوية (Medication Packages)
@@ -153,8 +225,8 @@ class MedicationPackageApplyAPIView(views.APIView):
     """
     def post(self, request, pk):
         try:
+            # أسماء الأدوية لفحص السلامة؛ استعلام prefetch واحد للعناصر وأدويتها
             package = (MedicationPackage.objects
-                        .select_related('disease')
                         .prefetch_related('items__medication')
                         .get(pk=pk, is_active=True))
         except MedicationPackage.DoesNotExist:
@@ -168,23 +240,138 @@ class MedicationPackageApplyAPIView(views.APIView):
         serializer.is_valid(raise_exception=True)
         result = serializer.save()
 
-        # (اختياري) أعدّ أيضًا عدّاد التطبيقات
-        AppliedMedicationPackage.objects.filter(package=package).count()
-
         return Response(
             {"detail": "تم تطبيق الحزمة بنجاح.", **result},
             status=status.HTTP_201_CREATED
         )
 
 
-class PrescribedMedicationListCreateAPIView(generics.ListCreateAPIView):
-    queryset = PrescribedMedication.objects.select_related("clinical_exam", "medication", "prescribed_by")
-    serializer_class = PrescribedMedicationSerializer
-
 class PrescriptionUpsertAPIView(generics.CreateAPIView):
     serializer_class = PrescriptionUpsertSerializer
     def create(self, request, *args, **kwargs):
         ser = self.get_serializer(data=request.data)
         ser.is_valid(raise_exception=True)
         result = ser.save()              # <-- هذا هو dict الذي أعدته create()
-        return Response(result, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        return Response(result, status=status.HTTP_201_CREATED)
+
+
+class PrescriptionCheckAPIView(views.APIView):
+    """
+    فحص سلامة وصفة قبل حفظها (حساسية، موانع الأمراض المزمنة، تداخلات، تكرار).
+    POST {"clinical_exam": 101, "medications": [3, "Ibuprofen"]}
+    """
+    def post(self, request):
+        serializer = PrescriptionCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        warnings = serializer.check()
+        return Response({"safe": not warnings, "warnings": warnings})
+
+
+# ================================================
+#          تقرير وصفات المرضى
+# ================================================
+class ReportPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class PrescriptionReportAPIView(generics.ListAPIView):
+    """
+    ?search=<اسم/هاتف>&has_prescriptions=1&ordering=-last_prescribed_at
+    كل صفحة: استعلام العدد + استعلام الصفحة + استعلام ملخصات الأدوية.
+    """
+    serializer_class = PrescriptionReportRowSerializer
+    pagination_class = ReportPagination
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ["first_name", "last_name", "phone", "email"]
+    ordering_fields = ["total_prescriptions", "last_prescribed_at", "first_name", "created_at"]
+    # المرضى بلا وصفات في آخر القائمة (DESC في PostgreSQL يضع NULL أولًا)
+    ordering = [F("last_prescribed_at").desc(nulls_last=True), "id"]
+
+    def get_queryset(self):
+        qs = prescription_report_queryset()
+        if self.request.query_params.get("has_prescriptions") in ("1", "true"):
+            qs = qs.filter(total_prescriptions__gt=0)
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        patients = list(page if page is not None else queryset)
+        serializer = self.get_serializer(
+            patients, many=True,
+            context={**self.get_serializer_context(), "summaries": medication_summaries([p.pk for p in patients])},
+        )
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+
+# ================================================
+#          طباعة الوصفة (documents.py)
+# ================================================
+def _document_output(request):
+    # ?output= وليس ?format= لأن DRF يستخدم format لاختيار الـ renderer
+    output = request.query_params.get("output") or (documents.PDF if documents.pdf_available() else documents.HTML)
+    if output not in documents.FORMATS:
+        raise ValidationError({"output": "القيم المسموحة: html أو pdf."})
+    return output
+
+
+def _document_response(content, output, filename):
+    response = HttpResponse(content, content_type=documents.CONTENT_TYPES[output])
+    response["Content-Disposition"] = f'inline; filename="{filename}.{output}"'
+    return response
+
+
+PDF_UNAVAILABLE = {"detail": "توليد PDF غير متاح على هذا الخادم (WeasyPrint غير مثبتة)؛ استخدم output=html."}
+
+
+class PrescriptionDocumentAPIView(views.APIView):
+    """
+    GET /api/medical-record/prescriptions/<exam_id>/document/?output=pdf|html
+    المستند من الكاش ما لم تتغير الوصفة؛ يدعم If-None-Match.
+    """
+    def get(self, request, exam_id):
+        output = _document_output(request)
+        if output == documents.PDF and not documents.pdf_available():
+            return Response(PDF_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        exam = get_object_or_404(documents.document_queryset(), pk=exam_id)
+
+        etag = f'"{documents.document_etag(exam, output)}"'
+        if etag in request.headers.get("If-None-Match", ""):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response = _document_response(documents.prescription_document(exam, output), output, f"prescription-{exam.pk}")
+        response["ETag"] = etag
+        return response
+
+
+class PrescriptionBatchPrintAPIView(views.APIView):
+    """
+    طباعة وصفات يوم كامل في ملف واحد (صفحة لكل فحص):
+    GET /api/medical-record/prescriptions/print/?date=YYYY-MM-DD&doctor=<uuid>&output=pdf|html
+    """
+    def get(self, request):
+        output = _document_output(request)
+        if output == documents.PDF and not documents.pdf_available():
+            return Response(PDF_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        raw_date = request.query_params.get("date")
+        day = parse_date(raw_date) if raw_date else clinic_today()
+        if day is None:
+            raise ValidationError({"date": "صيغة التاريخ YYYY-MM-DD."})
+        doctor_id = request.query_params.get("doctor")
+        if doctor_id:
+            try:
+                doctor_id = uuid.UUID(doctor_id)
+            except ValueError:
+                raise ValidationError({"doctor": f"معرّف طبيب غير صالح: {doctor_id}"})
+
+        limit = documents.batch_limit()
+        exams = list(documents.exams_for_day(day, doctor_id)[:limit + 1])
+        if len(exams) > limit:
+            raise ValidationError({"date": f"عدد الوصفات يتجاوز {limit}؛ حدد الطبيب لتقسيم الطباعة."})
+
+        content = documents.batch_document(exams, output, title=f"وصفات {day}")
+        return _document_response(content, output, f"prescriptions-{day}")
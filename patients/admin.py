@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Patient, Disease, Medication, PatientDisease, PatientAllergy
+
+from core.admin_mixins import ClinicAdminMixin
+
+from .models import Patient, Disease, PatientDisease, PatientAllergy
 
 class PatientDiseaseInline(admin.TabularInline):
     model = PatientDisease
@@ -12,20 +15,14 @@ class PatientAllergyInline(admin.TabularInline):
     autocomplete_fields = ["medication"]
 
 @admin.register(Patient)
-class PatientAdmin(admin.ModelAdmin):
+class PatientAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ("full_name", "phone", "email", "is_archived", "created_at")
     search_fields = ("first_name", "last_name", "phone", "email")
     list_filter = ("is_archived",)
     inlines = [PatientDiseaseInline, PatientAllergyInline]
 
 @admin.register(Disease)
-class DiseaseAdmin(admin.ModelAdmin):
-    list_display = ("name", "is_active", "created_at")
-    search_fields = ("name",)
-    list_filter = ("is_active",)
-
-@admin.register(Medication)
-class MedicationAdmin(admin.ModelAdmin):
+class DiseaseAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ("name", "is_active", "created_at")
     search_fields = ("name",)
     list_filter = ("is_active",)
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0008_alter_patient_options_disease_medication_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='disease',
+            index=models.Index(fields=['updated_at', 'id'], name='disease_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['updated_at', 'id'], name='patient_sync_idx'),
+        ),
+    ]
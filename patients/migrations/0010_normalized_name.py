@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:03
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+from core.text import full_name_key
+
+
+def fill_normalized_name(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    batch = []
+    for obj in Patient.objects.only('id', 'first_name', 'last_name').iterator(chunk_size=1000):
+        obj.normalized_name = full_name_key(obj.first_name, obj.last_name)
+        batch.append(obj)
+        if len(batch) >= 1000:
+            Patient.objects.bulk_update(batch, ['normalized_name'])
+            batch = []
+    Patient.objects.bulk_update(batch, ['normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0009_sync_indexes'),
+        ('accounts', '0010_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='normalized_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=201),
+        ),
+        migrations.RunPython(fill_normalized_name, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['normalized_name'], name='patient_normalized_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['normalized_name'], name='patient_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
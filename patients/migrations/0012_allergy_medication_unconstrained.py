@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """فك قيد FK للحساسية مؤقتًا؛ medicalrecord 0014 يعيد كتابة العمود إلى معرّفات القاموس الموحّد."""
+
+    dependencies = [
+        ('patients', '0011_search_trgm_indexes'),
+        ('medicalrecord', '0013_medication_catalogue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patientallergy',
+            name='medication',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='patient_allergy_links', to='patients.medication'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    الحساسية تشير الآن إلى medicalrecord.Medication (بياناتها حُوّلت في medicalrecord 0014)؛ حذف القاموس القديم.
+    غير قابلة للعكس: إعادة إنشاء patients.Medication فارغًا تترك الحساسية تشير إلى أرقام القاموس الموحّد.
+    """
+
+    dependencies = [
+        ('patients', '0012_allergy_medication_unconstrained'),
+        ('medicalrecord', '0014_merge_medications'),
+    ]
+
+    operations = [
+        # عملية بلا reverse_code تجعل الهجرة كلها غير قابلة للتراجع
+        migrations.RunPython(migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='patientallergy',
+            name='medication',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='patient_allergy_links', to='medicalrecord.medication'),
+        ),
+        migrations.AlterField(
+            model_name='patient',
+            name='allergies',
+            field=models.ManyToManyField(blank=True, related_name='patients', through='patients.PatientAllergy', to='medicalrecord.medication', verbose_name='Drug Allergies'),
+        ),
+        migrations.DeleteModel(
+            name='Medication',
+        ),
+    ]
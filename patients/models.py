@@ -2,12 +2,16 @@ from django.db import models
 import uuid
 from django.utils.translation import gettext_lazy as _
 from django.db.models.functions import Lower
+from django.contrib.postgres.indexes import GinIndex
+from core.indexes import search_trgm_index
+from core.text import full_name_key
+from core.tracking import LoadedValuesMixin
 # Create your models here.
 
 # --------------------------------------------------------------------
 # Patient Model: جدول  المرضى 
 # --------------------------------------------------------------------
-class Patient(models.Model):
+class Patient(LoadedValuesMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     first_name = models.CharField(max_length=100, verbose_name=_("First Name"))
     last_name = models.CharField(max_length=100, verbose_name=_("Last Name"))
@@ -29,6 +33,8 @@ class Patient(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
     is_archived = models.BooleanField(default=False, verbose_name=_("Archived"))
+    # الاسم الكامل بعد التوحيد (core/text.py) للبحث بالاسم عند الحجز؛ يُحدَّث في save()
+    normalized_name = models.CharField(max_length=201, blank=True, default="", editable=False)
 
     # علاقات M2M عبر جداول ربط (للاستعلام السهل)
     diseases = models.ManyToManyField(
@@ -39,7 +45,7 @@ class Patient(models.Model):
         verbose_name=_("Chronic Diseases")
     )
     allergies = models.ManyToManyField(
-        "patients.Medication",
+        "medicalrecord.Medication",
         through="patients.PatientAllergy",
         related_name="patients",
         blank=True,
@@ -54,10 +60,22 @@ class Patient(models.Model):
             models.Index(fields=["phone"]),
             models.Index(fields=["email"]),
             models.Index(fields=["is_archived"]),
+            models.Index(fields=["updated_at", "id"], name="patient_sync_idx"),
+            models.Index(fields=["normalized_name"], name="patient_normalized_name_idx"),
+            GinIndex(fields=["normalized_name"], opclasses=["gin_trgm_ops"], name="patient_name_trgm_idx"),
+            search_trgm_index("first_name", "last_name", "phone", "email", name="patient_search_trgm_idx"),
         ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = full_name_key(self.first_name, self.last_name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"first_name", "last_name"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "normalized_name"}
+        super().save(*args, **kwargs)
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -84,6 +102,8 @@ class Disease(models.Model):
         indexes = [
             models.Index(Lower('name'), name='idx_disease_name_ci'),
             models.Index(fields=['is_active']),
+            models.Index(fields=['updated_at', 'id'], name='disease_sync_idx'),
+            search_trgm_index('name', name='disease_search_trgm_idx'),
         ]
 
     def __str__(self):
@@ -122,34 +142,6 @@ class PatientDisease(models.Model):
     def __str__(self):
         return f"{self.patient} - {self.disease}"
 
-# --------------------------------------------------------------------
-# Medication Model: قاموس الأدوية (اسم + تأثير على طب الأسنان)
-# --------------------------------------------------------------------
-class Medication(models.Model):
-    name = models.CharField(max_length=255, verbose_name=_("Medication Name"))
-    dental_impact = models.TextField(blank=True, null=True, verbose_name=_("Dental Impact"))
-    is_active = models.BooleanField(default=True)
-
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
-    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
-
-    class Meta:
-        verbose_name = _("Medication")
-        verbose_name_plural = _("Medications")
-        ordering = ["name"]
-        constraints = [
-            models.UniqueConstraint(Lower('name'), name='uniq_medication_name_ci'),
-        ]
-        indexes = [
-            models.Index(Lower('name'), name='idx_medication_name_ci'),
-            models.Index(fields=['is_active']),
-        ]
-
-    def __str__(self):
-        return self.name
-
-
-
 # --------------------------------------------------------------------
 # PatientAllergy Model: ربط المرضى بالحساسية من الأدوية
 # --------------------------------------------------------------------
@@ -157,9 +149,9 @@ class PatientAllergy(models.Model):
     patient = models.ForeignKey(
         Patient, on_delete=models.CASCADE, related_name="patient_allergies"
     )
-    # PROTECT لمنع حذف الدواء وهو مرتبط بحساسية مرضى
+    # PROTECT لمنع حذف الدواء وهو مرتبط بحساسية مرضى (قاموس الأدوية الموحّد في medicalrecord)
     medication = models.ForeignKey(
-        Medication, on_delete=models.PROTECT, related_name="patient_allergy_links"
+        "medicalrecord.Medication", on_delete=models.PROTECT, related_name="patient_allergy_links"
     )
     allergic_reaction = models.TextField(blank=True, null=True, verbose_name=_("Allergic Reaction"))
     diagnosed_at = models.DateField(verbose_name=_("Diagnosed At"), null=True, blank=True)
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.db.models.functions import Lower
-from .models import (Patient , Disease, Medication, PatientDisease, PatientAllergy) 
+from .models import (Patient , Disease, PatientDisease, PatientAllergy) 
+from medicalrecord.catalogue import get_or_create_medications, resolve_medication
+from medicalrecord.models import Medication
+from medicalrecord.serializers import validate_unique_medication_name
 from datetime import datetime, date, timedelta
 from django.db.models import Q
 from django.utils.timezone import localdate, now as tznow
@@ -74,7 +77,7 @@ class PatientSerializer(serializers.ModelSerializer):
 
         # أقرب موعد قادم (اليوم لاحقًا أو في الأيام القادمة)
         upcoming = (Appointment.objects
-                    .filter(patient=obj)
+                    .filter(patient=obj, date__gte=today)
                     .filter(Q(date__gt=today) | Q(date=today, time__gte=now_time))
                     .order_by("date", "time")
                     .first())
@@ -85,7 +88,7 @@ class PatientSerializer(serializers.ModelSerializer):
         # أحدث موعد مضى (اليوم قبل الآن أو أيام سابقة)
         latest_past = (
             Appointment.objects
-            .filter(patient=obj)
+            .filter(patient=obj, date__lte=today)
             .filter(Q(date__lt=today) | Q(date=today, time__lt=now_time))
             .order_by("-date", "-time")
             .first())
@@ -203,25 +206,22 @@ class PatientSerializer(serializers.ModelSerializer):
         raise serializers.ValidationError("صيغة مرض غير صحيحة. استخدم id أو name أو كائن {id|name}.")
 
     def _get_or_create_medication(self, item):
+        # قاموس الأدوية الموحّد (medicalrecord/catalogue.py)
         if isinstance(item, dict):
             if 'id' in item:
-                return Medication.objects.get(pk=item['id'])
-            if 'name' in item and str(item['name']).strip():
-                name = str(item['name']).strip()
-                existing = Medication.objects.filter(name__iexact=name).first()
-                if existing:
-                    return existing
-                return Medication.objects.create(name=name)
+                item = int(item['id'])
+            elif 'name' in item and str(item['name']).strip():
+                item = str(item['name'])
 
         if isinstance(item, int):
-            return Medication.objects.get(pk=item)
+            medication = resolve_medication(item)
+            if medication is None:
+                raise serializers.ValidationError(f"الدواء ({item}) غير موجود.")
+            return medication
 
         if isinstance(item, str) and item.strip():
             name = item.strip()
-            existing = Medication.objects.filter(name__iexact=name).first()
-            if existing:
-                return existing
-            return Medication.objects.create(name=name)
+            return get_or_create_medications([name])[name]
 
         raise serializers.ValidationError("صيغة دواء/حساسية غير صحيحة. استخدم id أو name أو كائن {id|name}.")
 
@@ -306,12 +306,7 @@ class MedicationSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
     def validate_name(self, value):
-        qs = Medication.objects.annotate(n=Lower("name")).filter(n=value.strip().lower())
-        if self.instance:
-            qs = qs.exclude(pk=self.instance.pk)
-        if qs.exists():
-            raise serializers.ValidationError("اسم الدواء موجود مسبقًا (بدون حساسية حالة الأحرف).")
-        return value.strip()
+        return validate_unique_medication_name(value, self.instance)
 
 
 
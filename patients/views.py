@@ -2,7 +2,9 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics, filters
-from .models import Disease, Patient, Medication
+from medicalrecord.models import Medication
+
+from .models import Disease, Patient
 from .serializers import DiseaseSerializer, PatientSerializer, MedicationSerializer
 from rest_framework import permissions, viewsets
 from django.db.models.functions import Lower
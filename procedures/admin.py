@@ -5,6 +5,9 @@ from .models import (
     ClinicalExam, ProcedureCategory, DentalProcedure,
     Toothcode, Procedure, ProcedureToothcode,ClinicalExamItem
 )
+
+from core.admin_mixins import ClinicAdminMixin
+from .signals import exam_items_changed
 # from medicalrecord.admin import PrescribedMedicationInline
 # Register your models here.
 
@@ -29,47 +32,87 @@ class ProcedureToothcodeInline(admin.TabularInline):
     autocomplete_fields = ["toothcode", "performed_by"]
 
 @admin.register(Procedure)
-class ProcedureAdmin(admin.ModelAdmin):
+class ProcedureAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["name", "clinical_exam", "category", "cost", "status", "created_at"]
     list_filter = ["status", "category", "created_at"]
     search_fields = ["name", "description", "clinical_exam__patient__first_name", "clinical_exam__patient__last_name"]
+    list_select_related = ["clinical_exam__patient", "category"]
     autocomplete_fields = ["clinical_exam", "definition", "category"]
     inlines = [ProcedureToothcodeInline]
 
 @admin.register(ClinicalExam)
-class ClinicalExamAdmin(admin.ModelAdmin):
+class ClinicalExamAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["patient", "doctor", "appointment", "created_at"]
-    search_fields = ["patient__first_name", "patient__last_name", "doctor__first_name", "doctor__last_name"]
+    search_fields = ["patient__first_name", "patient__last_name", "doctor__user__first_name", "doctor__user__last_name"]
+    # __str__ الموعد يمشي على المريض والطبيب أيضًا
+    list_select_related = ["patient", "doctor__user", "appointment__patient", "appointment__doctor__user"]
     autocomplete_fields = ["patient", "doctor", "appointment"]
     # inlines = [PrescribedMedicationInline]
 
 @admin.register(ProcedureCategory)
-class ProcedureCategoryAdmin(admin.ModelAdmin):
-    list_display = ["name", "created_at"]
+class ProcedureCategoryAdmin(ClinicAdminMixin, admin.ModelAdmin):
+    list_display = ["name", "price_override", "discount_percent", "created_at"]
     search_fields = ["name"]
 
 @admin.register(DentalProcedure)
-class DentalProcedureAdmin(admin.ModelAdmin):
+class DentalProcedureAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["name", "category", "default_price", "is_active"]
+    list_select_related = ["category"]
     list_filter = ["is_active", "category"]
     search_fields = ["name", "description"]
     autocomplete_fields = ["category"]
 
 @admin.register(Toothcode)
-class ToothcodeAdmin(admin.ModelAdmin):
+class ToothcodeAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["tooth_number", "tooth_type", "description", "created_at"]
     list_filter = ["tooth_type"]
     search_fields = ["tooth_number", "description"]
 
 @admin.register(ProcedureToothcode)
-class ProcedureToothcodeAdmin(admin.ModelAdmin):
+class ProcedureToothcodeAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["procedure", "toothcode", "performed_by", "performed_at"]
+    # __str__ الإجراء يمشي على مريض الفحص
+    list_select_related = ["procedure__clinical_exam__patient", "toothcode", "performed_by__user"]
     list_filter = ["performed_by"]
     search_fields = ["procedure__name", "toothcode__tooth_number"]
     autocomplete_fields = ["procedure", "toothcode", "performed_by"]
 @admin.register(ClinicalExamItem)
-class ClinicalExamItemAdmin(admin.ModelAdmin):
+class ClinicalExamItemAdmin(ClinicAdminMixin, admin.ModelAdmin):
     list_display = ["clinical_exam", "procedure", "toothcode", "performed_by", "created_at"]
+    list_select_related = ["clinical_exam__patient", "procedure", "toothcode", "performed_by__user"]
     list_filter = ["performed_by", "procedure"]
     search_fields = ["clinical_exam__patient__first_name", "clinical_exam__patient__last_name", "procedure__name", "toothcode__tooth_number"]
-    autocomplete_fields = ["clinical_exam", "procedure", "toothcode", "performed_by"]
\ No newline at end of file
+    autocomplete_fields = ["clinical_exam", "procedure", "toothcode", "performed_by"]
+
+    # الحفظ من الأدمن يمر بنفس إشارة الواجهات (exam_items_changed): تقدير التكلفة، الإحصاءات،
+    # change feed والتدقيق؛ لا مستقبلات post_save/post_delete لكل صف على العناصر
+    def save_model(self, request, obj, form, change):
+        before = ClinicalExamItem.objects.select_related("clinical_exam").get(pk=obj.pk) if change else None
+        super().save_model(request, obj, form, change)
+        exams = {obj.clinical_exam_id: obj.clinical_exam}
+        if before is not None:
+            exams.setdefault(before.clinical_exam_id, before.clinical_exam)
+        for exam in exams.values():
+            exam_items_changed.send(
+                sender=ClinicalExamItem, exam_id=exam.pk, patient_id=exam.patient_id, exam=exam,
+                added=[obj] if exam.pk == obj.clinical_exam_id else [],
+                removed=[before] if before is not None and exam.pk == before.clinical_exam_id else [],
+            )
+
+    # الحذف من الأدمن (زر الحذف وإجراء "حذف المحدد") يمر بالإشارة نفسها: شاهد change feed
+    # وسجل التدقيق لكل فحص دفعةً واحدة، مع بقاء fast delete للعناصر
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, ClinicalExamItem.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        items = list(queryset.select_related("clinical_exam"))
+        super().delete_queryset(request, queryset)
+        by_exam = {}
+        for item in items:
+            by_exam.setdefault(item.clinical_exam_id, []).append(item)
+        for exam_items in by_exam.values():
+            exam = exam_items[0].clinical_exam
+            exam_items_changed.send(
+                sender=ClinicalExamItem, exam_id=exam.pk, patient_id=exam.patient_id, exam=exam,
+                added=[], removed=exam_items,
+            )
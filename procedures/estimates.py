@@ -0,0 +1,157 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, Min, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core.versioning import bump_version, get_version
+
+from .models import ClinicalExamItem
+
+
+# =====================================================================
+# تقدير تكلفة خطة العلاج: كل عنصر (إجراء × سن) = وحدة واحدة بسعر الإجراء
+# سعر الوحدة = price_override للتصنيف إن وجد، وإلا default_price للإجراء، وإلا 0
+# ثم يُطبّق discount_percent الخاص بالتصنيف؛ المجاميع كلها تُحسب داخل SQL.
+# =====================================================================
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+CENTS = Decimal("0.01")
+ESTIMATE_TTL = 60 * 60 * 24
+
+ZERO = Value(Decimal("0"), output_field=MONEY)
+HUNDRED = Value(Decimal("100"), output_field=MONEY)
+
+UNIT_PRICE = Coalesce(
+    "procedure__category__price_override",
+    "procedure__default_price",
+    ZERO,
+    output_field=MONEY,
+)
+DISCOUNT_PERCENT = Coalesce("procedure__category__discount_percent", ZERO, output_field=MONEY)
+NET_PRICE = ExpressionWrapper(UNIT_PRICE * (HUNDRED - DISCOUNT_PERCENT) / HUNDRED, output_field=MONEY)
+
+
+def _money(value):
+    return (value or Decimal("0")).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _fmt(value):
+    # نفس تمثيل DecimalField في DRF (نص بخانتين عشريتين)
+    return str(_money(value))
+
+
+# ---------------------------------------------------------------------
+# نسخ (versions) تُستخدم كمفاتيح للكاش؛ أي تغيير في العناصر أو الأسعار يغيّر المفتاح
+# ---------------------------------------------------------------------
+PRICING_VERSION_KEY = "procedures:pricing-version"
+
+
+def exam_version_key(exam_id):
+    return f"procedures:exam-version:{exam_id}"
+
+
+def patient_version_key(patient_id):
+    return f"procedures:patient-items-version:{patient_id}"
+
+
+def bump_exam_version(exam_id, patient_id=None):
+    bump_version(exam_version_key(exam_id))
+    if patient_id:
+        bump_version(patient_version_key(patient_id))
+
+
+def bump_pricing_version():
+    bump_version(PRICING_VERSION_KEY)
+
+
+# ---------------------------------------------------------------------
+# الحساب
+# ---------------------------------------------------------------------
+def compute_estimate(items_qs, discount_percent=None):
+    """
+    يحسب التقدير لأي مجموعة عناصر (فحص واحد أو كل فحوصات مريض) باستعلامين:
+    سطر لكل إجراء (مجمّع حسب الإجراء) + المجموع الكلي.
+    discount_percent: خصم إضافي عام يُطبّق على الإجمالي بعد خصومات التصنيفات.
+    """
+    lines = (
+        items_qs
+        .order_by()
+        .values(
+            "procedure_id", "procedure__name",
+            "procedure__category_id", "procedure__category__name",
+        )
+        .annotate(
+            quantity=Count("id"),
+            unit_price=Min(UNIT_PRICE),
+            discount_percent=Min(DISCOUNT_PERCENT),
+            gross=Sum(UNIT_PRICE),
+            net=Sum(NET_PRICE),
+        )
+        .order_by("procedure__category__name", "procedure__name")
+    )
+    totals = items_qs.order_by().aggregate(
+        items_count=Count("id"),
+        gross=Coalesce(Sum(UNIT_PRICE), ZERO),
+        net=Coalesce(Sum(NET_PRICE), ZERO),
+    )
+
+    gross = _money(totals["gross"])
+    net = _money(totals["net"])
+    extra = _money(Decimal(discount_percent or 0) * net / 100)
+    total = net - extra
+
+    return {
+        "lines": [
+            {
+                "procedure": row["procedure_id"],
+                "procedure_name": row["procedure__name"],
+                "category": row["procedure__category_id"],
+                "category_name": row["procedure__category__name"],
+                "quantity": row["quantity"],
+                "unit_price": _fmt(row["unit_price"]),
+                "discount_percent": _fmt(row["discount_percent"]),
+                "gross": _fmt(row["gross"]),
+                "total": _fmt(row["net"]),
+            }
+            for row in lines
+        ],
+        "items_count": totals["items_count"],
+        "gross_total": _fmt(gross),
+        "category_discounts": _fmt(gross - net),
+        "extra_discount_percent": _fmt(Decimal(discount_percent or 0)),
+        "extra_discount": _fmt(extra),
+        "total": _fmt(total),
+    }
+
+
+def _discount_key(discount_percent):
+    # 10 و10.0 و10.00 نفس الخصم: مفتاح كاش واحد
+    return Decimal(discount_percent or 0).normalize()
+
+
+def estimate_for_exam(exam_id, discount_percent=None):
+    key = (
+        f"procedures:estimate:exam:{exam_id}:{get_version(exam_version_key(exam_id))}"
+        f":{get_version(PRICING_VERSION_KEY)}:{_discount_key(discount_percent)}"
+    )
+    data = cache.get(key)
+    if data is None:
+        data = compute_estimate(ClinicalExamItem.objects.filter(clinical_exam_id=exam_id), discount_percent)
+        data["clinical_exam"] = exam_id
+        cache.set(key, data, ESTIMATE_TTL)
+    return data
+
+
+def estimate_for_patient(patient_id, discount_percent=None):
+    key = (
+        f"procedures:estimate:patient:{patient_id}:{get_version(patient_version_key(patient_id))}"
+        f":{get_version(PRICING_VERSION_KEY)}:{_discount_key(discount_percent)}"
+    )
+    data = cache.get(key)
+    if data is None:
+        data = compute_estimate(
+            ClinicalExamItem.objects.filter(clinical_exam__patient_id=patient_id), discount_percent
+        )
+        data["patient"] = str(patient_id)
+        cache.set(key, data, ESTIMATE_TTL)
+    return data
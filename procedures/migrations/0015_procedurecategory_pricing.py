@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procedures', '0014_clinicalexam_prescription_notes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='procedurecategory',
+            name='discount_percent',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='Discount %'),
+        ),
+        migrations.AddField(
+            model_name='procedurecategory',
+            name='price_override',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Price Override'),
+        ),
+    ]
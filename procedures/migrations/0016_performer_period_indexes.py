@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_alter_doctor_user'),
+        ('procedures', '0015_procedurecategory_pricing'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clinicalexamitem',
+            index=models.Index(fields=['performed_by', 'created_at'], name='examitem_doctor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proceduretoothcode',
+            index=models.Index(fields=['performed_by', 'performed_at'], name='proctooth_doctor_performed_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_alter_doctor_user'),
+        ('appointment', '0002_appointment_updated_at'),
+        ('patients', '0009_sync_indexes'),
+        ('procedures', '0016_performer_period_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinicalexam',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='clinicalexamitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='clinicalexam',
+            index=models.Index(fields=['updated_at', 'id'], name='clinicalexam_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clinicalexamitem',
+            index=models.Index(fields=['updated_at', 'id'], name='examitem_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:10
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procedures', '0017_exam_updated_at'),
+        ('accounts', '0010_normalized_name'),  # امتداد pg_trgm
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dentalprocedure',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='dentalproc_search_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='procedure',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='procedure_search_trgm_idx'),
+        ),
+    ]
@@ -2,10 +2,13 @@ from django.db import models
 from patients.models import Patient
 from accounts.models import Doctor
 from appointment.models import Appointment
+from core.indexes import search_trgm_index
+from core.tracking import LoadedValuesMixin
 from django.utils.translation import gettext_lazy as _
+from django.core.validators import MinValueValidator, MaxValueValidator
 # Create your models here.
 
-class ClinicalExam(models.Model):
+class ClinicalExam(LoadedValuesMixin, models.Model):
     """
     جلسة فحص سريري لمريض معيّن، تشمل الشكوى والنصيحة وربط الإجراءات
     """
@@ -35,15 +38,17 @@ class ClinicalExam(models.Model):
     medical_advice = models.TextField(blank=True, null=True)
     prescription_notes = models.TextField(blank=True, null=True, verbose_name=_("Prescription Notes"))
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     class Meta:
         verbose_name = _("Clinical Exam")
         verbose_name_plural = _("Clinical Exams")
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["updated_at", "id"], name="clinicalexam_sync_idx")]
         
     def __str__(self):
         return f"Exam for {self.patient} on {self.created_at.date()}"
 
-class ClinicalExamItem(models.Model):
+class ClinicalExamItem(LoadedValuesMixin, models.Model):
     """سطر داخل الفحص: إجراء محدد على سن محددة"""
     clinical_exam = models.ForeignKey(
         ClinicalExam, on_delete=models.CASCADE,
@@ -72,6 +77,7 @@ class ClinicalExamItem(models.Model):
         verbose_name=_("Performed By"),
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
@@ -86,6 +92,9 @@ class ClinicalExamItem(models.Model):
             models.Index(fields=["clinical_exam"]),
             models.Index(fields=["procedure"]),
             models.Index(fields=["toothcode"]),
+            # تقارير تسوية الأطباء: عناصر طبيب ضمن فترة
+            models.Index(fields=["performed_by", "created_at"], name="examitem_doctor_created_idx"),
+            models.Index(fields=["updated_at", "id"], name="examitem_sync_idx"),
         ]
 
     def __str__(self):
@@ -105,6 +114,7 @@ class DentalProcedure(models.Model):
         verbose_name = _("Dental Procedure (Definition)")
         verbose_name_plural = _("Dental Procedures (Definitions)")
         ordering = ["name"]
+        indexes = [search_trgm_index("name", name="dentalproc_search_trgm_idx")]
 
     def __str__(self):
         return self.name
@@ -116,6 +126,15 @@ class DentalProcedure(models.Model):
 class ProcedureCategory(models.Model):
     name = models.CharField(max_length=255, unique=True, db_index=True)
     description = models.TextField(blank=True, null=True)
+    # تسعير على مستوى التصنيف: سعر موحّد يتجاوز default_price للإجراءات، ونسبة خصم
+    price_override = models.DecimalField(
+        max_digits=10, decimal_places=2, blank=True, null=True, verbose_name=_("Price Override")
+    )
+    discount_percent = models.DecimalField(
+        max_digits=5, decimal_places=2, default=0,
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        verbose_name=_("Discount %"),
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -168,7 +187,11 @@ class Procedure(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        indexes = [models.Index(fields=["clinical_exam"]), models.Index(fields=["created_at"])]
+        indexes = [
+            models.Index(fields=["clinical_exam"]),
+            models.Index(fields=["created_at"]),
+            search_trgm_index("name", name="procedure_search_trgm_idx"),
+        ]
         ordering = ["-created_at"]
 
     def __str__(self):
@@ -188,7 +211,11 @@ class ProcedureToothcode(models.Model):
 
     class Meta:
         unique_together = [("procedure", "toothcode")]
-        indexes = [models.Index(fields=["procedure"]), models.Index(fields=["toothcode"])]
+        indexes = [
+            models.Index(fields=["procedure"]),
+            models.Index(fields=["toothcode"]),
+            models.Index(fields=["performed_by", "performed_at"], name="proctooth_doctor_performed_idx"),
+        ]
         ordering = ["-performed_at"]
 
     def __str__(self):
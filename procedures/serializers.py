@@ -1,5 +1,8 @@
+import copy
+
 from rest_framework import serializers
 from django.db import transaction
+from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 
 from .models import (
@@ -9,6 +12,8 @@ from .models import (
     DentalProcedure,
     Toothcode,
 )
+from .services import upsert_exam_for_appointment
+from .signals import exam_items_changed
 from accounts.models import Doctor
 from appointment.models import Appointment
 from rest_framework.response import Response
@@ -109,7 +114,7 @@ class FlexiblePKOrSlugRelatedField(serializers.Field):
 class ProcedureCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = ProcedureCategory
-        fields = ["id", "name", "description", "created_at"]
+        fields = ["id", "name", "description", "price_override", "discount_percent", "created_at"]
         read_only_fields = ["id", "created_at"]
 
     def validate_name(self, value):
@@ -195,11 +200,34 @@ class ClinicalExamSerializer(serializers.ModelSerializer):
             return None
 
 
+class ClinicalExamListSerializer(ClinicalExamSerializer):
+    """
+    تمثيل القائمة: عدد العناصر + أول EXAM_ITEMS_PREVIEW عناصر فقط بدل الشجرة كاملة.
+    يتطلب queryset مع items_count و preview_items (procedures/views.py: exam_list_queryset).
+    """
+    items_count = serializers.IntegerField(read_only=True)
+    items_preview = ClinicalExamItemSerializer(source="preview_items", many=True, read_only=True)
+
+    class Meta(ClinicalExamSerializer.Meta):
+        fields = [f for f in ClinicalExamSerializer.Meta.fields if f != "items"] + ["items_count", "items_preview"]
+        read_only_fields = fields
+
+
 # =====================================================================
 # Submit-all-in-one Serializer (يعتمد على appointment)
 # =====================================================================
 class ClinicalExamSubmitSerializer(serializers.Serializer):
-    appointment = serializers.PrimaryKeyRelatedField(queryset=Appointment.objects.all())
+    """
+    أنماط حفظ العناصر (mode):
+      - diff    : (الافتراضي مع replace_items=true) يحسب الأزواج (إجراء، سن) المضافة والمحذوفة
+                  ويطبّق الفرق فقط؛ العناصر التي لم تتغير تبقى كما هي (مع created_at والملاحظات).
+      - replace : حذف كل العناصر ثم إدخال القائمة كاملة (السلوك القديم).
+      - append  : (الافتراضي مع replace_items=false) إضافة الأزواج غير الموجودة فقط.
+    """
+    # المريض والطبيب مطلوبان لبناء الاستجابة؛ نجلبهم مع الموعد باستعلام واحد
+    appointment = serializers.PrimaryKeyRelatedField(
+        queryset=Appointment.objects.select_related("patient", "doctor__user")
+    )
 
     # حقول الفحص
     complaint = serializers.CharField(allow_blank=True, required=False)
@@ -207,7 +235,7 @@ class ClinicalExamSubmitSerializer(serializers.Serializer):
 
     # إجراءات متعددة + أسنان متعددة
     procedures = serializers.PrimaryKeyRelatedField(
-        queryset=DentalProcedure.objects.filter(is_active=True), many=True
+        queryset=DentalProcedure.objects.filter(is_active=True).select_related("category"), many=True
     )
     teeth = serializers.PrimaryKeyRelatedField(queryset=Toothcode.objects.all(), many=True, required=False)
     tooth_numbers = serializers.ListField(child=serializers.CharField(), required=False)
@@ -216,6 +244,7 @@ class ClinicalExamSubmitSerializer(serializers.Serializer):
     notes = serializers.CharField(allow_blank=True, required=False)
     performed_by = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all(), required=False, allow_null=True)
     replace_items = serializers.BooleanField(required=False, default=True)
+    mode = serializers.ChoiceField(choices=("diff", "replace", "append"), required=False)
 
     def validate(self, data):
         if not data.get("procedures"):
@@ -239,36 +268,48 @@ class ClinicalExamSubmitSerializer(serializers.Serializer):
         appt = validated_data["appointment"]
         complaint = validated_data.get("complaint", "")
         advice = validated_data.get("medical_advice", "")
-        procs = validated_data["procedures"]
-        teeth = validated_data["teeth"]
         notes = validated_data.get("notes", "")
-        replace = validated_data.get("replace_items", True)
+        mode = validated_data.get("mode") or ("diff" if validated_data.get("replace_items", True) else "append")
+
+        # إزالة التكرار مع الحفاظ على ترتيب الإدخال
+        procs = list({p.pk: p for p in validated_data["procedures"]}.values())
+        teeth = list({t.pk: t for t in validated_data["teeth"]}.values())
 
         performed_by = validated_data.get("performed_by")
         if not performed_by and getattr(appt, "doctor_id", None):
             performed_by = appt.doctor
 
         with transaction.atomic():
-            # (1) إنشاء/تحديث الفحص على أساس appointment
-            exam, created = ClinicalExam.objects.get_or_create(
-                appointment=appt,
-                defaults={
-                    "patient": getattr(appt, "patient", None),
-                    "doctor": getattr(appt, "doctor", None),
-                    "complaint": complaint,
-                    "medical_advice": advice,
-                }
-            )
-            if not created:
-                exam.complaint = complaint
-                exam.medical_advice = advice
-                exam.save(update_fields=["complaint", "medical_advice"])
-
-            # (2) استبدال العناصر القديمة إن لزم
-            if replace:
-                ClinicalExamItem.objects.filter(clinical_exam=exam).delete()
+            # (1) إنشاء/تحديث الفحص على أساس appointment بعبارة upsert واحدة
+            # (الـ upsert يقفل صف الفحص حتى نهاية المعاملة، فالحفظ المتزامن لنفس الموعد يتسلسل)
+            try:
+                exam, _ = upsert_exam_for_appointment(
+                    appt,
+                    complaint=complaint,
+                    medical_advice=advice,
+                    update_fields=("complaint", "medical_advice"),
+                )
+            except Appointment.DoesNotExist:  # حُذف بعد التحقق
+                raise serializers.ValidationError({"appointment": "الموعد غير موجود."})
 
-            # (3) إنشاء العناصر (إجراء × سن)
+            existing = list(
+                ClinicalExamItem.objects
+                .filter(clinical_exam=exam)
+                .select_related("procedure__category", "toothcode")
+            )
+            target = {(p.pk, t.pk) for p in procs for t in teeth}
+
+            # (2) تحديد العناصر المحذوفة والمُبقاة
+            if mode == "replace":
+                removed, kept = existing, []
+            elif mode == "diff":
+                removed = [it for it in existing if (it.procedure_id, it.toothcode_id) not in target]
+                kept = [it for it in existing if (it.procedure_id, it.toothcode_id) in target]
+            else:
+                removed, kept = [], existing
+
+            # (3) الأزواج الجديدة فقط (إجراء × سن)
+            present = {(it.procedure_id, it.toothcode_id) for it in kept}
             rows = [
                 ClinicalExamItem(
                     clinical_exam=exam,
@@ -278,24 +319,57 @@ class ClinicalExamSubmitSerializer(serializers.Serializer):
                     performed_by=performed_by,
                 )
                 for p in procs for t in teeth
+                if (p.pk, t.pk) not in present
             ]
-            ClinicalExamItem.objects.bulk_create(rows, ignore_conflicts=True)
-
-        # مهم: أعِد جلب exam مع العناصر الجديدة
-        exam = (
-            ClinicalExam.objects
-            .select_related("patient", "doctor", "appointment", "doctor__user")
-            .prefetch_related(
-                "items",
-                "items__procedure",
-                "items__procedure__category",
-                "items__toothcode"
+
+            # (3ب) في diff تأخذ العناصر المُبقاة الحقول المرسلة صراحة (كما كان replace يعيد إنشاءها بها)
+            edits = {}
+            if mode == "diff":
+                if "notes" in validated_data:
+                    edits["notes"] = notes
+                if "performed_by" in validated_data:
+                    edits["performed_by_id"] = getattr(performed_by, "pk", None)
+            edited, before_edit = [], []
+            for it in kept:
+                if any(getattr(it, name) != value for name, value in edits.items()):
+                    before_edit.append(copy.copy(it))
+                    for name, value in edits.items():
+                        setattr(it, name, value)
+                    it.updated_at = timezone.now()  # bulk_update لا يحدّث auto_now (مزامنة الأجهزة تعتمد عليه)
+                    edited.append(it)
+
+            # (4) تطبيق الفرق: DELETE للمحذوف، INSERT ... RETURNING للجديد، UPDATE واحد للمعدّل
+            if removed:
+                ClinicalExamItem.objects.filter(pk__in=[it.pk for it in removed]).delete()
+            added = ClinicalExamItem.objects.bulk_create(rows) if rows else []
+            if edited:
+                ClinicalExamItem.objects.bulk_update(edited, [*edits, "updated_at"])
+
+        if removed or added or edited:
+            # المعدّل يُرسل في added مع نسخته السابقة في removed (كتعديل عنصر مفرد)
+            exam_items_changed.send(
+                sender=ClinicalExamItem, exam_id=exam.pk, patient_id=exam.patient_id,
+                exam=exam, added=added + edited, removed=removed + before_edit,
             )
-            .get(pk=exam.pk)
-        )
-        # نُعيد exam فقط (بدون items خارجية)
+
+        # (5) بناء الاستجابة من الذاكرة بدون إعادة جلب الفحص
+        self._attach_related(exam, appt)
+        items = sorted(kept + added, key=lambda it: (it.created_at, it.pk), reverse=True)
+        exam._prefetched_objects_cache = {"items": items}
         return exam
 
+    def _attach_related(self, exam, appt):
+        # غالبًا المريض والطبيب هم نفسهم في الموعد؛ نجلبهم فقط إن تغيّر الطبيب/المريض في الفحص
+        if exam.patient_id == appt.patient_id:
+            exam.patient = appt.patient
+        if exam.doctor_id is None:
+            exam.doctor = None
+        elif exam.doctor_id == appt.doctor_id:
+            exam.doctor = appt.doctor
+        else:
+            exam.doctor = Doctor.objects.select_related("user").filter(pk=exam.doctor_id).first()
+        exam.appointment = appt
+
     def to_representation(self, instance):
         # instance هنا هو ClinicalExam
         return {
@@ -317,5 +391,5 @@ class ProcedureCategoryDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ProcedureCategory
-        fields = ["id", "name", "description", "created_at", "procedures"]
+        fields = ["id", "name", "description", "price_override", "discount_percent", "created_at", "procedures"]
         read_only_fields = ["id", "created_at", "procedures"]
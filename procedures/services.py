@@ -0,0 +1,109 @@
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from medicalrecord.history import invalidate_history
+from core.changefeed import Action, exam_change, record
+
+from .models import ClinicalExam
+
+
+# مدة الاحتفاظ بربط (موعد -> فحص) في الكاش؛ الربط لا يتغير إلا عند حذف الفحص.
+# حذف المفتاح عند الحذف يصل إلى كاش العملية الحالية فقط (LocMemCache)، لذلك يُتحقق من الرقم المخزّن
+# قبل استخدامه (resolve_exam_id).
+EXAM_BY_APPOINTMENT_TTL = 60 * 10
+
+
+def exam_cache_key(appointment_id):
+    return f"procedures:exam-by-appointment:{appointment_id}"
+
+
+def upsert_exam_for_appointment(appointment, complaint=None, medical_advice=None, update_fields=()):
+    """
+    إنشاء/جلب الفحص السريري لموعد بعبارة واحدة:
+        INSERT ... SELECT ... WHERE EXISTS (الموعد) ON CONFLICT (appointment_id) DO UPDATE ... RETURNING
+    - update_fields: الحقول التي تُحدَّث إن كان الفحص موجودًا (مثل complaint/medical_advice).
+      إن كانت فارغة يكون التحديث شكليًا فقط حتى يُرجع RETURNING الصف الموجود.
+    يُرجع (exam, created) حيث created محسوبة من xmax (صف جديد => xmax = 0).
+    الطلبات المتزامنة لنفس الموعد لا ترفع IntegrityError؛ الثانية تنتظر قفل الصف وتُرجع نفس الفحص.
+    وجود الموعد يُتحقق منه داخل العبارة (EXISTS ... FOR KEY SHARE)، لأن جدول المواعيد المقسّم
+    (core/partitions.py) لا يحمل قيد FK؛ إن لم يوجد يُرفع Appointment.DoesNotExist.
+    """
+    opts = ClinicalExam._meta
+    now = timezone.now()
+    fields = opts.concrete_fields
+    qn = connection.ops.quote_name
+
+    insert_values = {
+        "patient_id": appointment.patient_id,
+        "doctor_id": appointment.doctor_id,
+        "appointment_id": appointment.pk,
+        "complaint": complaint,
+        "medical_advice": medical_advice,
+        "created_at": now,
+        "updated_at": now,
+    }
+    insert_fields = [opts.get_field(name) for name in insert_values]
+    insert_cols = [f.column for f in insert_fields]
+    params = [f.get_db_prep_save(insert_values[name], connection) for name, f in zip(insert_values, insert_fields)]
+
+    if update_fields:
+        # updated_at يتقدم فقط مع تعديل حقيقي (تعتمد عليه مزامنة الأجهزة)
+        assignments = ", ".join(
+            f"{qn(opts.get_field(name).column)} = EXCLUDED.{qn(opts.get_field(name).column)}"
+            for name in (*update_fields, "updated_at")
+        )
+    else:
+        col = qn(opts.get_field("appointment").column)
+        assignments = f"{col} = EXCLUDED.{col}"
+
+    appointment_model = opts.get_field("appointment").related_model
+    if connection.vendor == "postgresql":
+        # INSERT ... SELECT لا يستنتج أنواع المعاملات من أعمدة الهدف كما يفعل VALUES
+        placeholders = [f"%s::{f.cast_db_type(connection)}" for f in insert_fields]
+        lock = " FOR KEY SHARE"  # يمنع حذف الموعد حتى نهاية المعاملة
+    else:
+        placeholders, lock = ["%s"] * len(insert_fields), ""
+    params.append(appointment.pk)
+
+    sql = (
+        f"INSERT INTO {qn(opts.db_table)} ({', '.join(qn(c) for c in insert_cols)}) "
+        f"SELECT {', '.join(placeholders)} "
+        f"WHERE EXISTS (SELECT 1 FROM {qn(appointment_model._meta.db_table)} "
+        f"WHERE {qn(appointment_model._meta.pk.column)} = %s{lock}) "
+        f"ON CONFLICT ({qn(opts.get_field('appointment').column)}) DO UPDATE SET {assignments} "
+        f"RETURNING {', '.join(qn(f.column) for f in fields)}, (xmax = 0) AS created"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        raise appointment_model.DoesNotExist("الموعد غير موجود.")
+
+    # to_python يوحّد القيم الخام بين المحركات (مثل UUID المخزّن كنص في SQLite)
+    values = [f.to_python(v) for f, v in zip(fields, row[:-1])]
+    exam = ClinicalExam.from_db(connection.alias, [f.attname for f in fields], values)
+    created = bool(row[-1])
+    cache.set(exam_cache_key(appointment.pk), exam.pk, EXAM_BY_APPOINTMENT_TTL)
+    # العبارة الخام لا تُطلق post_save، فنسجّل في change feed صراحةً
+    if created or update_fields:
+        record(exam_change(exam, Action.CREATED if created else Action.UPDATED))
+        invalidate_history(exam.patient_id)
+    return exam, created
+
+
+def resolve_exam_id(appointment):
+    """
+    رقم الفحص الخاص بالموعد (يُنشأ عند الحاجة).
+    الإعادات المتكررة تُخدم من الكاش بقراءة فهرس واحدة بدل upsert (كتابة وقفل صف).
+    يُرجع (exam_id, created).
+    """
+    key = exam_cache_key(appointment.pk)
+    exam_id = cache.get(key)
+    if exam_id is not None:
+        # الفحص قد يكون حُذف من عملية أخرى لا يصل حذفها إلى هذا الكاش
+        if ClinicalExam.objects.filter(pk=exam_id, appointment_id=appointment.pk).exists():
+            return exam_id, False
+        cache.delete(key)
+    exam, created = upsert_exam_for_appointment(appointment)
+    return exam.pk, created
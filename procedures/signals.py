@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .estimates import bump_exam_version, bump_pricing_version
+from .models import ClinicalExam, DentalProcedure, ProcedureCategory
+from .services import exam_cache_key
+
+
+# يُرسل بعد أي تعديل على عناصر الفحص (إجراء × سن)، بما فيها الإدخال/التعديل الجماعي
+# (bulk_create/bulk_update) الذي لا يُطلق post_save.
+# الوسائط: exam_id, patient_id, exam (الكائن نفسه), added (قائمة ClinicalExamItem), removed (قائمة ClinicalExamItem)
+exam_items_changed = Signal()
+
+
+@receiver(post_delete, sender=ClinicalExam)
+def forget_exam_for_appointment(sender, instance, **kwargs):
+    # بعد حذف الفحص لا يجب أن يُرجع resolve رقمًا قديمًا
+    if instance.appointment_id:
+        cache.delete(exam_cache_key(instance.appointment_id))
+    bump_exam_version(instance.pk, instance.patient_id)
+
+
+@receiver(exam_items_changed)
+def invalidate_exam_estimate(sender, exam_id, patient_id=None, **kwargs):
+    bump_exam_version(exam_id, patient_id)
+
+
+@receiver(post_save, sender=DentalProcedure)
+@receiver(post_delete, sender=DentalProcedure)
+@receiver(post_save, sender=ProcedureCategory)
+@receiver(post_delete, sender=ProcedureCategory)
+def invalidate_pricing(sender, **kwargs):
+    bump_pricing_version()
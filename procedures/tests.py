@@ -1,3 +1,62 @@
+import datetime
+from unittest import skipUnless
+
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser, Doctor
+from appointment.models import Appointment
+from patients.models import Patient
+
+from .models import ClinicalExamItem, DentalProcedure, ProcedureCategory, Toothcode
+
+
+# الحفظ يستخدم RETURNING (xmax = 0) الخاص بـ PostgreSQL لمعرفة هل أُنشئ الفحص أم حُدّث
+@skipUnless(connection.vendor == "postgresql", "ClinicalExamSubmit يعتمد على SQL خاص بـ PostgreSQL")
+class ClinicalExamSubmitDiffTests(TestCase):
+    url = "/api/procedures/clinical-exams/submit/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = user = CustomUser.objects.create_user(username="doc", email="doc@example.com", password="pw", user_type="doctor")
+        cls.doctor = Doctor.objects.create(user=user, license_number="L1")
+        patient = Patient.objects.create(first_name="سارة", last_name="علي", phone="700000001")
+        cls.appt = Appointment.objects.create(
+            patient=patient, doctor=cls.doctor, date=datetime.date.today(),
+            time=datetime.time(10, 0), status="completed",
+        )
+        category = ProcedureCategory.objects.create(name="Fillings")
+        cls.procedure = DentalProcedure.objects.create(name="Composite", category=category, default_price=10)
+        Toothcode.objects.create(tooth_number="11")
+
+    def submit(self, **extra):
+        body = {"appointment": self.appt.pk, "procedures": [self.procedure.pk], "tooth_numbers": ["11"]}
+        body.update(extra)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(self.url, body, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["exam"]["items"]
+
+    def test_resubmit_updates_note_of_kept_item(self):
+        first = self.submit(notes="قبل")
+        second = self.submit(notes="بعد")
+
+        self.assertEqual([it["id"] for it in second], [it["id"] for it in first])
+        self.assertEqual(second[0]["notes"], "بعد")
+        self.assertEqual(ClinicalExamItem.objects.get(pk=first[0]["id"]).notes, "بعد")
+
+    def test_resubmit_without_note_keeps_existing_note(self):
+        first = self.submit(notes="قبل")
+        self.submit()
+
+        self.assertEqual(ClinicalExamItem.objects.get(pk=first[0]["id"]).notes, "قبل")
 
-# Create your tests here.
+    def test_resubmit_runs_a_fixed_number_of_queries(self):
+        # وضع الفروق: لا استعلام لكل عنصر، والعدد لا يتغير بعدد الأسنان
+        teeth = ["11", "12", "13", "14"]
+        Toothcode.objects.bulk_create([Toothcode(tooth_number=n) for n in teeth[1:]])
+        self.submit(tooth_numbers=teeth)
+        with self.assertNumQueries(15):
+            self.submit(tooth_numbers=teeth[:2], notes="بعد")
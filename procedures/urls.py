@@ -4,7 +4,8 @@ from .views import (
     ProcedureCategoryListCreateAPIView, ProcedureCategoryRUDAPIView,
     DentalProcedureListCreateAPIView, DentalProcedureRUDAPIView,
     ToothcodeListAPIView,
-    ClinicalExamItemListCreateAPIView, ClinicalExamItemRUDAPIView,ProceduresByToothAPIView,ResolveExamByAppointment
+    ClinicalExamItemListCreateAPIView, ClinicalExamItemRUDAPIView,ProceduresByToothAPIView,ResolveExamByAppointment,
+    ClinicalExamEstimateAPIView, PatientEstimateAPIView,
 )
 
 urlpatterns = [
@@ -14,6 +15,10 @@ urlpatterns = [
     path("clinical-exams/submit/", ClinicalExamSubmitAPIView.as_view(), name="clinical-exams-submit"),
     path("clinical-exams/resolve/", ResolveExamByAppointment.as_view(), name="exam-resolve"),
 
+    # Treatment plan estimate
+    path("clinical-exams/<int:pk>/estimate/", ClinicalExamEstimateAPIView.as_view(), name="exam-estimate"),
+    path("patients/<uuid:patient_id>/estimate/", PatientEstimateAPIView.as_view(), name="patient-estimate"),
+
     # Dictionaries
     path("categories/", ProcedureCategoryListCreateAPIView.as_view(), name="category-list-create"),
     path("categories/<int:pk>/", ProcedureCategoryRUDAPIView.as_view(), name="category-rud"),
@@ -1,9 +1,19 @@
+import copy
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+from django.core.serializers.json import DjangoJSONEncoder
+
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.shortcuts import render, get_object_or_404
 from django.http import Http404
 from rest_framework import generics, status, views, permissions
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from appointment.models import Appointment
 from rest_framework.views import APIView
+from django.core.cache import cache
 
 from .models import (
     ClinicalExam,
@@ -14,6 +24,7 @@ from .models import (
 )
 from .serializers import (
     ClinicalExamSerializer,
+    ClinicalExamListSerializer,
     ClinicalExamItemSerializer,
     ClinicalExamSubmitSerializer,
     ProcedureCategorySerializer,
@@ -21,27 +32,129 @@ from .serializers import (
     DentalProcedureSerializer,
     ToothcodeSerializer,
 )
+from .services import resolve_exam_id
+from .signals import exam_items_changed
+from .estimates import estimate_for_exam, estimate_for_patient
 
 # ---------------------------
 # ClinicalExam
 # ---------------------------
+EXAM_ITEMS_PREVIEW = 3
+
+
+def _exam_items():
+    # كل ما يقرؤه ClinicalExamItemSerializer (الإجراء وتصنيفه والسن) في نفس الاستعلام
+    return ClinicalExamItem.objects.select_related("procedure__category", "toothcode").order_by("created_at", "id")
+
+
+def exam_list_queryset():
+    """
+    القائمة بعدد ثابت من الاستعلامات مهما كان عدد الفحوص:
+    - items_count: subquery مرتبط (بدل JOIN + GROUP BY على الفحوص)
+    - preview_items: أول EXAM_ITEMS_PREVIEW عناصر لكل فحص في استعلام واحد
+      (Prefetch مقطوع ← ROW_NUMBER() OVER (PARTITION BY clinical_exam_id))
+    """
+    counts = (
+        ClinicalExamItem.objects.filter(clinical_exam=OuterRef("pk"))
+        .order_by().values("clinical_exam").annotate(n=Count("id")).values("n")
+    )
+    return (
+        ClinicalExam.objects.select_related("patient", "doctor__user")
+        .annotate(items_count=Coalesce(Subquery(counts), Value(0), output_field=IntegerField()))
+        .prefetch_related(Prefetch("items", queryset=_exam_items()[:EXAM_ITEMS_PREVIEW], to_attr="preview_items"))
+    )
+
+
+def exam_detail_queryset():
+    return ClinicalExam.objects.select_related("patient", "doctor__user").prefetch_related(
+        Prefetch("items", queryset=_exam_items())
+    )
+
+
 class ClinicalExamListCreateAPIView(generics.ListCreateAPIView):
-    queryset = ClinicalExam.objects.select_related("patient", "doctor", "appointment").all()
+    """القائمة بـ ClinicalExamListSerializer (عدد + معاينة)؛ الإنشاء يُرجع التمثيل الكامل."""
     serializer_class = ClinicalExamSerializer
     filterset_fields = ["patient", "doctor", "appointment"]
     search_fields = ["complaint", "medical_advice"]  # لا يوجد planned_procedures الآن
-    ordering_fields = ["created_at"]
+    ordering_fields = ["created_at", "items_count"]
+
+    def get_queryset(self):
+        if self.request.method == "GET":
+            return exam_list_queryset()
+        return exam_detail_queryset()
+
+    def get_serializer_class(self):
+        if self.request.method == "GET":
+            return ClinicalExamListSerializer
+        return ClinicalExamSerializer
 
 
 class ClinicalExamRUDAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = ClinicalExam.objects.select_related("patient", "doctor", "appointment").all()
+    """التفاصيل: شجرة العناصر كاملة باستعلامين (الفحص + العناصر مع الإجراء/التصنيف/السن)."""
     serializer_class = ClinicalExamSerializer
 
+    def get_queryset(self):
+        return exam_detail_queryset()
+
 
 # عند الضغط على "حفظ" من الواجهة: إنشاء/تحديث الفحص + إنشاء عناصر (إجراء × سن) دفعة واحدة
 class ClinicalExamSubmitAPIView(generics.CreateAPIView):
+    """
+    يدعم الترويسة Idempotency-Key: إعادة إرسال نفس الطلب (نقرات متكررة/إعادة محاولة الشبكة)
+    تُرجع نفس الاستجابة المحفوظة (ونفس رمز الحالة) بدون تنفيذ الحفظ مرة أخرى؛
+    إعادة استخدام المفتاح بجسم مختلف تُرفض بـ 422.
+    """
     # permission_classes = [permissions.IsAuthenticated]   # عدّل حسب نظامك
     serializer_class = ClinicalExamSubmitSerializer
+    idempotency_ttl = 60 * 60 * 24
+    in_flight_ttl = 30
+
+    def _idempotency_key(self, request):
+        key = (request.headers.get("Idempotency-Key") or "").strip()
+        if not key:
+            return None
+        user_id = getattr(request.user, "pk", None) or "anon"
+        return f"procedures:exam-submit:v2:{user_id}:{key}"
+
+    def _body_hash(self, request):
+        # بصمة الجسم بعد التحليل (ترتيب المفاتيح لا يهم) تُحفظ مع الاستجابة
+        body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+        return hashlib.sha256(body.encode()).hexdigest()
+
+    def create(self, request, *args, **kwargs):
+        key = self._idempotency_key(request)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+
+        body_hash = self._body_hash(request)
+        cached = cache.get(key)
+        if cached is not None:
+            if cached["body_hash"] != body_hash:
+                # نفس المفتاح بجسم مختلف: خطأ من العميل، لا نعيد استجابة طلب آخر ولا ننفّذ
+                return Response(
+                    {"detail": "Idempotency-Key مستخدم مسبقًا مع طلب مختلف."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            return Response(cached["data"], status=cached["status"], headers={"Idempotent-Replayed": "true"})
+
+        # منع تنفيذ نفس المفتاح مرتين بالتوازي
+        lock_key = f"{key}:lock"
+        if not cache.add(lock_key, 1, self.in_flight_ttl):
+            return Response(
+                {"detail": "طلب بنفس Idempotency-Key قيد التنفيذ."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        try:
+            response = super().create(request, *args, **kwargs)
+            if response.status_code == status.HTTP_201_CREATED:
+                cache.set(
+                    key,
+                    {"body_hash": body_hash, "status": response.status_code, "data": response.data},
+                    self.idempotency_ttl,
+                )
+            return response
+        finally:
+            cache.delete(lock_key)
 
 
 # ---------------------------
@@ -111,6 +224,13 @@ class ClinicalExamItemListCreateAPIView(generics.ListCreateAPIView):
     filterset_fields = ["clinical_exam", "procedure", "toothcode", "performed_by"]
     ordering_fields = ["created_at"]
 
+    def perform_create(self, serializer):
+        item = serializer.save()
+        exam_items_changed.send(
+            sender=ClinicalExamItem, exam_id=item.clinical_exam_id,
+            patient_id=item.clinical_exam.patient_id, exam=item.clinical_exam, added=[item], removed=[],
+        )
+
 
 class ClinicalExamItemRUDAPIView(generics.RetrieveUpdateDestroyAPIView):
     queryset = ClinicalExamItem.objects.select_related(
@@ -118,6 +238,25 @@ class ClinicalExamItemRUDAPIView(generics.RetrieveUpdateDestroyAPIView):
     ).all()
     serializer_class = ClinicalExamItemSerializer
 
+    def perform_update(self, serializer):
+        before = copy.copy(serializer.instance)
+        item = serializer.save()
+        for exam in {before.clinical_exam, item.clinical_exam}:
+            exam_items_changed.send(
+                sender=ClinicalExamItem, exam_id=exam.pk, patient_id=exam.patient_id, exam=exam,
+                added=[item] if exam.pk == item.clinical_exam_id else [],
+                removed=[before] if exam.pk == before.clinical_exam_id else [],
+            )
+
+    def perform_destroy(self, instance):
+        exam = instance.clinical_exam
+        removed = copy.copy(instance)  # delete() يصفّر pk على الكائن نفسه
+        instance.delete()
+        exam_items_changed.send(
+            sender=ClinicalExamItem, exam_id=exam.pk, patient_id=exam.patient_id, exam=exam,
+            added=[], removed=[removed],
+        )
+
 
 class ProceduresByToothAPIView(views.APIView):
     # permission_classes = [permissions.IsAuthenticated]
@@ -202,10 +341,51 @@ class ResolveExamByAppointment(APIView):
         appt_id = request.query_params.get("appointment")
         if not appt_id:
             return Response({"detail": "appointment مطلوب"}, status=400)
+        if not str(appt_id).isdigit():
+            return Response({"detail": "appointment يجب أن يكون رقمًا"}, status=400)
 
-        appt = Appointment.objects.select_related("patient","doctor").get(pk=appt_id)
-        exam, _ = ClinicalExam.objects.get_or_create(
-            appointment=appt,
-            defaults={"patient": appt.patient, "doctor": appt.doctor}
+        appt = get_object_or_404(
+            Appointment.objects.only("id", "patient_id", "doctor_id"), pk=int(appt_id)
         )
-        return Response({"clinical_exam": exam.id}, status=200)
\ No newline at end of file
+        try:
+            exam_id, created = resolve_exam_id(appt)
+        except Appointment.DoesNotExist:  # حُذف بين القراءة والـ upsert
+            raise Http404("الموعد غير موجود")
+        return Response(
+            {"clinical_exam": exam_id, "created": created},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+# ---------------------------
+# تقدير تكلفة خطة العلاج
+# ---------------------------
+class TreatmentEstimateMixin:
+    """
+    ?discount=<نسبة مئوية> خصم إضافي عام (اختياري) فوق خصومات التصنيفات.
+    """
+    def get_discount(self, request):
+        raw = request.query_params.get("discount")
+        if raw in (None, ""):
+            return None
+        try:
+            value = Decimal(raw)
+        except InvalidOperation:
+            raise ValidationError({"discount": "يجب أن يكون رقمًا."})
+        if not value.is_finite():  # NaN/Infinity: مقارنة NaN ترفع InvalidOperation
+            raise ValidationError({"discount": "يجب أن يكون رقمًا."})
+        if not (0 <= value <= 100):
+            raise ValidationError({"discount": "النسبة بين 0 و 100."})
+        return value
+
+
+class ClinicalExamEstimateAPIView(TreatmentEstimateMixin, APIView):
+    def get(self, request, pk):
+        if not ClinicalExam.objects.filter(pk=pk).exists():
+            raise Http404("الفحص غير موجود")
+        return Response(estimate_for_exam(pk, self.get_discount(request)))
+
+
+class PatientEstimateAPIView(TreatmentEstimateMixin, APIView):
+    def get(self, request, patient_id):
+        return Response(estimate_for_patient(patient_id, self.get_discount(request)))